@@ -0,0 +1,39 @@
+import pandas as pd
+
+# 値の種類が少ない文字列列 (405行に対してtype_nameは37種類、annotator_nameは1種類など)
+CATEGORY_COLUMNS = [
+    "commit_id", "experiment_id", "experiment_title", "type_name", "description", "annotator_name", "url",
+]
+INTEGER_COLUMNS = ["order_index"]
+# parameter_dataはannotation_elements.pyの要素の表に展開して使う
+DROPPED_COLUMNS = ["parameter_data"]
+
+
+def compact_annotations(raw):
+    """
+    Compact copy of an annotation frame read with pd.read_json: low-cardinality
+    string columns as sorted categoricals, integer columns downcast
+    (int8/int16), the commit SHA split from the URL as commit_sha, and
+    parameter_data dropped. The index (refactoring_id) is kept.
+    """
+    df = raw.drop(columns=[c for c in DROPPED_COLUMNS if c in raw.columns])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            # カテゴリは辞書順になる (groupbyの並びが文字列列のときと変わらない)
+            df[col] = df[col].astype("category")
+    for col in INTEGER_COLUMNS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+    if "url" in df.columns:
+        df["commit_sha"] = df["url"].astype(object).str.rsplit("/", n=1).str[-1].astype("category")
+    return df
+
+
+def load_annotations(json_path):
+    """Read annotation_result_*.json into the compact frame (see compact_annotations)."""
+    return compact_annotations(pd.read_json(json_path))
+
+
+def memory_usage(df):
+    """Deep memory usage of a frame in bytes (index included)."""
+    return int(df.memory_usage(deep=True, index=True).sum())
@@ -0,0 +1,62 @@
+import importlib
+import threading
+
+
+class LazyImport:
+    """
+    Stand-in for a module, or one attribute of a module, that is imported on
+    first use. Attribute access and calls are forwarded to the real object,
+    so `plt = lazy_import("matplotlib.pyplot")` can be used exactly like
+    `import matplotlib.pyplot as plt` while only paying the import cost in the
+    functions that actually draw.
+    """
+
+    def __init__(self, module, attribute=None):
+        self.__dict__["_module"] = module
+        self.__dict__["_attribute"] = attribute
+        self.__dict__["_target"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        target = self.__dict__["_target"]
+        if target is None:
+            with self._lock:
+                target = self.__dict__["_target"]
+                if target is None:
+                    target = importlib.import_module(self._module)
+                    if self._attribute is not None:
+                        target = getattr(target, self._attribute)
+                    self.__dict__["_target"] = target
+        return target
+
+    @property
+    def loaded(self):
+        return self.__dict__["_target"] is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        name = self._module if self._attribute is None else f"{self._module}.{self._attribute}"
+        return f"<lazy {name} ({'loaded' if self.loaded else 'not loaded'})>"
+
+    def __reduce__(self):
+        # ワーカープロセスに渡すときは遅延のまま渡す
+        return LazyImport, (self._module, self._attribute)
+
+
+def lazy_import(module, attribute=None):
+    """
+    Lazily import `module` (e.g. "matplotlib.pyplot"), or `attribute` of it
+    (e.g. lazy_import("scipy.stats", "norm")).
+    """
+    return LazyImport(module, attribute)
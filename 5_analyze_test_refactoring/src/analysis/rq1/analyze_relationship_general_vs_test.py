@@ -1,9 +1,20 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib_venn import venn2
+import argparse
+import hashlib
 import os
-from typing import Dict, Any
+import pickle
+import sys
+from collections.abc import Mapping
+from functools import cached_property
+from typing import Callable, Dict, Any
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+
+# 重いライブラリは使う関数の中で初めてimportする
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+venn2 = lazy_import("matplotlib_venn", "venn2")
 
 class Config:
     """設定を管理するクラス"""
@@ -18,26 +29,107 @@ class Config:
 
     RESULTS_DIR = os.path.join(BASE_DIR, "results")
     REPORT_PATH = os.path.join(RESULTS_DIR, "analysis_report.txt")
+    # 入力ファイルのハッシュごとに計算済みの分析結果を保存する
+    CACHE_DIR = os.path.join(RESULTS_DIR, ".analysis_cache")
 
     TOP_N_TYPES = 10
 
+# 分析結果の形式を変えたら上げる (古いキャッシュを無効にする)
+CACHE_VERSION = 1
+
+
+class AnalysisResults(Mapping):
+    """
+    分析結果をセクション名で引く辞書。各セクションは最初に参照されたときに計算し、
+    cache_pathに保存する (次回の実行では保存済みの値をそのまま返す)
+    """
+    def __init__(self, sections: Dict[str, Callable[[], Any]], cache_path: str = None):
+        self._sections = sections
+        self._cache_path = cache_path
+        self._values: Dict[str, Any] = {}
+        if cache_path is not None and os.path.isfile(cache_path):
+            try:
+                with open(cache_path, 'rb') as f:
+                    self._values = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                print(f"Warning: Ignoring unreadable analysis cache {cache_path}: {e}")
+
+    def __getitem__(self, name):
+        if name not in self._values:
+            self._values[name] = self._sections[name]()
+            self._save()
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __len__(self):
+        return len(self._sections)
+
+    def computed(self):
+        """計算済み (保存済みを含む) のセクション名"""
+        return [name for name in self._sections if name in self._values]
+
+    def _save(self):
+        if self._cache_path is None:
+            return
+        try:
+            cache_dir = os.path.dirname(self._cache_path)
+            os.makedirs(cache_dir, exist_ok=True)
+            # 入力が変わって使われなくなった古いキャッシュを消す
+            for name in os.listdir(cache_dir):
+                path = os.path.join(cache_dir, name)
+                if name.startswith("sections_") and path != self._cache_path:
+                    os.remove(path)
+            tmp_path = self._cache_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self._values, f)
+            os.replace(tmp_path, self._cache_path)
+        except OSError as e:
+            print(f"Warning: Could not save analysis cache to {self._cache_path}: {e}")
+
 class RefactoringAnalyzer:
     """
     テストリファクタリングと一般リファクタリングの分析を行うクラス
     """
     def __init__(self, config: Config):
         self.config = config
-        self.results: Dict[str, Any] = {}
         os.makedirs(self.config.RESULTS_DIR, exist_ok=True)
-        self._load_and_preprocess_data()
+        sections = {
+            'prevalence': self._analyze_prevalence,
+            'statistics': self._analyze_statistics,
+            'coexistence': self._analyze_coexistence,
+            'correlation': self._analyze_correlation,
+            'types': self._analyze_types,
+        }
+        cache_path = os.path.join(self.config.CACHE_DIR, f"sections_{self._input_hash()}.pkl")
+        # データの読み込みも各セクションも、必要になったときに初めて行う
+        self.results = AnalysisResults(sections, cache_path)
 
-    def _load_and_preprocess_data(self):
+    def _input_paths(self):
+        return [self.config.TEST_REFACTORING_PATH, self.config.GENERAL_REFACTORING_PATH,
+                self.config.TEST_TYPE_PATH, self.config.GENERAL_TYPE_PATH]
+
+    def _input_hash(self):
+        """入力ファイルの内容と結果に影響する設定から作るキャッシュのキー"""
+        h = hashlib.sha256(f"{CACHE_VERSION}:{self.config.TOP_N_TYPES}".encode())
+        try:
+            for path in self._input_paths():
+                with open(path, 'rb') as f:
+                    h.update(hashlib.sha256(f.read()).digest())
+        except FileNotFoundError as e:
+            print(f"Error: Data file not found. {e}")
+            raise
+        return h.hexdigest()[:16]
+
+    @cached_property
+    def _data(self):
         """データの読み込みと前処理を一度に行う"""
         try:
             test_df = pd.read_csv(self.config.TEST_REFACTORING_PATH)
             general_df = pd.read_csv(self.config.GENERAL_REFACTORING_PATH)
-            self.test_types_df = pd.read_csv(self.config.TEST_TYPE_PATH).rename(columns={'type_name': 'refactoring_type'})
-            self.general_types_df = pd.read_csv(self.config.GENERAL_TYPE_PATH)
+            test_types_df = pd.read_csv(self.config.TEST_TYPE_PATH).rename(columns={'type_name': 'refactoring_type'})
+            general_types_df = pd.read_csv(self.config.GENERAL_TYPE_PATH)
 
             # commit_idの重複をチェック (ここでは警告のみ)
             if test_df['commit_id'].duplicated().any() or general_df['commit_id'].duplicated().any():
@@ -46,43 +138,58 @@ class RefactoringAnalyzer:
                 general_df = general_df.groupby('commit_id').sum().reset_index()
 
             # データフレームをマージしてインスタンス変数として保持
-            self.merged_df = pd.merge(test_df, general_df, on='commit_id', suffixes=('_test', '_general'))
+            merged_df = pd.merge(test_df, general_df, on='commit_id', suffixes=('_test', '_general'))
+            # 各分析で共通して使うマスクは一度だけ計算しておく
+            merged_df['has_test'] = merged_df['refactoring_count_test'] > 0
+            merged_df['has_general'] = merged_df['refactoring_count_general'] > 0
+            return merged_df, test_types_df, general_types_df
 
         except FileNotFoundError as e:
             print(f"Error: Data file not found. {e}")
             raise
 
+    @property
+    def merged_df(self):
+        return self._data[0]
+
+    @property
+    def test_types_df(self):
+        return self._data[1]
+
+    @property
+    def general_types_df(self):
+        return self._data[2]
+
     def run_analysis(self):
-        """全ての分析を実行し、結果をself.resultsに格納する"""
-        self._analyze_prevalence()
-        self._analyze_statistics()
-        self._analyze_coexistence()
-        self._analyze_correlation()
-        self._analyze_types()
+        """全ての分析を実行し、結果をself.resultsに格納する (保存済みのセクションは再計算しない)"""
+        for name in self.results:
+            self.results[name]
         print("Analysis complete.")
 
     def _analyze_prevalence(self):
         total_commits = len(self.merged_df)
-        self.results['prevalence'] = {
+        test_commits = int(self.merged_df['has_test'].sum())
+        general_commits = int(self.merged_df['has_general'].sum())
+        return {
             'total_commits': total_commits,
-            'test_refactoring_commits': len(self.merged_df[self.merged_df['refactoring_count_test'] > 0]),
-            'general_refactoring_commits': len(self.merged_df[self.merged_df['refactoring_count_general'] > 0]),
-            'test_ratio': len(self.merged_df[self.merged_df['refactoring_count_test'] > 0]) / total_commits,
-            'general_ratio': len(self.merged_df[self.merged_df['refactoring_count_general'] > 0]) / total_commits,
+            'test_refactoring_commits': test_commits,
+            'general_refactoring_commits': general_commits,
+            'test_ratio': test_commits / total_commits,
+            'general_ratio': general_commits / total_commits,
         }
 
     def _analyze_statistics(self):
-        self.results['statistics'] = {
+        return {
             'test': self.merged_df['refactoring_count_test'].describe().to_dict(),
             'general': self.merged_df['refactoring_count_general'].describe().to_dict()
         }
 
     def _analyze_coexistence(self):
-        test_exists = self.merged_df['refactoring_count_test'] > 0
-        general_exists = self.merged_df['refactoring_count_general'] > 0
+        test_exists = self.merged_df['has_test']
+        general_exists = self.merged_df['has_general']
         total_commits = len(self.merged_df)
 
-        self.results['coexistence'] = {
+        return {
             'test_only': (test_exists & ~general_exists).sum(),
             'general_only': (~test_exists & general_exists).sum(),
             'both': (test_exists & general_exists).sum(),
@@ -91,17 +198,18 @@ class RefactoringAnalyzer:
         }
 
     def _analyze_correlation(self):
-        test_commits = self.merged_df[self.merged_df['refactoring_count_test'] > 0]
-        general_commits = self.merged_df[self.merged_df['refactoring_count_general'] > 0]
+        test_exists = self.merged_df['has_test']
+        general_exists = self.merged_df['has_general']
+        both = (test_exists & general_exists).sum()
 
-        self.results['correlation'] = {
+        return {
             'spearman_corr': self.merged_df['refactoring_count_test'].corr(self.merged_df['refactoring_count_general'], method='spearman'),
-            'general_given_test_prob': len(test_commits[test_commits['refactoring_count_general'] > 0]) / len(test_commits) if len(test_commits) > 0 else 0,
-            'test_given_general_prob': len(general_commits[general_commits['refactoring_count_test'] > 0]) / len(general_commits) if len(general_commits) > 0 else 0,
+            'general_given_test_prob': both / test_exists.sum() if test_exists.any() else 0,
+            'test_given_general_prob': both / general_exists.sum() if general_exists.any() else 0,
         }
 
     def _analyze_types(self):
-        self.results['types'] = {
+        return {
             'test_type_count': len(self.test_types_df),
             'general_type_count': len(self.general_types_df),
             'top_test_types': self.test_types_df.nlargest(self.config.TOP_N_TYPES, 'count'),
@@ -221,12 +329,16 @@ class RefactoringAnalyzer:
 
 def main():
     """メインの実行関数"""
+    parser = argparse.ArgumentParser(description="Relationship between test and general refactoring in commits.")
+    parser.add_argument("--report-only", action="store_true", help="Write the report without drawing the figures.")
+    args = parser.parse_args()
     try:
         config = Config()
         analyzer = RefactoringAnalyzer(config)
-        analyzer.run_analysis()
+        # レポートは必要なセクションだけを (保存済みなら計算せずに) 使う
         analyzer.generate_and_save_report()
-        analyzer.generate_visualizations()
+        if not args.report_only:
+            analyzer.generate_visualizations()
     except Exception as e:
         print(f"An error occurred: {e}")
 
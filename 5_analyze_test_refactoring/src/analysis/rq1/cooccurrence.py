@@ -0,0 +1,145 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from annotation_data import load_annotations
+from refactoring_stream import stream_sample_refactorings
+
+sparse = lazy_import("scipy.sparse")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "..", "..", ".."))
+CANDIDATE_COMMITS_PATH = os.path.join(REPO_DIR, "2_sampling_test_refactor_commits", "result", "sampling_test_commits_all.csv")
+ANNOTATION_PATH = os.path.join(REPO_DIR, "5_analyze_test_refactoring", "src", "results", "annotation_result_2024-02-20.json")
+REFACTORING_DATA_PATH = os.path.join(BASE_DIR, "input", "refactorings_output.csv")
+OUTPUT_DIR = os.path.join(BASE_DIR, "output", "cooccurrence")
+
+EVENT_COLUMNS = ["commit_id", "source", "refactoring_type"]
+PAIR_COLUMNS = [
+    "source_a", "type_a", "source_b", "type_b", "support_a", "support_b", "cooccurrence",
+    "jaccard", "lift", "confidence_a_to_b", "confidence_b_to_a",
+]
+
+
+def annotation_events(annotations):
+    """(commit_id, "test", type_name) of each annotated test refactoring (see load_annotations)."""
+    return pd.DataFrame({
+        "commit_id": annotations["commit_sha"],
+        "source": "test",
+        "refactoring_type": annotations["type_name"],
+    }, columns=EVENT_COLUMNS)
+
+
+def refactoring_miner_events(refactorings):
+    """(commit_id, "general", refactoring_name) of each RefactoringMiner refactoring."""
+    return pd.DataFrame({
+        "commit_id": refactorings["refactoring_commit_id"],
+        "source": "general",
+        "refactoring_type": refactorings["refactoring_name"],
+    }, columns=EVENT_COLUMNS)
+
+
+def incidence_matrix(events, commits=None):
+    """
+    Sparse binary commit x refactoring-type matrix (CSR, int32) from events
+    with EVENT_COLUMNS. A type is the (source, refactoring_type) pair, so
+    test and general types never collide. `commits` fixes the rows (commits
+    without any event stay as empty rows; events of other commits are
+    dropped); by default every commit with an event is a row.
+    Returns (matrix, commit index, types DataFrame).
+    """
+    if commits is None:
+        commits = pd.Index(pd.unique(events["commit_id"]))
+    else:
+        commits = pd.Index(pd.unique(pd.Series(list(commits), dtype=object)))
+        events = events[events["commit_id"].isin(commits)]
+    type_codes, types = pd.MultiIndex.from_frame(events[["source", "refactoring_type"]]).factorize()
+    rows = commits.get_indexer(events["commit_id"])
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype="int32"), (rows, type_codes)),
+                               shape=(len(commits), len(types)))
+    # 同じコミットで同じ種類が複数回あっても1とする
+    matrix.data[:] = 1
+    types = pd.DataFrame(list(types), columns=["source", "refactoring_type"])
+    return matrix, commits, types
+
+
+def cooccurrence_pairs(matrix, types, min_cooccurrence=1):
+    """
+    Co-occurrence statistics of every pair of types that appear together in
+    at least `min_cooccurrence` commits, from the sparse product X^T X:
+    supports, co-occurring commits, Jaccard |A & B| / |A | B|,
+    lift P(A & B) / (P(A) P(B)) and the confidences P(B | A), P(A | B).
+    Sorted by co-occurrence, then lift.
+    """
+    n_commits = matrix.shape[0]
+    gram = (matrix.T @ matrix).tocsr()
+    support = gram.diagonal().astype("float64")
+    pairs = sparse.triu(gram, k=1).tocoo()
+    keep = pairs.data >= min_cooccurrence
+    a, b, count = pairs.row[keep], pairs.col[keep], pairs.data[keep].astype("float64")
+
+    result = pd.DataFrame({
+        "source_a": types["source"].to_numpy()[a],
+        "type_a": types["refactoring_type"].to_numpy()[a],
+        "source_b": types["source"].to_numpy()[b],
+        "type_b": types["refactoring_type"].to_numpy()[b],
+        "support_a": support[a].astype("int64"),
+        "support_b": support[b].astype("int64"),
+        "cooccurrence": count.astype("int64"),
+        "jaccard": count / (support[a] + support[b] - count),
+        "lift": count * n_commits / (support[a] * support[b]),
+        "confidence_a_to_b": count / support[a],
+        "confidence_b_to_a": count / support[b],
+    }, columns=PAIR_COLUMNS)
+    return result.sort_values(["cooccurrence", "lift"], ascending=False, kind="stable").reset_index(drop=True)
+
+
+def top_pairs(pairs, by="lift", n=20, min_cooccurrence=5, cross_source_only=False):
+    """The `n` pairs with the largest `by` among those co-occurring in at least `min_cooccurrence` commits."""
+    pairs = pairs[pairs["cooccurrence"] >= min_cooccurrence]
+    if cross_source_only:
+        pairs = pairs[pairs["source_a"] != pairs["source_b"]]
+    return pairs.nlargest(n, by, keep="first").reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Co-occurrence of test and general refactoring types per commit.")
+    parser.add_argument("--commits", type=str, default=CANDIDATE_COMMITS_PATH, help="CSV with the commit_id population.")
+    parser.add_argument("--annotations", type=str, default=ANNOTATION_PATH, help="Test refactoring annotation JSON.")
+    parser.add_argument("--refactorings", type=str, default=REFACTORING_DATA_PATH, help="RefactoringMiner CSV.")
+    parser.add_argument("--output-dir", type=str, default=OUTPUT_DIR, help="Output directory for the CSV tables.")
+    parser.add_argument("--top", type=int, default=20, help="Number of top pairs exported per measure.")
+    parser.add_argument("--min-cooccurrence", type=int, default=5, help="Minimum co-occurring commits of a top pair.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    os.makedirs(args.output_dir, exist_ok=True)
+    commits = pd.read_csv(args.commits, usecols=["commit_id"], dtype=str)["commit_id"]
+    events = [annotation_events(load_annotations(args.annotations))]
+    if os.path.isfile(args.refactorings):
+        events.append(refactoring_miner_events(stream_sample_refactorings(args.refactorings, commits).refactorings))
+    else:
+        print(f"Warning: {args.refactorings} not found; only test refactoring types are used.")
+    matrix, commit_index, types = incidence_matrix(pd.concat(events, ignore_index=True), commits)
+    pairs = cooccurrence_pairs(matrix, types)
+
+    pairs.to_csv(os.path.join(args.output_dir, "cooccurrence_pairs.csv"), index=False)
+    for measure in ["cooccurrence", "lift", "jaccard"]:
+        top = top_pairs(pairs, measure, args.top, args.min_cooccurrence)
+        top.to_csv(os.path.join(args.output_dir, f"top_pairs_by_{measure}.csv"), index=False)
+    cross = top_pairs(pairs, "lift", args.top, args.min_cooccurrence, cross_source_only=True)
+    cross.to_csv(os.path.join(args.output_dir, "top_test_general_pairs_by_lift.csv"), index=False)
+
+    print(f"{len(commit_index)} commits x {len(types)} types ({matrix.nnz} non-zeros), {len(pairs)} co-occurring pairs "
+          f"in {time.perf_counter() - start:.2f}s")
+    print(top_pairs(pairs, "lift", 10, args.min_cooccurrence).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
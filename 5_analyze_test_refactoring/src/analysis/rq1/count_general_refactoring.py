@@ -7,6 +7,8 @@
 import pandas as pd
 import os
 
+from refactoring_stream import stream_sample_refactorings
+
 # 現在の作業ディレクトリを基準にパスを設定
 PWD = os.getcwd()
 
@@ -28,17 +30,13 @@ def main():
     # サンプルコミットの読み込み
     sample_commits = pd.read_csv(SAMPLE_COMMITS_PATH)
     
-    # リファクタリングデータの読み込み
-    refactoring_data = pd.read_csv(REFACTORING_DATA_PATH)
-    
     # サンプルコミットのハッシュリストを取得
     sample_hashes = set(sample_commits['commit_id'])
     
-    # サンプルコミットに関連するリファクタリングを抽出
-    sample_refactorings = refactoring_data[refactoring_data['refactoring_commit_id'].isin(sample_hashes)]
-    
-    # refactoring_hashで重複を排除
-    unique_refactorings = sample_refactorings.drop_duplicates(subset=['refactoring_commit_id', 'refactoring_hash'])
+    # リファクタリングデータを分割して読み込み、サンプルコミットの行だけを
+    # refactoring_hashで重複を排除しながら抽出する (ファイル全体はメモリに載せない)
+    stream = stream_sample_refactorings(REFACTORING_DATA_PATH, sample_hashes)
+    unique_refactorings = stream.refactorings
     
     # リファクタリングタイプごとの集計
     refactoring_counts = unique_refactorings['refactoring_name'].value_counts().reset_index()
@@ -59,8 +57,8 @@ def main():
     
     # 基本統計情報の作成
     summary_data = {
-        'metric': ['総リファクタリング数（重複排除後）', 'リファクタリングを含むコミット数', 'リファクタリングタイプ数'],
-        'value': [len(sample_refactorings), len(unique_refactorings), len(refactoring_per_commit), len(refactoring_counts)]
+        'metric': ['総リファクタリング数（重複排除前）', '総リファクタリング数（重複排除後）', 'リファクタリングを含むコミット数', 'リファクタリングタイプ数'],
+        'value': [stream.matched_rows, len(unique_refactorings), len(refactoring_per_commit), len(refactoring_counts)]
     }
     summary_df = pd.DataFrame(summary_data)
     
@@ -71,7 +69,8 @@ def main():
     all_commits_refactoring.to_csv(OUTPUT_ALL_COMMITS_PATH, index=False)
     
     # 基本統計情報の表示
-    print(f"総リファクタリング数（重複排除前）: {len(sample_refactorings)}")
+    print(f"読み込んだ行数: {stream.total_rows}")
+    print(f"総リファクタリング数（重複排除前）: {stream.matched_rows}")
     print(f"総リファクタリング数（重複排除後）: {len(unique_refactorings)}")
     print(f"リファクタリングを含むコミット数: {len(refactoring_per_commit)}")
     print(f"リファクタリングタイプ数: {len(refactoring_counts)}")
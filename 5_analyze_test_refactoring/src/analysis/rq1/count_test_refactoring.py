@@ -1,6 +1,13 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from annotation_data import load_annotations
+
+# 重いライブラリは使う関数の中で初めてimportする
+plt = lazy_import("matplotlib.pyplot")
 
 
 BASE_DIR = "/Users/horikawa/Dev/Research-repo/InvestigatingTheImpactOfTestSpecificRefactoring"
@@ -17,19 +24,15 @@ def analyze_test_refactoring(df):
     sample_commits = pd.read_csv(SAMPLE_COMMITS_PATH)
     sample_hashes = set(sample_commits['commit_id'])
 
-    # URLからコミットIDを抽出する関数
-    def extract_commit_id(url):
-        return url.split('/')[-1]
-
-    # URLからコミットIDを抽出
-    df['commit_id'] = df['url'].apply(extract_commit_id)
+    # URLから抽出したコミットID (load_annotationsで分割済み)
+    df['commit_id'] = df['commit_sha']
 
     # 何コミットでリファクタリングが行われたか
     unique_commits = df['commit_id'].nunique()
     print(f"Total commits with test refactoring: {unique_commits}")
 
-    # どのリファクタリングが多いか
-    refactoring_counts = df['type_name'].value_counts()
+    # どのリファクタリングが多いか (同数の並びは出現順にするため文字列として数える)
+    refactoring_counts = df['type_name'].astype(object).value_counts()
 
     # CSV に保存
     refactoring_counts.to_csv(f"{RESULTS_DIR}/test_refactoring_counts.csv", index=True, header=["count"])
@@ -56,7 +59,7 @@ def analyze_test_refactoring(df):
     # plt.show()
 
     # 1コミットあたりのリファクタリング回数
-    refactoring_per_commit = df.groupby('commit_id').size()
+    refactoring_per_commit = df.groupby('commit_id', observed=True).size()
 
     # すべてのサンプルコミットに対してリファクタリング数を集計（0を含む）
     all_commits_refactoring = pd.DataFrame({'commit_id': list(sample_hashes)})
@@ -94,7 +97,7 @@ def analyze_test_refactoring(df):
 
 
 def main():
-    df = pd.read_json(f"{JSON_DIR}/annotation_result_2024-02-20.json")
+    df = load_annotations(f"{JSON_DIR}/annotation_result_2024-02-20.json")
     analyze_test_refactoring(df)
 
 
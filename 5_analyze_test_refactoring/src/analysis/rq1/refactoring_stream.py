@@ -0,0 +1,52 @@
+from typing import NamedTuple
+
+import pandas as pd
+
+# RefactoringMinerの出力のうち集計に使う列だけを読む
+REFACTORING_DTYPES = {
+    "refactoring_commit_id": str,
+    "refactoring_hash": str,
+    "refactoring_name": str,
+}
+REFACTORING_COLUMNS = list(REFACTORING_DTYPES)
+DEDUP_KEYS = ["refactoring_commit_id", "refactoring_hash"]
+# 1回に読む行数 (ピークメモリはこの行数と抽出後の行数だけで決まる)
+CHUNK_ROWS = 200_000
+
+
+class SampleRefactorings(NamedTuple):
+    """Refactorings of the sampled commits, deduplicated, and the row counts seen while streaming."""
+    refactorings: pd.DataFrame
+    matched_rows: int
+    total_rows: int
+
+
+def stream_sample_refactorings(path, commit_ids, columns=REFACTORING_COLUMNS, chunksize=CHUNK_ROWS):
+    """
+    Read a RefactoringMiner CSV in chunks of `chunksize` rows, keeping only
+    `columns` (as strings) of the rows whose refactoring_commit_id is one of
+    `commit_ids`, deduplicated on (refactoring_commit_id, refactoring_hash)
+    as they arrive. The first occurrence is kept and file order preserved,
+    the same as read_csv + isin + drop_duplicates on the whole file.
+    """
+    columns = list(dict.fromkeys(list(columns) + DEDUP_KEYS))
+    commit_ids = frozenset(str(c) for c in commit_ids)
+    dtypes = {c: REFACTORING_DTYPES.get(c, str) for c in columns}
+    seen = set()
+    kept = []
+    matched_rows = total_rows = 0
+    for chunk in pd.read_csv(path, usecols=columns, dtype=dtypes, chunksize=chunksize):
+        total_rows += len(chunk)
+        chunk = chunk[chunk["refactoring_commit_id"].isin(commit_ids)]
+        matched_rows += len(chunk)
+        if chunk.empty:
+            continue
+        chunk = chunk.drop_duplicates(subset=DEDUP_KEYS)
+        keys = list(zip(chunk["refactoring_commit_id"], chunk["refactoring_hash"]))
+        new = [key not in seen for key in keys]
+        seen.update(keys)
+        kept.append(chunk[new])
+
+    refactorings = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame(
+        {c: pd.Series(dtype=object) for c in columns})
+    return SampleRefactorings(refactorings[columns], matched_rows, total_rows)
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from analyze_relationship_general_vs_test import Config, RefactoringAnalyzer
+
+
+def write_inputs(data_dir, test_counts, general_counts):
+    os.makedirs(os.path.join(data_dir, "test"), exist_ok=True)
+    os.makedirs(os.path.join(data_dir, "general"), exist_ok=True)
+    commits = [f"c{i}" for i in range(len(test_counts))]
+    pd.DataFrame({"commit_id": commits, "refactoring_count": test_counts}).to_csv(
+        os.path.join(data_dir, "test", "all_commits_test_refactoring.csv"), index=False)
+    pd.DataFrame({"commit_id": commits, "refactoring_count": general_counts}).to_csv(
+        os.path.join(data_dir, "general", "all_commits_refactoring.csv"), index=False)
+    pd.DataFrame({"type_name": ["A", "B"], "count": [3, 1]}).to_csv(
+        os.path.join(data_dir, "test", "test_refactoring_counts.csv"), index=False)
+    pd.DataFrame({"refactoring_type": ["X"], "count": [5]}).to_csv(
+        os.path.join(data_dir, "general", "general_refactoring_counts.csv"), index=False)
+
+
+class TestRefactoringAnalyzer(unittest.TestCase):
+    """analyze_relationship_general_vs_test.pyの遅延評価と結果のキャッシュのユニットテスト"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        data_dir = os.path.join(self.tmp.name, "output")
+        write_inputs(data_dir, [0, 1, 2, 0, 3], [0, 0, 4, 1, 2])
+        self.config = Config()
+        self.config.TEST_REFACTORING_PATH = os.path.join(data_dir, "test", "all_commits_test_refactoring.csv")
+        self.config.GENERAL_REFACTORING_PATH = os.path.join(data_dir, "general", "all_commits_refactoring.csv")
+        self.config.TEST_TYPE_PATH = os.path.join(data_dir, "test", "test_refactoring_counts.csv")
+        self.config.GENERAL_TYPE_PATH = os.path.join(data_dir, "general", "general_refactoring_counts.csv")
+        self.config.RESULTS_DIR = os.path.join(self.tmp.name, "results")
+        self.config.REPORT_PATH = os.path.join(self.config.RESULTS_DIR, "analysis_report.txt")
+        self.config.CACHE_DIR = os.path.join(self.config.RESULTS_DIR, ".analysis_cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sections_are_lazy(self):
+        """参照したセクションだけを計算し、データも必要になるまで読まないことをテストする"""
+        analyzer = RefactoringAnalyzer(self.config)
+        self.assertNotIn("_data", analyzer.__dict__)
+        coexistence = analyzer.results["coexistence"]
+        self.assertEqual((coexistence["test_only"], coexistence["general_only"], coexistence["both"],
+                          coexistence["neither"]), (1, 1, 2, 1))
+        self.assertEqual(analyzer.results.computed(), ["coexistence"])
+        self.assertAlmostEqual(analyzer.results["correlation"]["general_given_test_prob"], 2 / 3)
+
+    def test_report_from_cache(self):
+        """入力が変わらなければ保存済みの結果からデータを読まずにレポートを作ることをテストする"""
+        RefactoringAnalyzer(self.config).generate_and_save_report()
+        with open(self.config.REPORT_PATH) as f:
+            first = f.read()
+
+        cached = RefactoringAnalyzer(self.config)
+        self.assertEqual(cached.results.computed(), list(cached.results))
+        cached.generate_and_save_report()
+        self.assertNotIn("_data", cached.__dict__)
+        with open(self.config.REPORT_PATH) as f:
+            self.assertEqual(f.read(), first)
+
+        # 入力が変われば計算し直す
+        write_inputs(os.path.dirname(os.path.dirname(self.config.TEST_REFACTORING_PATH)), [1, 1, 1, 1, 1], [0] * 5)
+        changed = RefactoringAnalyzer(self.config)
+        self.assertEqual(changed.results.computed(), [])
+        self.assertEqual(changed.results["prevalence"]["test_refactoring_commits"], 5)
+        self.assertEqual(len(os.listdir(self.config.CACHE_DIR)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+import itertools
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from cooccurrence import incidence_matrix, cooccurrence_pairs, top_pairs, annotation_events, EVENT_COLUMNS
+from annotation_data import compact_annotations
+
+
+def random_events(n_events, n_commits, n_types, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "commit_id": [f"c{i}" for i in rng.integers(0, n_commits, n_events)],
+        "source": rng.choice(["test", "general"], n_events),
+        "refactoring_type": [f"T{i}" for i in rng.integers(0, n_types, n_events)],
+    }, columns=EVENT_COLUMNS)
+
+
+class TestCooccurrence(unittest.TestCase):
+    """cooccurrence.pyの共起行列のユニットテスト"""
+
+    def test_matches_set_computation(self):
+        """疎行列の積による共起・Jaccard・liftがコミット集合から直接求めた値と一致することをテストする"""
+        events = random_events(300, 60, 6)
+        commits = [f"c{i}" for i in range(80)]
+        matrix, commit_index, types = incidence_matrix(events, commits)
+        self.assertEqual(matrix.shape, (80, len(types)))
+        self.assertEqual(matrix.max(), 1)
+        pairs = cooccurrence_pairs(matrix, types).set_index(["source_a", "type_a", "source_b", "type_b"])
+
+        commit_sets = {key: set(group["commit_id"]) for key, group in events.groupby(["source", "refactoring_type"])}
+        checked = 0
+        for (a, set_a), (b, set_b) in itertools.combinations(commit_sets.items(), 2):
+            both = len(set_a & set_b)
+            key = (*a, *b) if (*a, *b) in pairs.index else (*b, *a)
+            if both == 0:
+                self.assertNotIn(key, pairs.index)
+                continue
+            row = pairs.loc[key]
+            self.assertEqual(row["cooccurrence"], both)
+            self.assertAlmostEqual(row["jaccard"], both / len(set_a | set_b))
+            self.assertAlmostEqual(row["lift"], both * 80 / (len(set_a) * len(set_b)))
+            checked += 1
+        self.assertGreater(checked, 20)
+
+    def test_commit_population(self):
+        """指定したコミット以外の出来事は除き、出来事の無いコミットも行として数えることをテストする"""
+        events = pd.DataFrame([("a", "test", "X"), ("a", "general", "Y"), ("a", "general", "Y"), ("b", "test", "X"),
+                               ("z", "general", "Y")], columns=EVENT_COLUMNS)
+        matrix, commit_index, types = incidence_matrix(events, ["a", "b", "c", "d"])
+        self.assertEqual(list(commit_index), ["a", "b", "c", "d"])
+        pairs = cooccurrence_pairs(matrix, types)
+        self.assertEqual(len(pairs), 1)
+        self.assertEqual(pairs.loc[0, "cooccurrence"], 1)
+        self.assertEqual(pairs.loc[0, "lift"], 1 * 4 / (2 * 1))
+        cross = top_pairs(pairs, "lift", min_cooccurrence=1, cross_source_only=True)
+        self.assertEqual(len(cross), 1)
+
+    def test_annotation_events(self):
+        annotations = compact_annotations(
+            pd.DataFrame({"url": ["https://github.com/o/r/commit/abc"], "type_name": ["Split Test Method"]}))
+        self.assertEqual(annotation_events(annotations).values.tolist(), [["abc", "test", "Split Test Method"]])
+
+    def test_scales_without_dense_pairs(self):
+        """疎なデータでは行列が疎のまま、共起した組だけが返ること (密な種類×種類の表を作らないこと) をテストする"""
+        events = random_events(20_000, 10_000, 200, seed=1)
+        matrix, _, types = incidence_matrix(events)
+        pairs = cooccurrence_pairs(matrix, types)
+        distinct = events.drop_duplicates()
+        self.assertTrue(sparse.isspmatrix_csr(matrix))
+        self.assertEqual(matrix.shape, (events["commit_id"].nunique(), 400))
+        self.assertEqual(matrix.nnz, len(distinct))
+        # 同じコミットに現れた種類の組だけが返り、その数は全ての組の数よりずっと少ない
+        same_commit = distinct.merge(distinct, on="commit_id")
+        a = same_commit["source_x"] + "/" + same_commit["refactoring_type_x"]
+        b = same_commit["source_y"] + "/" + same_commit["refactoring_type_y"]
+        self.assertEqual(len(pairs), len(pd.DataFrame({"a": a, "b": b})[a < b].drop_duplicates()))
+        self.assertLess(len(pairs), 400 * 399 // 2)
+        self.assertEqual(pairs["cooccurrence"].max(), pairs["cooccurrence"].iloc[0])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from refactoring_stream import stream_sample_refactorings
+
+
+def refactoring_csv(path, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    commits = [f"{i:040x}" for i in range(50)]
+    pd.DataFrame({
+        "refactoring_id": np.arange(n_rows),
+        "refactoring_commit_id": rng.choice(commits, n_rows),
+        "refactoring_hash": rng.integers(0, 30, n_rows).astype(str),
+        "refactoring_name": rng.choice(["RENAME_METHOD", "EXTRACT_OPERATION", "MOVE_CLASS"], n_rows),
+        "description": "x" * 20,
+    }).to_csv(path, index=False)
+    return commits
+
+
+class TestStreamSampleRefactorings(unittest.TestCase):
+    """refactoring_stream.pyの分割読み込みのユニットテスト"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "refactorings_output.csv")
+        self.commits = refactoring_csv(self.path, 5000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_whole_file(self):
+        """分割して読んでもファイル全体を読んで抽出・重複排除した結果と一致することをテストする"""
+        sample = set(self.commits[::3])
+        whole = pd.read_csv(self.path, dtype=str)
+        matched = whole[whole["refactoring_commit_id"].isin(sample)]
+        expected = matched.drop_duplicates(subset=["refactoring_commit_id", "refactoring_hash"])
+        for chunksize in [7, 1000, 100_000]:
+            with self.subTest(chunksize=chunksize):
+                result = stream_sample_refactorings(self.path, sample, chunksize=chunksize)
+                pd.testing.assert_frame_equal(
+                    result.refactorings,
+                    expected[["refactoring_commit_id", "refactoring_hash", "refactoring_name"]].reset_index(drop=True))
+                self.assertEqual(result.matched_rows, len(matched))
+                self.assertEqual(result.total_rows, 5000)
+
+    def test_no_matching_commits(self):
+        result = stream_sample_refactorings(self.path, {"unknown"}, chunksize=500)
+        self.assertTrue(result.refactorings.empty)
+        self.assertEqual(list(result.refactorings.columns),
+                         ["refactoring_commit_id", "refactoring_hash", "refactoring_name"])
+        self.assertEqual(result.matched_rows, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
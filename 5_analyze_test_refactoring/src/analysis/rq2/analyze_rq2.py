@@ -1,7 +1,13 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from annotation_data import load_annotations
+
+# 重いライブラリは使う関数の中で初めてimportする
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
 
 # データのディレクトリ
 BASE_DIR = "/Users/horikawa/Dev/Research-repo/InvestigatingTheImpactOfTestSpecificRefactoring"
@@ -17,10 +23,10 @@ def analyze_test_refactoring(df):
     1コミットあたりのリファクタリング回数を分析し、統計情報をCSVに保存する
     """
     # 各コミットにおけるリファクタリングの種類ごとの出現回数を集計
-    refactoring_counts_per_commit = df.groupby(['commit_id', 'type_name']).size().reset_index(name='count')
+    refactoring_counts_per_commit = df.groupby(['commit_id', 'type_name'], observed=True).size().reset_index(name='count')
 
     # 1コミットあたりのリファクタリング回数を分析
-    summary_stats = refactoring_counts_per_commit.groupby('type_name')['count'].describe()
+    summary_stats = refactoring_counts_per_commit.groupby('type_name', observed=True)['count'].describe()
 
     # 統計情報をCSVに保存
     summary_csv_path = f"{RESULTS_DIR}/test_refactoring_per_commit_summary.csv"
@@ -63,7 +69,7 @@ def plot_refactoring_distribution(refactoring_counts_per_commit, summary_stats):
 def main():
     # JSONファイルを読み込む
     json_file_path = f"{JSON_DIR}/annotation_result_2024-02-20.json"
-    df = pd.read_json(json_file_path)
+    df = load_annotations(json_file_path)
 
     # データ分析
     refactoring_counts_per_commit, summary_stats = analyze_test_refactoring(df)
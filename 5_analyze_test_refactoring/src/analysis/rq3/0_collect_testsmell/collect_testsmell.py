@@ -1,6 +1,7 @@
 import logging
 import os
 import subprocess
+import sys
 from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import argparse
@@ -8,6 +9,9 @@ import platform
 import fcntl
 import time
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from annotation_data import load_annotations
+
 # --- 設定 ---
 def get_default_base_dir():
     """実行OSに応じてデフォルトのBASE_DIRを返す"""
@@ -34,7 +38,7 @@ def setup_logging(log_file="logfile.log"):
 # --- コアロジック ---
 def get_refactoring_data_from_annotation_data(results_dir):
     """アノテーションデータからリファクタリングデータを取得する"""
-    return pd.read_json(f"{results_dir}/annotation_result_2024-02-20.json")
+    return load_annotations(f"{results_dir}/annotation_result_2024-02-20.json")
 
 
 def get_parent_commit_id(df, commit_id):
@@ -1,10 +1,20 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from scipy.stats import wilcoxon, norm
-from statsmodels.stats.multitest import multipletests
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from smell_tables import load_wide_tables
+from smell_pairs import load_paired_tables
+from batched_wilcoxon import grouped_wilcoxon
+
+# 重いライブラリは使う関数の中で初めてimportする
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+wilcoxon = lazy_import("scipy.stats", "wilcoxon")
+norm = lazy_import("scipy.stats", "norm")
+multipletests = lazy_import("statsmodels.stats.multitest", "multipletests")
 
 # Directory settings
 BASE_DIR = "/Users/horikawa/Dev/Research-repo/InvestigatingTheImpactOfTestSpecificRefactoring"
@@ -16,33 +26,80 @@ os.makedirs(RESULTS_DIR, exist_ok=True)
 
 
 def load_data():
-    """Load the dataset from a CSV file."""
-    file_level_path = f"{CSV_DIR}/file_level_wide.csv"
-    method_level_path = f"{CSV_DIR}/method_level_wide.csv"
-    file_df = pd.read_csv(file_level_path)
-    method_df = pd.read_csv(method_level_path)
-    return file_df, method_df
+    """Load the dataset (typed Parquet/Feather if present, otherwise CSV)."""
+    return load_wide_tables(CSV_DIR)
 
 
-def preprocess_data(df):
+def summarize_change_patterns(df, by):
     """
-    Reshape data to ensure before/after values are paired for each commit, type, and test smell.
+    Change patterns of every group of `by` in one grouped aggregation:
+    improvement / degradation / no-change counts and rates, and the paired
+    Cohen's d over the changed pairs (0 with fewer than two changed pairs or
+    no spread). One row per group in order of first appearance in df.
     """
-    test_smell_columns = [col for col in df.columns if "_diff" in col]
-    before_cols = [col.replace("_diff", "_before") for col in test_smell_columns]
-    after_cols = [col.replace("_diff", "_after") for col in test_smell_columns]
-    data = []
-    for idx, row in df.iterrows():
-        for smell, before_col, after_col in zip(test_smell_columns, before_cols, after_cols):
-            data.append({
-                "commit_url": row["commit_url"],
-                "type_name": row["type_name"],
-                "test_smell": smell.replace("_diff", ""),
-                "before_value": row[before_col] if pd.notnull(row[before_col]) else 0,
-                "after_value": row[after_col] if pd.notnull(row[after_col]) else 0,
-                "diff_value": row[smell] if pd.notnull(row[smell]) else 0
-            })
-    return pd.DataFrame(data)
+    by = [by] if isinstance(by, str) else list(by)
+    before = df["before_value"].to_numpy(dtype="float64")
+    after = df["after_value"].to_numpy(dtype="float64")
+    diff = after - before
+    changed_diff = np.where(diff != 0, diff, np.nan)
+    work = pd.DataFrame({
+        **{col: df[col].to_numpy() for col in by},
+        "improvements": after < before,
+        "degradations": after > before,
+        "no_changes": after == before,
+        "changed_diff": changed_diff,
+        "position": np.arange(len(df)),
+    })
+    grouped = work.groupby(by, observed=True, sort=False)
+    summary = grouped.agg(
+        total_pairs=("position", "size"),
+        improvements=("improvements", "sum"),
+        degradations=("degradations", "sum"),
+        no_changes=("no_changes", "sum"),
+        changed_pairs=("changed_diff", "count"),
+        changed_mean=("changed_diff", "mean"),
+        first_position=("position", "min"),
+    )
+    # np.stdと同じ母標準偏差
+    summary["changed_std"] = grouped["changed_diff"].std(ddof=0)
+    summary = summary.sort_values("first_position").reset_index()
+
+    total = summary["total_pairs"]
+    summary["improvement_rate"] = summary["improvements"] / total * 100
+    summary["degradation_rate"] = summary["degradations"] / total * 100
+    summary["no_change_rate"] = summary["no_changes"] / total * 100
+    std = summary["changed_std"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        summary["effect_size"] = np.where((summary["changed_pairs"] > 1) & (std > 0),
+                                          summary["changed_mean"] / std, 0.0)
+    summary[by] = summary[by].astype(object)
+    return summary[by + ["total_pairs", "improvements", "degradations", "no_changes",
+                         "improvement_rate", "degradation_rate", "no_change_rate", "effect_size", "changed_pairs"]]
+
+
+def summarize_type_smell_changes(df, min_changed=5):
+    """
+    summarize_change_patterns per (type_name, test_smell), grouped by type in
+    order of first appearance, with the Wilcoxon signed-rank test on the
+    changed pairs of groups with at least `min_changed` of them (p_value None
+    otherwise) and its significance at 0.05.
+    """
+    by_type = summarize_change_patterns(df, "type_name")
+    details = summarize_change_patterns(df, ["type_name", "test_smell"])
+    # 出現順のタイプごとにまとめる (タイプ内はスメルの出現順のまま)
+    type_order = pd.Series(np.arange(len(by_type)), index=by_type["type_name"])
+    details = details.iloc[np.argsort(details["type_name"].map(type_order).to_numpy(), kind="stable")]
+
+    changed = df[df["after_value"] != df["before_value"]]
+    tests = grouped_wilcoxon(changed, ["type_name", "test_smell"])
+    tests = tests.loc[tests["total_pairs"] >= min_changed, ["type_name", "test_smell", "p_value"]]
+    details = details.merge(tests, on=["type_name", "test_smell"], how="left")
+    details["significant"] = details["p_value"] < 0.05
+    details["p_value"] = details["p_value"].astype(object).where(details["p_value"].notna(), None)
+    details = details.rename(columns={"total_pairs": "total"})
+    return by_type, details[["type_name", "test_smell", "total", "improvements", "degradations", "no_changes",
+                             "improvement_rate", "degradation_rate", "no_change_rate", "effect_size",
+                             "p_value", "significant"]]
 
 
 def analyze_change_patterns(df, level):
@@ -50,53 +107,18 @@ def analyze_change_patterns(df, level):
     Analyze patterns of change (improvement, degradation, no change) for each test smell.
     """
     print(f"\n=== Change Pattern Analysis for {level} Level ===")
-    
-    results = []
-    
-    for test_smell in df["test_smell"].unique():
-        subset = df[df["test_smell"] == test_smell]
-        
-        # Calculate change patterns
-        improvements = (subset["after_value"] < subset["before_value"]).sum()
-        degradations = (subset["after_value"] > subset["before_value"]).sum()
-        no_changes = (subset["after_value"] == subset["before_value"]).sum()
-        total = len(subset)
-        
-        # Calculate percentages
-        improvement_rate = improvements / total * 100
-        degradation_rate = degradations / total * 100
-        no_change_rate = no_changes / total * 100
-        
-        # Calculate effect size (Cohen's d for paired samples)
-        if improvements + degradations > 0:  # Only if there are changes
-            changed_subset = subset[subset["after_value"] != subset["before_value"]]
-            if len(changed_subset) > 1:
-                diff = changed_subset["after_value"] - changed_subset["before_value"]
-                effect_size = np.mean(diff) / np.std(diff) if np.std(diff) > 0 else 0
-            else:
-                effect_size = 0
-        else:
-            effect_size = 0
-        
-        results.append({
-            "test_smell": test_smell,
-            "total_pairs": total,
-            "improvements": improvements,
-            "degradations": degradations,
-            "no_changes": no_changes,
-            "improvement_rate": improvement_rate,
-            "degradation_rate": degradation_rate,
-            "no_change_rate": no_change_rate,
-            "effect_size": effect_size,
-            "has_changes": improvements + degradations > 0
-        })
-        
-        print(f"{test_smell}:")
-        print(f"  Total: {total}, Improvements: {improvements} ({improvement_rate:.1f}%), "
-              f"Degradations: {degradations} ({degradation_rate:.1f}%), "
-              f"No change: {no_changes} ({no_change_rate:.1f}%)")
-    
-    return pd.DataFrame(results)
+
+    # 全スメルの変化パターンを1回のgroupbyで集計する
+    results = summarize_change_patterns(df, "test_smell").drop(columns="changed_pairs")
+    results["has_changes"] = results["improvements"] + results["degradations"] > 0
+
+    for row in results.itertuples(index=False):
+        print(f"{row.test_smell}:")
+        print(f"  Total: {row.total_pairs}, Improvements: {row.improvements} ({row.improvement_rate:.1f}%), "
+              f"Degradations: {row.degradations} ({row.degradation_rate:.1f}%), "
+              f"No change: {row.no_changes} ({row.no_change_rate:.1f}%)")
+
+    return results
 
 
 def analyze_by_refactoring_type(df, level):
@@ -104,95 +126,30 @@ def analyze_by_refactoring_type(df, level):
     Analyze change patterns by refactoring type and save as CSV, including Wilcoxon p-value and significance.
     """
     print(f"\n=== Change Pattern Analysis by Refactoring Type for {level} Level ===")
-    
+
+    # タイプごと・(タイプ, スメル)ごとの集計とWilcoxon検定をまとめて計算する
+    by_type, detailed_df = summarize_type_smell_changes(df)
+    smell_results = {type_name: group.to_dict("records")
+                     for type_name, group in detailed_df.groupby("type_name", sort=False)}
+
     results = []
-    detailed_rows = []
-    
-    for type_name in df["type_name"].unique():
-        type_data = df[df["type_name"] == type_name]
-        total_pairs = len(type_data)
-        improvements = (type_data["after_value"] < type_data["before_value"]).sum()
-        degradations = (type_data["after_value"] > type_data["before_value"]).sum()
-        no_changes = (type_data["after_value"] == type_data["before_value"]).sum()
-        improvement_rate = improvements / total_pairs * 100
-        degradation_rate = degradations / total_pairs * 100
-        no_change_rate = no_changes / total_pairs * 100
-        smell_results = []
-        for test_smell in type_data["test_smell"].unique():
-            smell_data = type_data[type_data["test_smell"] == test_smell]
-            smell_improvements = (smell_data["after_value"] < smell_data["before_value"]).sum()
-            smell_degradations = (smell_data["after_value"] > smell_data["before_value"]).sum()
-            smell_no_changes = (smell_data["after_value"] == smell_data["before_value"]).sum()
-            smell_total = len(smell_data)
-            # 効果量（Cohen's d）
-            if smell_improvements + smell_degradations > 0:
-                changed = smell_data[smell_data["after_value"] != smell_data["before_value"]]
-                if len(changed) > 1:
-                    diff = changed["after_value"] - changed["before_value"]
-                    effect_size = np.mean(diff) / np.std(diff) if np.std(diff) > 0 else 0
-                else:
-                    effect_size = 0
-            else:
-                effect_size = 0
-            # Wilcoxon検定
-            if smell_improvements + smell_degradations > 0 and len(smell_data[smell_data["after_value"] != smell_data["before_value"]]) >= 5:
-                changed = smell_data[smell_data["after_value"] != smell_data["before_value"]]
-                try:
-                    from scipy.stats import wilcoxon
-                    stat, p_value = wilcoxon(changed["before_value"], changed["after_value"])
-                    significant = p_value < 0.05
-                except Exception:
-                    p_value = None
-                    significant = False
-            else:
-                p_value = None
-                significant = False
-            smell_results.append({
-                "type_name": type_name,
-                "test_smell": test_smell,
-                "total": smell_total,
-                "improvements": smell_improvements,
-                "degradations": smell_degradations,
-                "no_changes": smell_no_changes,
-                "improvement_rate": smell_improvements / smell_total * 100 if smell_total > 0 else 0,
-                "degradation_rate": smell_degradations / smell_total * 100 if smell_total > 0 else 0,
-                "no_change_rate": smell_no_changes / smell_total * 100 if smell_total > 0 else 0,
-                "effect_size": effect_size,
-                "p_value": p_value,
-                "significant": significant
-            })
-            # CSV用に詳細行を追加
-            detailed_rows.append({
-                "type_name": type_name,
-                "test_smell": test_smell,
-                "total": smell_total,
-                "improvements": smell_improvements,
-                "degradations": smell_degradations,
-                "no_changes": smell_no_changes,
-                "improvement_rate": smell_improvements / smell_total * 100 if smell_total > 0 else 0,
-                "degradation_rate": smell_degradations / smell_total * 100 if smell_total > 0 else 0,
-                "no_change_rate": smell_no_changes / smell_total * 100 if smell_total > 0 else 0,
-                "effect_size": effect_size,
-                "p_value": p_value,
-                "significant": significant
-            })
+    for row in by_type.itertuples(index=False):
         results.append({
-            "type_name": type_name,
-            "total_pairs": total_pairs,
-            "improvements": improvements,
-            "degradations": degradations,
-            "no_changes": no_changes,
-            "improvement_rate": improvement_rate,
-            "degradation_rate": degradation_rate,
-            "no_change_rate": no_change_rate,
-            "smell_details": smell_results
+            "type_name": row.type_name,
+            "total_pairs": row.total_pairs,
+            "improvements": row.improvements,
+            "degradations": row.degradations,
+            "no_changes": row.no_changes,
+            "improvement_rate": row.improvement_rate,
+            "degradation_rate": row.degradation_rate,
+            "no_change_rate": row.no_change_rate,
+            "smell_details": smell_results[row.type_name]
         })
-        print(f"{type_name}:")
-        print(f"  Total: {total_pairs}, Improvements: {improvements} ({improvement_rate:.1f}%), "
-              f"Degradations: {degradations} ({degradation_rate:.1f}%), "
-              f"No change: {no_changes} ({no_change_rate:.1f}%)")
+        print(f"{row.type_name}:")
+        print(f"  Total: {row.total_pairs}, Improvements: {row.improvements} ({row.improvement_rate:.1f}%), "
+              f"Degradations: {row.degradations} ({row.degradation_rate:.1f}%), "
+              f"No change: {row.no_changes} ({row.no_change_rate:.1f}%)")
     # 詳細をCSVで保存
-    detailed_df = pd.DataFrame(detailed_rows)
     detailed_df.to_csv(f"{RESULTS_DIR}/refactoring_type_testsmell_summary_{level}.csv", index=False)
     return results
 
@@ -255,32 +212,8 @@ def perform_statistical_tests(df, level):
     os.makedirs(RESULTS_DIR, exist_ok=True)
 
     def load_data():
-        """Load the dataset from a CSV file."""
-        file_level_path = f"{CSV_DIR}/file_level_wide.csv"
-        method_level_path = f"{CSV_DIR}/method_level_wide.csv"
-        file_df = pd.read_csv(file_level_path)
-        method_df = pd.read_csv(method_level_path)
-        return file_df, method_df
-
-    def preprocess_data(df):
-        """
-        Reshape data to ensure before/after values are paired for each commit, type, and test smell.
-        """
-        test_smell_columns = [col for col in df.columns if "_diff" in col]
-        before_cols = [col.replace("_diff", "_before") for col in test_smell_columns]
-        after_cols = [col.replace("_diff", "_after") for col in test_smell_columns]
-        data = []
-        for idx, row in df.iterrows():
-            for smell, before_col, after_col in zip(test_smell_columns, before_cols, after_cols):
-                data.append({
-                    "commit_url": row["commit_url"],
-                    "type_name": row["type_name"],
-                    "test_smell": smell.replace("_diff", ""),
-                    "before_value": row[before_col] if pd.notnull(row[before_col]) else 0,
-                    "after_value": row[after_col] if pd.notnull(row[after_col]) else 0,
-                    "diff_value": row[smell] if pd.notnull(row[smell]) else 0
-                })
-        return pd.DataFrame(data)
+        """Load the dataset (typed Parquet/Feather if present, otherwise CSV)."""
+        return load_wide_tables(CSV_DIR)
 
     def analyze_change_patterns(df, level):
         """
@@ -288,52 +221,17 @@ def perform_statistical_tests(df, level):
         """
         print(f"\n=== Change Pattern Analysis for {level} Level ===")
 
-        results = []
-
-        for test_smell in df["test_smell"].unique():
-            subset = df[df["test_smell"] == test_smell]
+        # 全スメルの変化パターンを1回のgroupbyで集計する
+        results = summarize_change_patterns(df, "test_smell").drop(columns="changed_pairs")
+        results["has_changes"] = results["improvements"] + results["degradations"] > 0
 
-            # Calculate change patterns
-            improvements = (subset["after_value"] < subset["before_value"]).sum()
-            degradations = (subset["after_value"] > subset["before_value"]).sum()
-            no_changes = (subset["after_value"] == subset["before_value"]).sum()
-            total = len(subset)
-
-            # Calculate percentages
-            improvement_rate = improvements / total * 100
-            degradation_rate = degradations / total * 100
-            no_change_rate = no_changes / total * 100
-
-            # Calculate effect size (Cohen's d for paired samples)
-            if improvements + degradations > 0:  # Only if there are changes
-                changed_subset = subset[subset["after_value"] != subset["before_value"]]
-                if len(changed_subset) > 1:
-                    diff = changed_subset["after_value"] - changed_subset["before_value"]
-                    effect_size = np.mean(diff) / np.std(diff) if np.std(diff) > 0 else 0
-                else:
-                    effect_size = 0
-            else:
-                effect_size = 0
+        for row in results.itertuples(index=False):
+            print(f"{row.test_smell}:")
+            print(f"  Total: {row.total_pairs}, Improvements: {row.improvements} ({row.improvement_rate:.1f}%), "
+                  f"Degradations: {row.degradations} ({row.degradation_rate:.1f}%), "
+                  f"No change: {row.no_changes} ({row.no_change_rate:.1f}%)")
 
-            results.append({
-                "test_smell": test_smell,
-                "total_pairs": total,
-                "improvements": improvements,
-                "degradations": degradations,
-                "no_changes": no_changes,
-                "improvement_rate": improvement_rate,
-                "degradation_rate": degradation_rate,
-                "no_change_rate": no_change_rate,
-                "effect_size": effect_size,
-                "has_changes": improvements + degradations > 0
-            })
-
-            print(f"{test_smell}:")
-            print(f"  Total: {total}, Improvements: {improvements} ({improvement_rate:.1f}%), "
-                  f"Degradations: {degradations} ({degradation_rate:.1f}%), "
-                  f"No change: {no_changes} ({no_change_rate:.1f}%)")
-
-        return pd.DataFrame(results)
+        return results
 
     def analyze_by_refactoring_type(df, level):
         """
@@ -341,95 +239,29 @@ def perform_statistical_tests(df, level):
         """
         print(f"\n=== Change Pattern Analysis by Refactoring Type for {level} Level ===")
 
+        # タイプごと・(タイプ, スメル)ごとの集計とWilcoxon検定をまとめて計算する
+        by_type, detailed_df = summarize_type_smell_changes(df)
+        smell_results = {type_name: group.to_dict("records")
+                         for type_name, group in detailed_df.groupby("type_name", sort=False)}
+
         results = []
-        detailed_rows = []
-
-        for type_name in df["type_name"].unique():
-            type_data = df[df["type_name"] == type_name]
-            total_pairs = len(type_data)
-            improvements = (type_data["after_value"] < type_data["before_value"]).sum()
-            degradations = (type_data["after_value"] > type_data["before_value"]).sum()
-            no_changes = (type_data["after_value"] == type_data["before_value"]).sum()
-            improvement_rate = improvements / total_pairs * 100
-            degradation_rate = degradations / total_pairs * 100
-            no_change_rate = no_changes / total_pairs * 100
-            smell_results = []
-            for test_smell in type_data["test_smell"].unique():
-                smell_data = type_data[type_data["test_smell"] == test_smell]
-                smell_improvements = (smell_data["after_value"] < smell_data["before_value"]).sum()
-                smell_degradations = (smell_data["after_value"] > smell_data["before_value"]).sum()
-                smell_no_changes = (smell_data["after_value"] == smell_data["before_value"]).sum()
-                smell_total = len(smell_data)
-                # 効果量（Cohen's d）
-                if smell_improvements + smell_degradations > 0:
-                    changed = smell_data[smell_data["after_value"] != smell_data["before_value"]]
-                    if len(changed) > 1:
-                        diff = changed["after_value"] - changed["before_value"]
-                        effect_size = np.mean(diff) / np.std(diff) if np.std(diff) > 0 else 0
-                    else:
-                        effect_size = 0
-                else:
-                    effect_size = 0
-                # Wilcoxon検定
-                if smell_improvements + smell_degradations > 0 and len(
-                        smell_data[smell_data["after_value"] != smell_data["before_value"]]) >= 5:
-                    changed = smell_data[smell_data["after_value"] != smell_data["before_value"]]
-                    try:
-                        from scipy.stats import wilcoxon
-                        stat, p_value = wilcoxon(changed["before_value"], changed["after_value"])
-                        significant = p_value < 0.05
-                    except Exception:
-                        p_value = None
-                        significant = False
-                else:
-                    p_value = None
-                    significant = False
-                smell_results.append({
-                    "type_name": type_name,
-                    "test_smell": test_smell,
-                    "total": smell_total,
-                    "improvements": smell_improvements,
-                    "degradations": smell_degradations,
-                    "no_changes": smell_no_changes,
-                    "improvement_rate": smell_improvements / smell_total * 100 if smell_total > 0 else 0,
-                    "degradation_rate": smell_degradations / smell_total * 100 if smell_total > 0 else 0,
-                    "no_change_rate": smell_no_changes / smell_total * 100 if smell_total > 0 else 0,
-                    "effect_size": effect_size,
-                    "p_value": p_value,
-                    "significant": significant
-                })
-                # CSV用に詳細行を追加
-                detailed_rows.append({
-                    "type_name": type_name,
-                    "test_smell": test_smell,
-                    "total": smell_total,
-                    "improvements": smell_improvements,
-                    "degradations": smell_degradations,
-                    "no_changes": smell_no_changes,
-                    "improvement_rate": smell_improvements / smell_total * 100 if smell_total > 0 else 0,
-                    "degradation_rate": smell_degradations / smell_total * 100 if smell_total > 0 else 0,
-                    "no_change_rate": smell_no_changes / smell_total * 100 if smell_total > 0 else 0,
-                    "effect_size": effect_size,
-                    "p_value": p_value,
-                    "significant": significant
-                })
+        for row in by_type.itertuples(index=False):
             results.append({
-                "type_name": type_name,
-                "total_pairs": total_pairs,
-                "improvements": improvements,
-                "degradations": degradations,
-                "no_changes": no_changes,
-                "improvement_rate": improvement_rate,
-                "degradation_rate": degradation_rate,
-                "no_change_rate": no_change_rate,
-                "smell_details": smell_results
+                "type_name": row.type_name,
+                "total_pairs": row.total_pairs,
+                "improvements": row.improvements,
+                "degradations": row.degradations,
+                "no_changes": row.no_changes,
+                "improvement_rate": row.improvement_rate,
+                "degradation_rate": row.degradation_rate,
+                "no_change_rate": row.no_change_rate,
+                "smell_details": smell_results[row.type_name]
             })
-            print(f"{type_name}:")
-            print(f"  Total: {total_pairs}, Improvements: {improvements} ({improvement_rate:.1f}%), "
-                  f"Degradations: {degradations} ({degradation_rate:.1f}%), "
-                  f"No change: {no_changes} ({no_change_rate:.1f}%)")
+            print(f"{row.type_name}:")
+            print(f"  Total: {row.total_pairs}, Improvements: {row.improvements} ({row.improvement_rate:.1f}%), "
+                  f"Degradations: {row.degradations} ({row.degradation_rate:.1f}%), "
+                  f"No change: {row.no_changes} ({row.no_change_rate:.1f}%)")
         # 詳細をCSVで保存
-        detailed_df = pd.DataFrame(detailed_rows)
         detailed_df.to_csv(f"{RESULTS_DIR}/refactoring_type_testsmell_summary_{level}.csv", index=False)
         return results
 
@@ -522,12 +354,9 @@ def perform_statistical_tests(df, level):
 
     def main():
         """Main function to execute the descriptive analysis."""
-        # Load data
-        file_df_raw, method_df_raw = load_data()
-
-        # Preprocess data
-        file_df = preprocess_data(file_df_raw)
-        method_df = preprocess_data(method_df_raw)
+        # Load data, paired per commit, type and test smell
+        # (read as-is from the long table if present, otherwise reshaped from the wide tables)
+        file_df, method_df = load_paired_tables(CSV_DIR)
 
         # Analyze change patterns
         file_patterns = analyze_change_patterns(file_df, "file")
@@ -605,12 +434,9 @@ def perform_statistical_tests(df, level):
 
 def main():
     """Main function to execute the descriptive analysis."""
-    # Load data
-    file_df_raw, method_df_raw = load_data()
-    
-    # Preprocess data
-    file_df = preprocess_data(file_df_raw)
-    method_df = preprocess_data(method_df_raw)
+    # Load data, paired per commit, type and test smell
+    # (read as-is from the long table if present, otherwise reshaped from the wide tables)
+    file_df, method_df = load_paired_tables(CSV_DIR)
     
     # Analyze change patterns
     file_patterns = analyze_change_patterns(file_df, "file")
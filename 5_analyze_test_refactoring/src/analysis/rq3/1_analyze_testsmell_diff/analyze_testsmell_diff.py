@@ -1,14 +1,19 @@
 import argparse
 import os
+import pandas as pd
 from testsmell_data_loader import (
     load_annotation_data, load_commit_data, get_parent_commit_url, load_smell_csv, load_smell_json
 )
+from annotation_elements import load_annotation_elements, side_elements, element_file_names
 from testsmell_diff_calculator import (
-    calculate_file_level_diff, calculate_method_level_diff, build_wide_row, build_json_object, FILE_SMELL_COLUMNS
+    calculate_file_level_diff, bulk_method_level_counts, counts_by_refactoring, method_smell_frame,
+    build_wide_row, build_json_object, FILE_SMELL_COLUMNS
 )
 from testsmell_diff_writer import (
-    write_csv, write_json
+    write_csv, write_json, write_typed_table, NDJSONWriter, build_long_frame, write_long_table
 )
+from diff_manifest import DiffManifest
+from smell_store import SmellStore
 
 def main():
     """
@@ -21,6 +26,20 @@ def main():
     parser.add_argument("--output-dir", type=str, default=".", help="Output directory for result files.")
     parser.add_argument("--annotation-json", type=str, required=True, help="Path to annotation JSON file.")
     parser.add_argument("--commit-csv", type=str, required=True, help="Path to commit info CSV file.")
+    parser.add_argument("--json-format", type=str, choices=["ndjson", "json"], default="ndjson",
+                        help="ndjson streams one object per line; json writes a single indented array at the end.")
+    parser.add_argument("--compression", type=str, choices=["gzip", "zstd"], default=None,
+                        help="Compression for the NDJSON output.")
+    parser.add_argument("--typed-format", type=str, choices=["parquet", "feather", "none"], default="parquet",
+                        help="Also write the wide tables in a typed columnar format (requires pyarrow).")
+    parser.add_argument("--long-format", type=str, choices=["parquet", "feather", "csv", "none"], default="none",
+                        help="Also write both levels as one tidy long table (test_smell_long.<format>).")
+    parser.add_argument("--manifest", type=str, default=None,
+                        help="Path to the input manifest (default: <output-dir>/diff_manifest.json).")
+    parser.add_argument("--full", action="store_true",
+                        help="Ignore the manifest and recompute every row.")
+    parser.add_argument("--smell-store", type=str, default=None,
+                        help="Read smell results from a store built by smell_store.py instead of per-commit files.")
     args = parser.parse_args()
 
     os.makedirs(args.output_dir, exist_ok=True)
@@ -28,39 +47,128 @@ def main():
     # Load annotation and commit data
     annotation_df = load_annotation_data(args.annotation_json)
     commit_df = load_commit_data(args.commit_csv)
+    # One row per annotated element, flattened once and cached next to the outputs
+    elements = load_annotation_elements(args.annotation_json, cache_dir=args.output_dir)
+    elements_by_id = dict(tuple(elements.groupby("refactoring_id", sort=False)))
+    no_elements = elements.iloc[0:0]
+
+    # Rows whose inputs are unchanged since the last run are reused from the manifest
+    manifest = DiffManifest(args.manifest or os.path.join(args.output_dir, "diff_manifest.json"))
+    if args.full:
+        manifest.rows = {}
+    smell_dir = os.path.join(args.base_dir, "5_analyze_test_refactoring/TestSmellDetector/results/smells")
+    store = SmellStore(args.smell_store) if args.smell_store else None
 
     file_level_rows = []
     method_level_rows = []
     json_results = []
+    json_writer = None
+    if args.json_format == "ndjson":
+        suffix = {"gzip": ".gz", "zstd": ".zst"}.get(args.compression, "")
+        json_writer = NDJSONWriter(os.path.join(args.output_dir, f"test_smell_analysis.ndjson{suffix}"),
+                                   compression=args.compression)
+
+    completed = False
+    try:
+        # Pass 1: file-level counts per row; method-level counts of recomputed rows are deferred
+        rows = []
+        pending = []
+        method_file_names = {}
+        grouped = annotation_df.groupby("url", observed=True)
+        for commit_url, group in grouped:
+            parent_commit_url = get_parent_commit_url(commit_url, commit_df)
+            if parent_commit_url is None:
+                continue
+            for refactoring_id, row in group.iterrows():
+                type_name = row.get("type_name", "UnknownRefactoring")
+                row_elements = elements_by_id.get(refactoring_id, no_elements)
+                # Prepare commit dir names (replace as needed)
+                commit_dir = commit_url.replace("https://github.com/", "").replace("commit/", "")
+                parent_commit_dir = parent_commit_url.replace("https://github.com/", "").replace("commit/", "")
+                if store is not None:
+                    smell_digests = store.commit_digests(parent_commit_dir) + store.commit_digests(commit_dir)
+                else:
+                    smell_paths = [
+                        os.path.join(smell_dir, parent_commit_dir, "smells_number.csv"),
+                        os.path.join(smell_dir, parent_commit_dir, "smells_result.json"),
+                        os.path.join(smell_dir, commit_dir, "smells_number.csv"),
+                        os.path.join(smell_dir, commit_dir, "smells_result.json"),
+                    ]
+                    smell_digests = tuple(manifest.file_digest(p) for p in smell_paths)
+                row_key = manifest.row_key(commit_url, type_name, row_elements, smell_digests)
+                cached = manifest.get(row_key)
+                if cached is not None:
+                    rows.append((commit_url, type_name, refactoring_id, row_key) + cached)
+                    continue
+                if store is not None:
+                    before_df = store.load_smell_csv(parent_commit_dir)
+                    after_df = store.load_smell_csv(commit_dir)
+                else:
+                    before_df = load_smell_csv(smell_paths[0])
+                    after_df = load_smell_csv(smell_paths[2])
+                file_counts = calculate_file_level_diff(row_elements, before_df, after_df)
+                rows.append((commit_url, type_name, refactoring_id, row_key, file_counts, None))
+                # Method smells are loaded once per commit, only for the annotated files
+                pending.append((refactoring_id, parent_commit_dir, commit_dir))
+                method_file_names.setdefault(parent_commit_dir, set()).update(
+                    element_file_names(side_elements(row_elements, "before")))
+                method_file_names.setdefault(commit_dir, set()).update(
+                    element_file_names(side_elements(row_elements, "after")))
+
+        # Method-level counts of every recomputed row in a single interval join
+        method_counts = {}
+        if pending:
+            entries_by_commit = {}
+            for commit_dir, names in method_file_names.items():
+                if store is not None:
+                    entries_by_commit[commit_dir] = store.load_smell_json(commit_dir, names)
+                else:
+                    entries_by_commit[commit_dir] = load_smell_json(
+                        os.path.join(smell_dir, commit_dir, "smells_result.json"), names)
+            pending_df = pd.DataFrame(pending, columns=["refactoring_id", "before", "after"])
+            ranges = elements.merge(pending_df, on="refactoring_id")
+            ranges["commit"] = ranges["before"].where(ranges["side"] == "before", ranges["after"])
+            method_counts = counts_by_refactoring(
+                bulk_method_level_counts(ranges, method_smell_frame(entries_by_commit)))
 
-    grouped = annotation_df.groupby("url")
-    for commit_url, group in grouped:
-        parent_commit_url = get_parent_commit_url(commit_url, commit_df)
-        if parent_commit_url is None:
-            continue
-        for _, row in group.iterrows():
-            type_name = row.get("type_name", "UnknownRefactoring")
-            parameter_data = row["parameter_data"]
-            # Prepare commit dir names (replace as needed)
-            commit_dir = commit_url.replace("https://github.com/", "").replace("commit/", "")
-            parent_commit_dir = parent_commit_url.replace("https://github.com/", "").replace("commit/", "")
-            # Load smell data
-            before_df = load_smell_csv(os.path.join(args.base_dir, "5_analyze_test_refactoring/TestSmellDetector/results/smells", parent_commit_dir, "smells_number.csv"))
-            after_df = load_smell_csv(os.path.join(args.base_dir, "5_analyze_test_refactoring/TestSmellDetector/results/smells", commit_dir, "smells_number.csv"))
-            before_json = load_smell_json(os.path.join(args.base_dir, "5_analyze_test_refactoring/TestSmellDetector/results/smells", parent_commit_dir, "smells_result.json"))
-            after_json = load_smell_json(os.path.join(args.base_dir, "5_analyze_test_refactoring/TestSmellDetector/results/smells", commit_dir, "smells_result.json"))
-            # Calculate diffs
-            before_file, after_file, diff_file = calculate_file_level_diff(parameter_data, before_df, after_df)
-            before_method, after_method, diff_method = calculate_method_level_diff(parameter_data, before_json, after_json)
-            # Build rows/objects
+        # Pass 2: build rows/objects in the original order
+        for commit_url, type_name, refactoring_id, row_key, file_counts, cached_method in rows:
+            before_file, after_file, diff_file = file_counts
+            if cached_method is not None:
+                before_method, after_method, diff_method = cached_method
+            else:
+                counts = method_counts.get(refactoring_id, {"before": {}, "after": {}})
+                before_method, after_method = counts["before"], counts["after"]
+                diff_method = {k: after_method.get(k, 0) - before_method.get(k, 0)
+                               for k in set(before_method) | set(after_method)}
+                manifest.put(row_key, file_counts, (before_method, after_method, diff_method))
             file_level_rows.append(build_wide_row(commit_url, type_name, before_file, after_file, diff_file))
             method_level_rows.append(build_wide_row(commit_url, type_name, before_method, after_method, diff_method))
-            json_results.append(build_json_object(commit_url, type_name, diff_file, before_file, after_file, diff_method, before_method, after_method))
+            json_obj = build_json_object(commit_url, type_name, diff_file, before_file, after_file, diff_method, before_method, after_method)
+            if json_writer is not None:
+                json_writer.write(json_obj)
+            else:
+                json_results.append(json_obj)
+        completed = True
+    finally:
+        if json_writer is not None:
+            json_writer.close()
+        # Only a complete run may drop unseen rows; after a failure keep the cached rows not reached yet
+        manifest.save(prune=completed)
+        if store is not None:
+            store.close()
 
     # Write results
     write_csv(file_level_rows, os.path.join(args.output_dir, "file_level_wide.csv"))
     write_csv(method_level_rows, os.path.join(args.output_dir, "method_level_wide.csv"))
-    write_json(json_results, os.path.join(args.output_dir, "test_smell_analysis.json"))
+    if args.typed_format != "none":
+        write_typed_table(file_level_rows, os.path.join(args.output_dir, f"file_level_wide.{args.typed_format}"))
+        write_typed_table(method_level_rows, os.path.join(args.output_dir, f"method_level_wide.{args.typed_format}"))
+    if args.long_format != "none":
+        write_long_table([build_long_frame(file_level_rows, "file"), build_long_frame(method_level_rows, "method")],
+                         os.path.join(args.output_dir, f"test_smell_long.{args.long_format}"))
+    if json_writer is None:
+        write_json(json_results, os.path.join(args.output_dir, "test_smell_analysis.json"))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
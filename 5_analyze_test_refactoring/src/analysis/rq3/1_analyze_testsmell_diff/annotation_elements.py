@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow
+except ImportError:  # キャッシュはpyarrowが無ければpickleで保存する
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+ELEMENT_COLUMNS = [
+    "refactoring_id", "side", "kind_index", "element_kind", "element_index", "element_type",
+    "path", "basename", "start_line", "end_line", "start_column", "end_column"
+]
+
+
+def flatten_parameter_data(parameter_data, refactoring_id=0):
+    """
+    Flatten one annotation's parameter_data
+    (before/after -> {method, invocation, code fragment, ...} -> elements -> location -> range)
+    into a list of element records. Elements without a location are dropped.
+    kind_index/element_index keep the original order of the keys and elements.
+    """
+    if isinstance(parameter_data, str):
+        parameter_data = json.loads(parameter_data)
+    if not isinstance(parameter_data, dict):
+        return []
+    records = []
+    for side in ("before", "after"):
+        for kind_index, (kind, data_dict) in enumerate((parameter_data.get(side) or {}).items()):
+            for element_index, elem in enumerate(data_dict.get("elements", [])):
+                if not elem or elem.get("location") is None:
+                    continue
+                location = elem["location"]
+                rng = location.get("range") or {}
+                path = location.get("path")
+                records.append((
+                    refactoring_id, side, kind_index, kind, element_index, elem.get("type"),
+                    path, os.path.basename(path) if path else None,
+                    rng.get("startLine"), rng.get("endLine"), rng.get("startColumn"), rng.get("endColumn")
+                ))
+    return records
+
+
+def to_element_frame(records):
+    """Build the typed element table from flattened records."""
+    df = pd.DataFrame.from_records(records, columns=ELEMENT_COLUMNS)
+    df["refactoring_id"] = df["refactoring_id"].astype("int32")
+    df["side"] = pd.Categorical(df["side"], categories=["before", "after"])
+    for col in ("element_kind", "element_type"):
+        df[col] = df[col].astype("category")
+    for col in ("kind_index", "element_index"):
+        df[col] = df[col].astype("int16")
+    for col in ("start_line", "end_line", "start_column", "end_column"):
+        df[col] = df[col].astype("Int32")
+    return df
+
+
+def build_element_table(annotation_df):
+    """
+    Flatten every annotation row into one table with one row per element.
+    refactoring_id is the row's index in the annotation data.
+    """
+    records = []
+    for refactoring_id, parameter_data in annotation_df["parameter_data"].items():
+        records.extend(flatten_parameter_data(parameter_data, refactoring_id))
+    return to_element_frame(records)
+
+
+def as_element_table(elements):
+    """Accept either element rows or a raw parameter_data dict/JSON string."""
+    if isinstance(elements, pd.DataFrame):
+        return elements
+    return to_element_frame(flatten_parameter_data(elements))
+
+
+def side_elements(elements, side):
+    """Element rows of one side ("before" or "after")."""
+    return elements[elements["side"] == side]
+
+
+def element_file_names(elements):
+    """Basenames of the files referenced by the given element rows."""
+    return set(elements["basename"].dropna())
+
+
+def load_annotation_elements(json_path, cache_dir=None):
+    """
+    Load the element table for annotation_result_*.json, building it once and
+    caching it on disk keyed by the JSON file's content hash.
+    """
+    h = hashlib.sha256()
+    with open(json_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()[:16]
+    cache_dir = cache_dir or os.path.dirname(os.path.abspath(json_path))
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    suffix = ".parquet" if pyarrow is not None else ".pkl"
+    cache_path = os.path.join(cache_dir, f"{stem}.elements.{digest}{suffix}")
+    if os.path.isfile(cache_path):
+        return pd.read_parquet(cache_path) if suffix == ".parquet" else pd.read_pickle(cache_path)
+
+    elements = build_element_table(pd.read_json(json_path))
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if suffix == ".parquet":
+            elements.to_parquet(cache_path, index=False)
+        else:
+            elements.to_pickle(cache_path)
+        logger.info(f"Cached annotation elements to {cache_path}")
+    except OSError as e:
+        logger.warning(f"Could not cache annotation elements to {cache_path}: {e}")
+    return elements
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 2
+
+
+def _to_builtin(counts):
+    """Convert numpy scalars in a counts dict to plain Python numbers."""
+    return {k: (v.item() if hasattr(v, "item") else v) for k, v in counts.items()}
+
+
+class DiffManifest:
+    """
+    Content-hash manifest for the smell diff stage.
+
+    Every smell file is fingerprinted by its SHA-256 (re-hashed only when its
+    size or mtime changes), and every annotation row by the hash of its
+    element rows (see annotation_elements) plus the fingerprints of the four
+    smell files it reads.
+    Computed counts are stored per row fingerprint, so a rerun only
+    recomputes rows whose inputs changed and reuses the rest.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self.rows = {}
+        self._used_rows = set()
+        self._used_files = set()
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.isfile(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.files = data.get("files", {})
+                    self.rows = data.get("rows", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable manifest {path}: {e}")
+
+    def file_digest(self, path):
+        """
+        Return the SHA-256 of a file, or "missing" if it does not exist.
+        """
+        self._used_files.add(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return "missing"
+        entry = self.files.get(path)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            return entry["sha256"]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        digest = h.hexdigest()
+        self.files[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def row_key(self, commit_url, type_name, elements, smell_digests):
+        """
+        Fingerprint of one annotation row: its identity, its element rows
+        (without refactoring_id, so reordering the annotations keeps the key)
+        and the digests of the smell data it depends on (see file_digest).
+        """
+        h = hashlib.sha256()
+        h.update(commit_url.encode("utf-8"))
+        h.update(str(type_name).encode("utf-8"))
+        h.update(elements.drop(columns="refactoring_id").to_json(orient="values").encode("utf-8"))
+        for digest in smell_digests:
+            h.update(digest.encode("ascii"))
+        return h.hexdigest()
+
+    def get(self, key):
+        """
+        Return the cached (file_counts, method_counts) for a row, or None.
+        Each is a (before, after, diff) tuple of dicts.
+        """
+        entry = self.rows.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used_rows.add(key)
+        return tuple(entry["file"]), tuple(entry["method"])
+
+    def put(self, key, file_counts, method_counts):
+        self._used_rows.add(key)
+        self.rows[key] = {
+            "file": [_to_builtin(c) for c in file_counts],
+            "method": [_to_builtin(c) for c in method_counts],
+        }
+
+    def save(self, prune=True):
+        """
+        Write the manifest. With prune, rows and files not seen in this run
+        are dropped; without it (e.g. after an interrupted run) every
+        cached row is kept.
+        """
+        data = {
+            "version": MANIFEST_VERSION,
+            "files": {p: e for p, e in self.files.items() if not prune or p in self._used_files},
+            "rows": {k: v for k, v in self.rows.items() if not prune or k in self._used_rows},
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        logger.info(f"Manifest saved to {self.path} ({self.hits} reused, {self.misses} recomputed)")
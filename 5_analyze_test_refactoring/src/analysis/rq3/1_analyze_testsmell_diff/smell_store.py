@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever SCHEMA changes; stores written with another version are rebuilt by the next ingest
+STORE_VERSION = 2
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    csv_dtypes TEXT,
+    csv_stat TEXT,
+    json_stat TEXT,
+    csv_sha256 TEXT,
+    json_sha256 TEXT,
+    PRIMARY KEY (repo, sha)
+);
+CREATE TABLE IF NOT EXISTS file_rows (
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    path TEXT
+);
+CREATE INDEX IF NOT EXISTS file_rows_key ON file_rows (repo, sha, path);
+CREATE TABLE IF NOT EXISTS method_smells (
+    repo TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    path TEXT NOT NULL,
+    smell_name TEXT,
+    parent_type TEXT,
+    begin_line INTEGER,
+    end_line INTEGER
+);
+CREATE INDEX IF NOT EXISTS method_smells_key ON method_smells (repo, sha, path);
+"""
+
+
+def split_commit_dir(commit_dir):
+    """'owner/repo/sha' -> ('owner/repo', 'sha')"""
+    repo, _, sha = commit_dir.strip("/").rpartition("/")
+    return repo, sha
+
+
+def _stat_key(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _open_for_ingest(store_path):
+    """Open the store for writing, dropping the tables of a store written with another STORE_VERSION."""
+    conn = sqlite3.connect(store_path)
+    if conn.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+        for table in ("commits", "file_rows", "method_smells"):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def iter_commit_dirs(smell_dir):
+    """Yield 'owner/repo/sha' for every commit directory under `smell_dir`."""
+    for owner in sorted(os.scandir(smell_dir), key=lambda e: e.name):
+        if not owner.is_dir():
+            continue
+        for repo in sorted(os.scandir(owner.path), key=lambda e: e.name):
+            if not repo.is_dir():
+                continue
+            for commit in sorted(os.scandir(repo.path), key=lambda e: e.name):
+                if commit.is_dir():
+                    yield f"{owner.name}/{repo.name}/{commit.name}"
+
+
+def _delete_commit(conn, repo, sha):
+    for table in ("commits", "file_rows", "method_smells"):
+        conn.execute(f"DELETE FROM {table} WHERE repo = ? AND sha = ?", (repo, sha))
+
+
+def ingest_smell_results(smell_dir, store_path, force=False):
+    """
+    Pack every results/smells/<owner>/<repo>/<sha>/ directory into one SQLite
+    store. Commits whose smells_number.csv and smells_result.json are unchanged
+    (same size and mtime) since the last ingest are skipped unless `force`;
+    commits whose directory no longer exists are deleted from the store.
+    Returns the number of commits (re)ingested.
+    """
+    conn = _open_for_ingest(store_path)
+    file_columns = {row[1] for row in conn.execute("PRAGMA table_info(file_rows)")}
+    known = {(r, s): (c, j) for r, s, c, j in conn.execute("SELECT repo, sha, csv_stat, json_stat FROM commits")}
+    ingested = 0
+    try:
+        for commit_dir in iter_commit_dirs(smell_dir):
+            repo, sha = split_commit_dir(commit_dir)
+            last_stat = known.pop((repo, sha), None)
+            csv_path = os.path.join(smell_dir, commit_dir, "smells_number.csv")
+            json_path = os.path.join(smell_dir, commit_dir, "smells_result.json")
+            csv_stat, json_stat = _stat_key(csv_path), _stat_key(json_path)
+            if not force and last_stat == (csv_stat, json_stat):
+                continue
+
+            _delete_commit(conn, repo, sha)
+
+            csv_dtypes = None
+            if csv_stat is not None:
+                try:
+                    df = pd.read_csv(csv_path)
+                except Exception as e:
+                    logger.error(f"Failed to load CSV file: {csv_path} - {e}")
+                    df = pd.DataFrame()
+                csv_dtypes = {col: str(dtype) for col, dtype in df.dtypes.items()}
+                for col in csv_dtypes:
+                    if col not in file_columns:
+                        conn.execute(f"ALTER TABLE file_rows ADD COLUMN {_quote(col)}")
+                        file_columns.add(col)
+                if not df.empty:
+                    placeholders = ", ".join("?" * (len(csv_dtypes) + 3))
+                    names = ", ".join(["repo", "sha", "path"] + [_quote(c) for c in df.columns])
+                    values = df.astype(object).where(df.notna(), None).values.tolist()
+                    # pathはTestFilePathの写し (ファイル単位の索引用)
+                    path_at = df.columns.get_loc("TestFilePath") if "TestFilePath" in df.columns else None
+                    conn.executemany(f"INSERT INTO file_rows ({names}) VALUES ({placeholders})",
+                                     [[repo, sha, v[path_at] if path_at is not None else None] + v for v in values])
+
+            if json_stat is not None:
+                try:
+                    with open(json_path, "r", encoding="utf-8") as f:
+                        entries = json.load(f)
+                except Exception as e:
+                    logger.error(f"Failed to load JSON file: {json_path} - {e}")
+                    entries = []
+                conn.executemany(
+                    "INSERT INTO method_smells VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(repo, sha, entry["testFilePath"], s.get("smellName"), s.get("smellParentType"),
+                      s.get("beginLine"), s.get("endLine"))
+                     for entry in entries for s in entry.get("smells", [])]
+                )
+
+            conn.execute(
+                "INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (repo, sha, json.dumps(csv_dtypes) if csv_dtypes is not None else None,
+                 csv_stat, json_stat,
+                 _sha256(csv_path) if csv_stat is not None else None,
+                 _sha256(json_path) if json_stat is not None else None)
+            )
+            ingested += 1
+            if ingested % 100 == 0:
+                conn.commit()
+                logger.info(f"Ingested {ingested} commits")
+        # 残りはディスク上から消えたコミット
+        for repo, sha in known:
+            _delete_commit(conn, repo, sha)
+        if known:
+            logger.info(f"Removed {len(known)} commits no longer under {smell_dir}")
+        conn.commit()
+    finally:
+        conn.close()
+    return ingested
+
+
+class SmellStore:
+    """
+    Read-only access to a store built by ingest_smell_results, through a
+    single open SQLite connection. Results mirror load_smell_csv and
+    load_smell_json for the corresponding per-commit files.
+    """
+
+    def __init__(self, store_path):
+        self.conn = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != STORE_VERSION:
+            self.conn.close()
+            raise ValueError(f"{store_path} was written with store version {version}, expected {STORE_VERSION}; "
+                             "re-run smell_store.py to rebuild it")
+        self._commits = {
+            (repo, sha): (json.loads(dtypes) if dtypes is not None else None, csv_hash, json_hash)
+            for repo, sha, dtypes, csv_hash, json_hash in
+            self.conn.execute("SELECT repo, sha, csv_dtypes, csv_sha256, json_sha256 FROM commits")
+        }
+
+    def close(self):
+        self.conn.close()
+
+    def has_csv(self, commit_dir):
+        info = self._commits.get(split_commit_dir(commit_dir))
+        return info is not None and info[0] is not None
+
+    def has_json(self, commit_dir):
+        info = self._commits.get(split_commit_dir(commit_dir))
+        return info is not None and info[2] is not None
+
+    def commit_digests(self, commit_dir):
+        """Content hashes of the commit's (csv, json) files, "missing" if absent."""
+        info = self._commits.get(split_commit_dir(commit_dir))
+        if info is None:
+            return "missing", "missing"
+        return info[1] or "missing", info[2] or "missing"
+
+    def load_smell_csv(self, commit_dir):
+        """
+        File-level rows of a commit as a DataFrame with the original CSV columns.
+        Returns an empty DataFrame if the commit has no smells_number.csv.
+        """
+        repo, sha = split_commit_dir(commit_dir)
+        info = self._commits.get((repo, sha))
+        if info is None or not info[0]:
+            return pd.DataFrame()
+        dtypes = info[0]
+        names = ", ".join(_quote(c) for c in dtypes)
+        df = pd.read_sql_query(f"SELECT {names} FROM file_rows WHERE repo = ? AND sha = ? ORDER BY rowid",
+                               self.conn, params=(repo, sha))
+        # SQLiteは列の型を持たないため、read_csvで推論された型に戻す (文字列列の欠損もNoneではなくNaN)
+        df = df.astype(dtypes)
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].notna(), np.nan)
+        return df
+
+    def load_smell_json(self, commit_dir, file_names=None):
+        """
+        Method smells of a commit in the smells_result.json entry layout.
+        If `file_names` is given, only files whose path ends with one of them are returned.
+        Entries without any smell are not stored and so not returned.
+        """
+        repo, sha = split_commit_dir(commit_dir)
+        query = ("SELECT path, smell_name, parent_type, begin_line, end_line FROM method_smells "
+                 "WHERE repo = ? AND sha = ?")
+        params = [repo, sha]
+        if file_names is not None:
+            file_names = list(file_names)
+            if not file_names:
+                return []
+            # endswith相当 (LIKEはASCIIの大文字小文字を区別しないので使わない)。空の名前は全ファイルに一致する
+            if "" not in file_names:
+                query += " AND EXISTS (SELECT 1 FROM json_each(?) WHERE substr(method_smells.path, -length(value)) = value)"
+                params.append(json.dumps(file_names))
+        rows = self.conn.execute(query + " ORDER BY rowid", params)
+        entries = {}
+        for path, name, parent_type, begin, end in rows:
+            entries.setdefault(path, []).append(
+                {"smellName": name, "smellParentType": parent_type, "beginLine": begin, "endLine": end})
+        return [{"testFilePath": path, "smells": smells} for path, smells in entries.items()]
+
+
+def main():
+    """Ingest all per-commit TestSmellDetector results into a single store."""
+    parser = argparse.ArgumentParser(description="Pack per-commit test smell results into one SQLite store.")
+    parser.add_argument("--base-dir", type=str, required=True, help="Base directory of the project.")
+    parser.add_argument("--store", type=str, default=None,
+                        help="Path of the store (default: <TestSmellDetector>/results/smells.sqlite).")
+    parser.add_argument("--force", action="store_true", help="Re-ingest commits even if unchanged.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    results_dir = os.path.join(args.base_dir, "5_analyze_test_refactoring/TestSmellDetector/results")
+    store_path = args.store or os.path.join(results_dir, "smells.sqlite")
+    count = ingest_smell_results(os.path.join(results_dir, "smells"), store_path, force=args.force)
+    logger.info(f"Ingested {count} commits into {store_path}")
+
+
+if __name__ == "__main__":
+    main()
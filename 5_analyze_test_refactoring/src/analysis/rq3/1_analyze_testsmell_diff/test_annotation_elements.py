@@ -0,0 +1,69 @@
+import json
+import os
+import tempfile
+import unittest
+
+from annotation_elements import (
+    flatten_parameter_data, load_annotation_elements, to_element_frame, side_elements, element_file_names
+)
+from testsmell_diff_calculator import calculate_method_level_diff
+
+
+def _elem(path, start, end):
+    return {"type": "MethodDeclaration",
+            "location": {"path": path, "range": {"startLine": start, "endLine": end, "startColumn": 1, "endColumn": 2}}}
+
+
+PARAMETER_DATA = {
+    "before": {
+        "method": {"type": "MethodDeclaration", "elements": [_elem("src/test/FooTest.java", 10, 20), {"location": None}]},
+        "invocation": {"type": "MethodInvocation", "elements": [_elem("src/test/BarTest.java", 5, 6)]},
+    },
+    "after": {
+        "method": {"type": "MethodDeclaration", "elements": [{"location": {"path": "src/test/FooTest.java", "range": None}}]},
+    },
+}
+
+
+class TestAnnotationElements(unittest.TestCase):
+    """parameter_dataの要素展開のユニットテスト"""
+
+    def test_flatten_skips_missing_location(self):
+        """locationがNoneの要素は除かれ、元の順序が保たれることをテストする"""
+        records = flatten_parameter_data(PARAMETER_DATA, 7)
+        self.assertEqual([(r[1], r[3], r[4], r[7]) for r in records], [
+            ("before", "method", 0, "FooTest.java"),
+            ("before", "invocation", 0, "BarTest.java"),
+            ("after", "method", 0, "FooTest.java"),
+        ])
+        self.assertEqual(records[0][0], 7)
+        self.assertEqual(records[0][8:], (10, 20, 1, 2))
+        self.assertEqual(records[2][8:], (None, None, None, None))
+
+    def test_element_file_names(self):
+        """片側の要素から参照されるファイル名が取り出されることをテストする"""
+        elements = to_element_frame(flatten_parameter_data(PARAMETER_DATA))
+        self.assertEqual(element_file_names(side_elements(elements, "before")), {"FooTest.java", "BarTest.java"})
+        self.assertEqual(element_file_names(side_elements(elements, "after")), {"FooTest.java"})
+
+    def test_load_uses_cache(self):
+        """2回目以降はキャッシュから同じ表が読み込まれることをテストする"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            json_path = os.path.join(tmp_dir, "annotation.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump([{"url": "u", "parameter_data": PARAMETER_DATA}], f)
+            first = load_annotation_elements(json_path)
+            self.assertEqual(len([n for n in os.listdir(tmp_dir) if ".elements." in n]), 1)
+            second = load_annotation_elements(json_path)
+            self.assertTrue(first.equals(second))
+
+    def test_calculator_accepts_parameter_data(self):
+        """計算関数に生のparameter_dataを渡しても要素の表と同じ結果になることをテストする"""
+        entries = [{"testFilePath": "/r/src/test/FooTest.java",
+                    "smells": [{"smellName": "Eager Test", "smellParentType": "Method", "beginLine": 15, "endLine": 30}]}]
+        before, after, diff = calculate_method_level_diff(PARAMETER_DATA, entries, entries)
+        self.assertEqual((before, after, diff), ({"Eager Test": 1}, {}, {"Eager Test": -1}))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,122 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import analyze_testsmell_diff
+from diff_manifest import DiffManifest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+from generate_synthetic_data import generate, SMELL_DIR, ANNOTATION_JSON, SAMPLING_CSV
+
+COUNTS = ({"Lazy Test": 1}, {"Lazy Test": 0}, {"Lazy Test": -1})
+
+
+class TestDiffManifest(unittest.TestCase):
+    """diff_manifest.pyの保存と刈り込みのユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "diff_manifest.json")
+        manifest = DiffManifest(self.path)
+        for key in ("a", "b"):
+            manifest.put(key, COUNTS, COUNTS)
+        manifest.save()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_prune_drops_unseen_rows(self):
+        """完了した実行の保存では、使われなかった行を消すことをテストする"""
+        manifest = DiffManifest(self.path)
+        self.assertIsNotNone(manifest.get("a"))
+        manifest.save()
+        self.assertEqual(set(DiffManifest(self.path).rows), {"a"})
+
+    def test_interrupted_run_keeps_unseen_rows(self):
+        """途中で失敗した実行 (prune=False) では、まだ処理していない行のキャッシュを残すことをテストする"""
+        manifest = DiffManifest(self.path)
+        self.assertIsNotNone(manifest.get("a"))
+        manifest.put("c", COUNTS, COUNTS)
+        manifest.save(prune=False)
+        reloaded = DiffManifest(self.path)
+        self.assertEqual(set(reloaded.rows), {"a", "b", "c"})
+        self.assertEqual(reloaded.get("b"), (COUNTS, COUNTS))
+
+
+class RecordingManifest(DiffManifest):
+    """DiffManifest that keeps the instances created by analyze_testsmell_diff.main"""
+    instances = []
+
+    def __init__(self, path):
+        super().__init__(path)
+        RecordingManifest.instances.append(self)
+
+
+class TestIncrementalDiffRun(unittest.TestCase):
+    """マニフェストを使ったanalyze_testsmell_diff.mainの差分再計算のテスト"""
+
+    OUTPUTS = ("file_level_wide.csv", "method_level_wide.csv", "test_smell_analysis.ndjson")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = self.tmp_dir.name
+        generate(self.base_dir, commits=3, files_per_commit=4, smells_per_file=3,
+                 refactorings_per_commit=2, elements_per_refactoring=2, seed=1)
+        self.annotation_json = os.path.join(self.base_dir, ANNOTATION_JSON)
+        self.output_dir = os.path.join(self.base_dir, "out")
+        RecordingManifest.instances = []
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _run(self, output_dir, *extra):
+        argv = ["analyze_testsmell_diff.py", "--base-dir", self.base_dir, "--output-dir", output_dir,
+                "--annotation-json", self.annotation_json,
+                "--commit-csv", os.path.join(self.base_dir, SAMPLING_CSV), "--typed-format", "none", *extra]
+        with patch.object(sys, "argv", argv), \
+                patch.object(analyze_testsmell_diff, "DiffManifest", RecordingManifest):
+            analyze_testsmell_diff.main()
+        return RecordingManifest.instances[-1]
+
+    def test_only_changed_rows_are_recomputed(self):
+        """アノテーション1行とスメルファイル1つを変えると、影響する行だけが再計算され、--fullと同じ出力になることをテストする"""
+        first = self._run(self.output_dir)
+        self.assertEqual((first.hits, first.misses), (0, 6))
+        second = self._run(self.output_dir)
+        self.assertEqual((second.hits, second.misses), (6, 0))
+
+        with open(self.annotation_json, "r", encoding="utf-8") as f:
+            annotations = json.load(f)
+        # 1つ目のコミットの1行目: 要素の範囲を広げる
+        elements = [e for group in annotations[0]["parameter_data"]["after"].values() for e in group["elements"]]
+        elements[0]["location"]["range"]["endLine"] += 1000
+        with open(self.annotation_json, "w", encoding="utf-8") as f:
+            json.dump(annotations, f, ensure_ascii=False)
+        # 最後のコミット (2行が参照する): スメルを1つ追加する
+        commit_dir = annotations[-1]["url"].replace("https://github.com/", "").replace("commit/", "")
+        json_path = os.path.join(self.base_dir, SMELL_DIR, commit_dir, "smells_result.json")
+        with open(json_path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        entries[0]["smells"].append({"smellName": "Lazy Test", "smellParentType": "Method",
+                                     "beginLine": 1, "endLine": 100000})
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+
+        third = self._run(self.output_dir)
+        self.assertEqual((third.hits, third.misses), (3, 3))
+        full_dir = os.path.join(self.base_dir, "full")
+        full = self._run(full_dir, "--full")
+        self.assertEqual(full.misses, 6)
+        for name in self.OUTPUTS:
+            with self.subTest(name=name):
+                with open(os.path.join(full_dir, name), "rb") as f:
+                    expected = f.read()
+                with open(os.path.join(self.output_dir, name), "rb") as f:
+                    self.assertEqual(f.read(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+import analyze_testsmell_diff
+from smell_store import SmellStore, ingest_smell_results, iter_commit_dirs
+from testsmell_data_loader import load_smell_csv, load_smell_json
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+from generate_synthetic_data import generate, SMELL_DIR, ANNOTATION_JSON, SAMPLING_CSV
+
+
+class TestSmellStore(unittest.TestCase):
+    """smell_store.pyの統合ストアのユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = self.tmp_dir.name
+        generate(self.base_dir, commits=3, files_per_commit=4, smells_per_file=3,
+                 refactorings_per_commit=2, elements_per_refactoring=2, seed=1)
+        self.smell_dir = os.path.join(self.base_dir, SMELL_DIR)
+        # 欠損値・浮動小数・文字列の列を持つコミットと、ヘッダだけのCSVのコミット
+        nan_dir = os.path.join(self.smell_dir, "owner/other/nan")
+        os.makedirs(nan_dir)
+        with open(os.path.join(nan_dir, "smells_number.csv"), "w", encoding="utf-8") as f:
+            f.write("App,TestFilePath,Assertion Roulette,Ratio\n"
+                    "app,/r/src/test/ATest.java,1,0.5\n"
+                    "app,,,\n"
+                    "app,/r/src/test/BTest.java,3,\n")
+        with open(os.path.join(nan_dir, "smells_result.json"), "w", encoding="utf-8") as f:
+            json.dump([{"testFilePath": "/r/src/test/ATest.java", "smells": [
+                {"smellName": "Lazy Test", "smellParentType": "Method", "beginLine": 3, "endLine": 9}]}], f)
+        empty_dir = os.path.join(self.smell_dir, "owner/other/empty")
+        os.makedirs(empty_dir)
+        with open(os.path.join(empty_dir, "smells_number.csv"), "w", encoding="utf-8") as f:
+            f.write("App,TestFilePath,Assertion Roulette\n")
+        self.store_path = os.path.join(self.base_dir, "smells.sqlite")
+        self.commit_dirs = list(iter_commit_dirs(self.smell_dir))
+        self.assertEqual(ingest_smell_results(self.smell_dir, self.store_path), len(self.commit_dirs))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _open(self):
+        store = SmellStore(self.store_path)
+        self.addCleanup(store.close)
+        return store
+
+    def test_csv_round_trip(self):
+        """load_smell_csvがファイルから読んだ表と列・値・型まで一致することをテストする"""
+        store = self._open()
+        for commit_dir in self.commit_dirs:
+            with self.subTest(commit_dir=commit_dir):
+                expected = load_smell_csv(os.path.join(self.smell_dir, commit_dir, "smells_number.csv"))
+                pd.testing.assert_frame_equal(store.load_smell_csv(commit_dir), expected)
+
+    def test_json_round_trip(self):
+        """load_smell_jsonがファイルから読んだエントリ (スメルのあるもの) と一致することをテストする"""
+        store = self._open()
+        for commit_dir in self.commit_dirs:
+            json_path = os.path.join(self.smell_dir, commit_dir, "smells_result.json")
+            expected = [e for e in load_smell_json(json_path) if e["smells"]]
+            names = {os.path.basename(e["testFilePath"]) for e in expected[::2]}
+            with self.subTest(commit_dir=commit_dir):
+                self.assertEqual(store.load_smell_json(commit_dir), expected)
+                self.assertEqual(store.load_smell_json(commit_dir, names),
+                                 [e for e in load_smell_json(json_path, names) if e["smells"]])
+                self.assertEqual(store.load_smell_json(commit_dir, []), [])
+
+    def test_missing_files(self):
+        """存在しないファイルはhas_csv/has_jsonがFalseになり、空の結果が返ることをテストする"""
+        store = self._open()
+        self.assertTrue(store.has_csv("owner/other/empty"))
+        self.assertFalse(store.has_json("owner/other/empty"))
+        self.assertEqual(store.load_smell_json("owner/other/empty"), [])
+        self.assertTrue(store.load_smell_csv("owner/other/unknown").empty)
+        self.assertEqual(store.commit_digests("owner/other/unknown"), ("missing", "missing"))
+
+    def test_reingest_skips_unchanged(self):
+        """再取り込みでは変更のないコミットを飛ばし、変更されたコミットだけを取り込むことをテストする"""
+        self.assertEqual(ingest_smell_results(self.smell_dir, self.store_path), 0)
+        csv_path = os.path.join(self.smell_dir, "owner/other/nan/smells_number.csv")
+        with open(csv_path, "a", encoding="utf-8") as f:
+            f.write("app,/r/src/test/CTest.java,2,1.5\n")
+        self.assertEqual(ingest_smell_results(self.smell_dir, self.store_path), 1)
+        pd.testing.assert_frame_equal(self._open().load_smell_csv("owner/other/nan"), load_smell_csv(csv_path))
+
+    def test_reingest_removes_vanished_commits(self):
+        """ディスクから消えたコミットは再取り込みでストアから削除されることをテストする"""
+        shutil.rmtree(os.path.join(self.smell_dir, "owner/other/nan"))
+        self.assertEqual(ingest_smell_results(self.smell_dir, self.store_path), 0)
+        store = self._open()
+        self.assertFalse(store.has_csv("owner/other/nan"))
+        for table in ("commits", "file_rows", "method_smells"):
+            count = store.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE sha = 'nan'").fetchone()[0]
+            self.assertEqual(count, 0, table)
+
+    def _run_diff(self, output_dir, *extra):
+        argv = ["analyze_testsmell_diff.py", "--base-dir", self.base_dir, "--output-dir", output_dir,
+                "--annotation-json", os.path.join(self.base_dir, ANNOTATION_JSON),
+                "--commit-csv", os.path.join(self.base_dir, SAMPLING_CSV), "--typed-format", "none", *extra]
+        with patch.object(sys, "argv", argv):
+            analyze_testsmell_diff.main()
+
+    def test_diff_run_matches_files(self):
+        """--smell-storeを使った差分計算の出力がファイルから読んだ場合と一致することをテストする"""
+        file_dir = os.path.join(self.base_dir, "out_files")
+        store_dir = os.path.join(self.base_dir, "out_store")
+        self._run_diff(file_dir)
+        self._run_diff(store_dir, "--smell-store", self.store_path)
+        for name in ("file_level_wide.csv", "method_level_wide.csv", "test_smell_analysis.ndjson"):
+            with self.subTest(name=name):
+                with open(os.path.join(file_dir, name), "rb") as f:
+                    expected = f.read()
+                with open(os.path.join(store_dir, name), "rb") as f:
+                    self.assertEqual(f.read(), expected)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
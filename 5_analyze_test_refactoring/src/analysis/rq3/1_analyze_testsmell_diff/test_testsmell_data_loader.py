@@ -0,0 +1,51 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import testsmell_data_loader
+from testsmell_data_loader import iter_smell_entries, load_smell_json
+
+
+class TestStreamingSmellJson(unittest.TestCase):
+    """smells_result.jsonのストリーミング読み込みのユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.entries = [
+            {"testFilePath": "/repo/src/test/FooTest.java",
+             "smells": [{"smellName": "Eager Test", "smellParentType": "Method", "beginLine": 10, "endLine": 20}]},
+            # smellsがtestFilePathより先に現れる場合
+            {"smells": [{"smellName": "Lazy Test", "smellParentType": "Method", "beginLine": 1, "endLine": 2}],
+             "testFilePath": "/repo/src/test/BarTest.java", "extra": {"nested": [1, 2.5]}},
+            {"testFilePath": "/repo/src/test/BazTest.java", "smells": []},
+        ]
+        self.path = os.path.join(self.tmp_dir.name, "smells_result.json")
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_without_filter_returns_all_entries(self):
+        """フィルタなしでは全エントリがjson.loadと同じ内容で返ることをテストする"""
+        self.assertEqual(list(iter_smell_entries(self.path)), self.entries)
+
+    def test_filter_by_file_name_suffix(self):
+        """testFilePathの末尾一致でエントリが絞り込まれることをテストする"""
+        result = list(iter_smell_entries(self.path, {"BarTest.java", "FooTest.java"}))
+        self.assertEqual(result, self.entries[:2])
+
+    def test_fallback_without_ijson(self):
+        """ijsonが無い場合も同じ結果になることをテストする"""
+        with patch.object(testsmell_data_loader, "ijson", None):
+            self.assertEqual(list(iter_smell_entries(self.path, {"FooTest.java"})), self.entries[:1])
+
+    def test_missing_file_returns_empty_list(self):
+        """ファイルが存在しない場合は空リストを返すことをテストする"""
+        self.assertEqual(load_smell_json(os.path.join(self.tmp_dir.name, "missing.json")), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,64 @@
+import unittest
+
+from annotation_elements import flatten_parameter_data, to_element_frame
+from testsmell_diff_calculator import (
+    bulk_method_level_counts, counts_by_refactoring, method_smell_frame, calculate_method_level_diff
+)
+
+
+def _param(before, after):
+    def side(ranges):
+        return {"method": {"elements": [
+            {"location": {"path": f"src/{name}", "range": {"startLine": s, "endLine": e}}} for name, s, e in ranges
+        ]}}
+    return {"before": side(before), "after": side(after)}
+
+
+def _entry(name, *smells):
+    return {"testFilePath": f"/repo/src/{name}", "smells": [
+        {"smellName": n, "smellParentType": "Method", "beginLine": b, "endLine": e} for n, b, e in smells
+    ]}
+
+
+class TestBulkMethodLevelCounts(unittest.TestCase):
+    """区間結合によるメソッドレベルの一括集計のユニットテスト"""
+
+    def setUp(self):
+        self.commits = {
+            "parent": [_entry("FooTest.java", ("Eager Test", 1, 10), ("Eager Test", 12, 20), ("Lazy Test", 30, 40)),
+                       _entry("XFooTest.java", ("Lazy Test", 5, 11))],
+            "child": [_entry("FooTest.java", ("Eager Test", 1, 10), ("Magic Number Test", 8, 3))],
+        }
+        self.params = {
+            0: _param([("FooTest.java", 10, 12)], [("FooTest.java", 5, 9)]),
+            1: _param([("FooTest.java", 21, 29), ("FooTest.java", 25, 35)], [("FooTest.java", 2, 2)]),
+        }
+
+    def _ranges(self):
+        records = []
+        for refactoring_id, param in self.params.items():
+            records.extend(flatten_parameter_data(param, refactoring_id))
+        ranges = to_element_frame(records)
+        ranges["commit"] = ranges["side"].map({"before": "parent", "after": "child"}).astype(str)
+        return ranges
+
+    def test_bulk_matches_per_refactoring(self):
+        """一括集計の結果がリファクタリングごとの計算と一致することをテストする"""
+        counts = counts_by_refactoring(bulk_method_level_counts(self._ranges(), method_smell_frame(self.commits)))
+        for refactoring_id, param in self.params.items():
+            before, after, _ = calculate_method_level_diff(param, self.commits["parent"], self.commits["child"])
+            expected = {"before": before, "after": after}
+            self.assertEqual(counts.get(refactoring_id, {"before": {}, "after": {}}), expected)
+
+    def test_suffix_match_and_inverted_interval(self):
+        """ファイル名の末尾一致と、開始行>終了行の区間が元の判定通りに扱われることをテストする"""
+        counts = counts_by_refactoring(bulk_method_level_counts(self._ranges(), method_smell_frame(self.commits)))
+        # XFooTest.javaもFooTest.javaで終わるため数えられる
+        self.assertEqual(counts[0]["before"], {"Eager Test": 2, "Lazy Test": 1})
+        # (8, 3)のスメルは begin <= 9 かつ end >= 5 を満たさない
+        self.assertEqual(counts[0]["after"], {"Eager Test": 1})
+        self.assertEqual(counts[1]["before"], {"Lazy Test": 1})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import testsmell_diff_writer
+from testsmell_diff_writer import NDJSONWriter, iter_ndjson, build_long_frame, write_long_table, LONG_COLUMNS
+
+
+class TestNDJSONWriter(unittest.TestCase):
+    """testsmell_diff_writer.pyのNDJSON入出力のユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.records = [
+            {"commitUrl": "https://github.com/owner/repo/commit/abc", "typeName": "Rename Method",
+             "fileLevelSmells": [{"smellName": "Assertion Roulette", "before": 1, "after": 0, "diff": -1}],
+             "methodLevelSmells": []},
+            {"commitUrl": "https://github.com/owner/repo/commit/def", "typeName": "日本語のタイプ",
+             "fileLevelSmells": [], "methodLevelSmells": []},
+        ]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _roundtrip(self, filename, compression=None):
+        path = os.path.join(self.tmp_dir.name, filename)
+        with NDJSONWriter(path, compression=compression, flush_every=1) as writer:
+            for record in self.records:
+                writer.write(record)
+        self.assertEqual(list(iter_ndjson(path, compression=compression)), self.records)
+        return path
+
+    def test_plain_roundtrip(self):
+        """1行1オブジェクトで書き出され、そのまま読み戻せることをテストする"""
+        path = self._roundtrip("out.ndjson")
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), len(self.records))
+        self.assertNotIn(": ", lines[0])
+
+    def test_gzip_roundtrip_inferred_from_suffix(self):
+        """拡張子からgzip圧縮が選ばれることをテストする"""
+        path = self._roundtrip("out.ndjson.gz")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(2), b"\x1f\x8b")
+
+    @unittest.skipIf(testsmell_diff_writer.zstandard is None, "zstandard is not installed")
+    def test_zstd_roundtrip(self):
+        """zstd圧縮で書き出し・読み戻しができることをテストする"""
+        self._roundtrip("out.ndjson.zst", compression="zstd")
+
+    def test_flush_makes_records_visible(self):
+        """flush後は書き込み途中でも読み出せることをテストする"""
+        path = os.path.join(self.tmp_dir.name, "partial.ndjson")
+        writer = NDJSONWriter(path, flush_every=1)
+        try:
+            writer.write(self.records[0])
+            self.assertEqual(list(iter_ndjson(path)), self.records[:1])
+        finally:
+            writer.close()
+
+
+class TestLongFormat(unittest.TestCase):
+    """ロング形式出力のユニットテスト"""
+
+    def setUp(self):
+        self.rows = [
+            {"commit_url": "u1", "type_name": "Rename Method",
+             "Lazy Test_before": 1, "Lazy Test_after": 0, "Lazy Test_diff": -1,
+             "Eager Test_before": 2, "Eager Test_after": 3, "Eager Test_diff": 1},
+            {"commit_url": "u2", "type_name": "Extract Method",
+             "Lazy Test_before": 0, "Lazy Test_after": 0, "Lazy Test_diff": 0,
+             "Eager Test_before": None, "Eager Test_after": 1, "Eager Test_diff": 1},
+        ]
+
+    def test_build_long_frame_order(self):
+        """ワイド形式の行順・スメル順のまま1行1スメルに展開されることをテストする"""
+        df = build_long_frame(self.rows, "file")
+        self.assertEqual(list(df.columns), LONG_COLUMNS)
+        self.assertEqual(list(df["test_smell"]), ["Lazy Test", "Eager Test"] * 2)
+        self.assertEqual(list(df["commit_url"]), ["u1", "u1", "u2", "u2"])
+        self.assertEqual(list(df["diff"]), [-1, 1, 0, 1])
+        self.assertTrue(pd.isna(df["before"].iloc[3]))
+
+    def test_write_long_table_categorical(self):
+        """書き出した表の識別子列がカテゴリ型になることをテストする"""
+        if testsmell_diff_writer.pyarrow is None:
+            self.skipTest("pyarrow is not installed")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "test_smell_long.parquet")
+            self.assertTrue(write_long_table([build_long_frame(self.rows, "file"),
+                                              build_long_frame(self.rows, "method")], path))
+            df = pd.read_parquet(path)
+        self.assertEqual(len(df), 8)
+        for col in ("commit_url", "type_name", "level", "test_smell"):
+            self.assertEqual(str(df[col].dtype), "category")
+        self.assertEqual(list(df["level"].unique()), ["file", "method"])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,8 +1,24 @@
 import pandas as pd
 import os
+import sys
 import json
 import argparse
 import platform
+from smell_store import SmellStore
+from annotation_elements import load_annotation_elements, side_elements, element_file_names
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from annotation_data import load_annotations
+
+try:
+    import ijson  # イベント駆動のストリーミングパーサ (C backendがあれば自動で使われる)
+except ImportError:
+    ijson = None
+
+try:
+    import orjson  # ijsonが無い場合の高速な一括パーサ
+except ImportError:
+    orjson = None
 
 # --- 設定 ---
 def get_default_base_dir():
@@ -16,6 +32,7 @@ BASE_DIR = None
 TEST_SMELL_DIR = None
 ANNOTATION_RESULTS_DIR = None
 SAMPLING_CSV = None
+SMELL_STORE = None
 
 def set_paths(base_dir):
     """パスを設定する"""
@@ -25,6 +42,13 @@ def set_paths(base_dir):
     ANNOTATION_RESULTS_DIR = f"{BASE_DIR}/5_analyze_test_refactoring/src/results"
     SAMPLING_CSV = f"{BASE_DIR}/2_sampling_test_refactor_commits/result/sampling_test_commits_all.csv"
 
+def set_smell_store(store_path):
+    """統合ストア(smell_store.pyで作成)からテストスメルを読み込むように設定する"""
+    global SMELL_STORE
+    if SMELL_STORE is not None:
+        SMELL_STORE.close()
+    SMELL_STORE = SmellStore(store_path) if store_path else None
+
 def extract_method_smells(entries, start_line, end_line, file_name):
     method_smells = {}
     for entry in entries:
@@ -40,10 +64,15 @@ def extract_method_smells(entries, start_line, end_line, file_name):
     return method_smells
 
 def load_testsmell_data(level="file"):
-    df_ann = pd.read_json(f"{ANNOTATION_RESULTS_DIR}/annotation_result_2024-02-20.json")
+    annotation_json = f"{ANNOTATION_RESULTS_DIR}/annotation_result_2024-02-20.json"
+    df_ann = load_annotations(annotation_json)
+    # parameter_dataを要素ごとに展開した表 (キャッシュ済みならそれを使う)
+    elements = load_annotation_elements(annotation_json)
+    elements_by_id = dict(tuple(elements.groupby("refactoring_id", sort=False)))
+    no_elements = elements.iloc[0:0]
     df_commits = pd.read_csv(SAMPLING_CSV)
     results = []
-    for _, row in df_ann.iterrows():
+    for refactoring_id, row in df_ann.iterrows():
         commit_url = row["url"]
         commit_id = commit_url.split("/")[-1]
         repo_url = "/".join(commit_url.split("/")[:5])
@@ -53,64 +82,58 @@ def load_testsmell_data(level="file"):
         parent_commit_id = parent_row["parent_commit_id"].iloc[0]
         parent_commit_url = f"{repo_url}/commit/{parent_commit_id}"
 
-        # parameter_dataを取得
-        param_data = row.get("parameter_data", {})
+        # このリファクタリングの要素
+        row_elements = elements_by_id.get(refactoring_id, no_elements)
 
-        def load_counts(url, param_data):
+        def load_counts(url, side):
             commit_dir = url.replace("https://github.com/", "").replace("commit/", "")
+            side = side[side["basename"].notna()]
             if level == "file":
                 csv_path = os.path.join(TEST_SMELL_DIR, "results", "smells", commit_dir, "smells_number.csv")
-                if not os.path.isfile(csv_path):
-                    print("Not Found: "+ csv_path)
-                    return {}, csv_path
-                df = pd.read_csv(csv_path)
+                if SMELL_STORE is not None:
+                    if not SMELL_STORE.has_csv(commit_dir):
+                        print("Not Found: "+ csv_path)
+                        return {}, csv_path
+                    df = SMELL_STORE.load_smell_csv(commit_dir)
+                else:
+                    if not os.path.isfile(csv_path):
+                        print("Not Found: "+ csv_path)
+                        return {}, csv_path
+                    df = pd.read_csv(csv_path)
                 total_counts = {}
-                processed_files = set()
-                # parameter_dataのelementsに含まれるファイルのみ
-                for data_type, data_dict in param_data.items():
-                    elements = data_dict.get("elements", [])
-                    for elem in elements:
-                        if not elem or "location" not in elem or elem["location"] is None:
-                            continue
-                        file_path = elem["location"]["path"]
-                        file_name = os.path.basename(file_path)
-                        if file_name in processed_files:
-                            continue
-                        processed_files.add(file_name)
-                        matches = df[df["TestFilePath"].str.endswith(file_name, na=False)]
-                        for _, row2 in matches.iterrows():
-                            for col in df.select_dtypes(include=["number"]).columns:
-                                value = row2.get(col, 0)
-                                total_counts[col] = total_counts.get(col, 0) + value
+                numeric_columns = df.select_dtypes(include=["number"]).columns
+                # 要素に含まれるファイルのみ
+                for file_name in side["basename"].drop_duplicates():
+                    matches = df[df["TestFilePath"].str.endswith(file_name, na=False)]
+                    if matches.empty:
+                        continue
+                    for col in numeric_columns:
+                        value = matches[col].sum(skipna=False).item()
+                        total_counts[col] = total_counts.get(col, 0) + value
                 return total_counts, csv_path
             elif level == "method":
                 json_path = os.path.join(TEST_SMELL_DIR, "results", "smells", commit_dir, "smells_result.json")
-                if not os.path.isfile(json_path):
-                    return {}, json_path
-                with open(json_path, encoding="utf-8") as f:
-                    data = json.load(f)
+                if SMELL_STORE is not None:
+                    if not SMELL_STORE.has_json(commit_dir):
+                        return {}, json_path
+                    data = SMELL_STORE.load_smell_json(commit_dir, element_file_names(side))
+                else:
+                    if not os.path.isfile(json_path):
+                        return {}, json_path
+                    data = list(iter_smell_entries(json_path, element_file_names(side)))
                 total_counts = {}
-                # parameter_dataのelementsに含まれる範囲のみ
-                for data_type, data_dict in param_data.items():
-                    elements = data_dict.get("elements", [])
-                    for elem in elements:
-                        if not elem or "location" not in elem or elem["location"] is None:
-                            continue
-                        file_path = elem["location"]["path"]
-                        file_name = os.path.basename(file_path)
-                        rng = elem["location"].get("range")
-                        if rng:
-                            start_line = rng.get("startLine")
-                            end_line = rng.get("endLine")
-                            method_smells = extract_method_smells(data, start_line, end_line, file_name)
-                            for k, v in method_smells.items():
-                                total_counts[k] = total_counts.get(k, 0) + v
+                # 要素に含まれる範囲のみ
+                ranged = side[side["start_line"].notna() & side["end_line"].notna()]
+                for file_name, start_line, end_line in ranged[["basename", "start_line", "end_line"]].itertuples(index=False):
+                    method_smells = extract_method_smells(data, start_line, end_line, file_name)
+                    for k, v in method_smells.items():
+                        total_counts[k] = total_counts.get(k, 0) + v
                 return total_counts, json_path
             else:
                 raise ValueError("levelは 'file' または 'method' を指定してください")
 
-        before, before_path = load_counts(parent_commit_url, param_data.get("before", {}))
-        after, after_path = load_counts(commit_url, param_data.get("after", {}))
+        before, before_path = load_counts(parent_commit_url, side_elements(row_elements, "before"))
+        after, after_path = load_counts(commit_url, side_elements(row_elements, "after"))
         results.append({
             "commit_url": commit_url,
             "type_name": row.get("type_name", ""),
@@ -125,17 +148,20 @@ def main():
     """テスト用のメイン関数"""
     parser = argparse.ArgumentParser(description="Load test smell data.")
     parser.add_argument("--base-dir", type=str, default=get_default_base_dir(), help="Base directory of the project.")
+    parser.add_argument("--smell-store", type=str, default=None, help="Path to the consolidated smell store.")
     args = parser.parse_args()
     
     set_paths(args.base_dir)
+    set_smell_store(args.smell_store)
     print(f"Loaded test smell data with base directory: {BASE_DIR}")
 
 def load_annotation_data(json_path):
     """
     Load refactoring annotation data from a JSON file.
-    Returns a pandas DataFrame.
+    Returns the compact DataFrame of annotation_data.load_annotations
+    (parameter_data is in the element table, see annotation_elements).
     """
-    return pd.read_json(json_path)
+    return load_annotations(json_path)
 
 def load_commit_data(csv_path):
     """
@@ -167,14 +193,61 @@ def load_smell_csv(csv_path):
     except Exception:
         return pd.DataFrame()
 
-def load_smell_json(json_path):
+def _wanted(path, file_names):
+    return file_names is None or any(path.endswith(name) for name in file_names)
+
+def _iter_entries_ijson(f, file_names):
+    """
+    Parse a smells_result.json array event by event. The "smells" array of an
+    entry whose testFilePath is already known to be unwanted is skipped
+    without being built.
+    """
+    entry, key, builder = None, None, None
+    for prefix, event, value in ijson.parse(f, use_float=True):
+        if prefix == "item":
+            if event == "start_map":
+                entry, key, builder = {}, None, None
+                continue
+            if builder is not None:
+                entry[key] = builder.value
+            if event == "map_key":
+                key = value
+                skip = key == "smells" and "testFilePath" in entry and not _wanted(entry["testFilePath"], file_names)
+                builder = None if skip else ijson.ObjectBuilder()
+            elif event == "end_map":
+                if _wanted(entry.get("testFilePath", ""), file_names):
+                    yield entry
+                entry, key, builder = None, None, None
+        elif builder is not None:
+            builder.event(event, value)
+
+def iter_smell_entries(json_path, file_names=None):
+    """
+    Lazily yield the entries of a smells_result.json whose testFilePath ends
+    with one of `file_names` (all entries if None). Uses ijson when installed,
+    otherwise orjson or json to parse the whole file. Raises on missing or
+    malformed files.
+    """
+    if file_names is not None:
+        file_names = list(file_names)
+    if ijson is not None:
+        with open(json_path, "rb") as f:
+            yield from _iter_entries_ijson(f, file_names)
+        return
+    with open(json_path, "rb") as f:
+        data = orjson.loads(f.read()) if orjson is not None else json.load(f)
+    for entry in data:
+        if _wanted(entry["testFilePath"], file_names):
+            yield entry
+
+def load_smell_json(json_path, file_names=None):
     """
     Load method-level test smell data from a JSON file.
+    If file_names is given, only entries for those files are kept.
     Returns a list of dicts. Returns empty list if not found.
     """
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return list(iter_smell_entries(json_path, file_names))
     except Exception:
         return []
 
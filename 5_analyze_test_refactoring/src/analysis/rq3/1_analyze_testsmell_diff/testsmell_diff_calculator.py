@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
 import logging
-from collections import defaultdict
+from annotation_elements import as_element_table, side_elements
 
 logger = logging.getLogger(__name__)
 
@@ -39,67 +40,184 @@ def save_diff_csv(diff_results, out_path):
         logger.error(f"Failed to save CSV file {out_path}: {e}")
         raise
 
-def calculate_file_level_diff(parameter_data, before_df, after_df, smell_columns=FILE_SMELL_COLUMNS):
+def calculate_file_level_diff(elements, before_df, after_df, smell_columns=FILE_SMELL_COLUMNS):
     """
     Calculate file-level test smell counts and their differences for before/after.
+    `elements` are the element rows of one refactoring (see annotation_elements);
+    a raw parameter_data dict is also accepted.
     Returns (before_counts, after_counts, diff_counts) as dicts.
     """
-    def get_file_smell_counts(param_data, df):
-        total_counts = defaultdict(int)
-        processed_files = set()
-        for data_type, data_dict in param_data.items():
-            elements = data_dict.get("elements", [])
-            for elem in elements:
-                file_path = elem["location"]["path"]
-                file_name = file_path.split("/")[-1]
-                if file_name in processed_files:
-                    continue
-                processed_files.add(file_name)
-                matches = df[df["TestFilePath"].str.endswith(file_name)]
-                for _, row in matches.iterrows():
-                    for col in smell_columns:
-                        total_counts[col] += row.get(col, 0)
-        return dict(total_counts)
-    before_counts = get_file_smell_counts(parameter_data.get("before", {}), before_df)
-    after_counts = get_file_smell_counts(parameter_data.get("after", {}), after_df)
+    def get_file_smell_counts(side, df):
+        total_counts = {}
+        for file_name in side["basename"].dropna().drop_duplicates():
+            matches = df[df["TestFilePath"].str.endswith(file_name)]
+            if matches.empty:
+                continue
+            for col in smell_columns:
+                value = matches[col].sum(skipna=False) if col in matches else 0
+                total_counts[col] = total_counts.get(col, 0) + (value.item() if hasattr(value, "item") else value)
+        return total_counts
+    elements = as_element_table(elements)
+    before_counts = get_file_smell_counts(side_elements(elements, "before"), before_df)
+    after_counts = get_file_smell_counts(side_elements(elements, "after"), after_df)
     diff_counts = {k: after_counts.get(k, 0) - before_counts.get(k, 0) for k in set(before_counts) | set(after_counts)}
     return before_counts, after_counts, diff_counts
 
-def calculate_method_level_diff(parameter_data, before_json, after_json, smell_columns=FILE_SMELL_COLUMNS):
+METHOD_SMELL_COLUMNS = ["commit", "path", "smell_name", "begin_line", "end_line"]
+_LINE_OFFSET = 1 << 31
+
+def method_smell_frame(entries_by_commit):
     """
-    Calculate method-level test smell counts and their differences for before/after.
-    Returns (before_counts, after_counts, diff_counts) as dicts.
+    Flatten smells_result.json entries into one row per method-level smell.
+    `entries_by_commit` maps a commit key (the key annotation ranges are
+    matched on) to that commit's entries. commit, path and smell_name are
+    categorical; lines are float64 (NaN where missing).
     """
-    def extract_method_smells(entries, start_line, end_line, file_name):
-        method_smells = []
+    commit_codes, path_codes, names, begins, ends = [], [], [], [], []
+    paths = {}
+    for commit_code, entries in enumerate(entries_by_commit.values()):
         for entry in entries:
-            if not entry["testFilePath"].endswith(file_name):
-                continue
+            path_code = paths.setdefault(entry["testFilePath"], len(paths))
             for s in entry.get("smells", []):
                 if s.get("smellParentType") == "Method":
-                    s_begin = s.get("beginLine")
-                    s_end = s.get("endLine")
-                    if not (s_begin > end_line or s_end < start_line):
-                        method_smells.append(s)
-        return method_smells
-    def get_range_smell_count(param_data, commit_json):
-        total_counts = defaultdict(int)
-        for data_type, data_dict in param_data.items():
-            elements = data_dict.get("elements", [])
-            for elem in elements:
-                file_path = elem["location"]["path"]
-                file_name = file_path.split("/")[-1]
-                rng = elem["location"].get("range")
-                if rng:
-                    start_line = rng.get("startLine")
-                    end_line = rng.get("endLine")
-                    matched = extract_method_smells(commit_json, start_line, end_line, file_name)
-                    for ms in matched:
-                        smell_name = ms.get("smellName")
-                        total_counts[smell_name] += 1
-        return dict(total_counts)
-    before_counts = get_range_smell_count(parameter_data.get("before", {}), before_json)
-    after_counts = get_range_smell_count(parameter_data.get("after", {}), after_json)
+                    commit_codes.append(commit_code)
+                    path_codes.append(path_code)
+                    names.append(s.get("smellName"))
+                    begins.append(s.get("beginLine"))
+                    ends.append(s.get("endLine"))
+    return pd.DataFrame({
+        "commit": pd.Categorical.from_codes(commit_codes, categories=list(entries_by_commit)),
+        "path": pd.Categorical.from_codes(path_codes, categories=list(paths)),
+        "smell_name": pd.Categorical(names),
+        "begin_line": np.array(begins, dtype="float64"),
+        "end_line": np.array(ends, dtype="float64"),
+    }, columns=METHOD_SMELL_COLUMNS)
+
+def _line_keys(group_ids, lines):
+    """int64 keys that sort by group first and line second."""
+    lines = np.clip(lines.astype("int64"), -_LINE_OFFSET, _LINE_OFFSET - 1) + _LINE_OFFSET
+    return (group_ids.astype("int64") << 32) | lines
+
+def bulk_method_level_counts(ranges, smells):
+    """
+    Count the method smells overlapping every annotated range, for all
+    refactorings in one pass.
+
+    `ranges` are element rows (see annotation_elements) with an extra "commit"
+    column naming the smell data each element is matched against, and
+    `smells` is a method_smell_frame of those commits. A smell matches an
+    element when its path ends with the element's basename and its
+    [begin_line, end_line] overlaps [start_line, end_line]. Smells are sorted
+    once per (commit, path, smell name) by begin and by end line, so the
+    overlap count of a range is #(begin <= end_line) - #(end < start_line),
+    both found with searchsorted. Inverted intervals are compared directly.
+    Returns a DataFrame (refactoring_id, side, smell_name, count) with count > 0.
+    """
+    out_columns = ["refactoring_id", "side", "smell_name", "count"]
+    ranges = ranges[ranges["basename"].notna() & ranges["start_line"].notna() & ranges["end_line"].notna()]
+    smells = smells.dropna(subset=["path", "begin_line", "end_line"])
+    if ranges.empty or smells.empty:
+        return pd.DataFrame(columns=out_columns)
+
+    # Integer keys for smell files and (file, smell name) groups
+    commit = pd.Categorical(smells["commit"])
+    path = pd.Categorical(smells["path"])
+    name = pd.Categorical(smells["smell_name"])
+    file_key = commit.codes.astype("int64") * len(path.categories) + path.codes
+    begin = smells["begin_line"].to_numpy(dtype="int64")
+    end = smells["end_line"].to_numpy(dtype="int64")
+
+    # (commit, basename) -> keys of the commit's smell files whose path ends with that basename
+    file_keys = np.unique(file_key)
+    files = pd.DataFrame({
+        "commit": np.asarray(commit.categories, dtype=object)[file_keys // len(path.categories)],
+        "path": np.asarray(path.categories, dtype=object)[file_keys % len(path.categories)],
+        "file_key": file_keys,
+    })
+    ranges = pd.DataFrame({
+        "refactoring_id": ranges["refactoring_id"].to_numpy(),
+        "side": ranges["side"].astype(str).to_numpy(),
+        "commit": ranges["commit"].astype(str).to_numpy(),
+        "basename": ranges["basename"].to_numpy(),
+        "start_line": ranges["start_line"].to_numpy(dtype="int64"),
+        "end_line": ranges["end_line"].to_numpy(dtype="int64"),
+    })
+    pairs = ranges[["commit", "basename"]].drop_duplicates().merge(files, on="commit")
+    pairs = pairs[np.array([p.endswith(b) for p, b in zip(pairs["path"], pairs["basename"])], dtype=bool)]
+    ranges = ranges.merge(pairs[["commit", "basename", "file_key"]], on=["commit", "basename"])
+    if ranges.empty:
+        return pd.DataFrame(columns=out_columns)
+
+    regular_range = (ranges["start_line"] <= ranges["end_line"]).to_numpy()
+    regular_smell = begin <= end
+    name_codes = name.codes.astype("int64")
+    parts = []
+
+    # Sort-merge join for well-formed intervals
+    if regular_smell.any():
+        group_key = file_key[regular_smell] * (len(name.categories) + 1) + (name_codes[regular_smell] + 1)
+        group_keys, gid = np.unique(group_key, return_inverse=True)
+        begin_keys = np.sort(_line_keys(gid, begin[regular_smell]))
+        end_keys = np.sort(_line_keys(gid, end[regular_smell]))
+        groups = pd.DataFrame({
+            "file_key": group_keys // (len(name.categories) + 1),
+            "name_code": group_keys % (len(name.categories) + 1) - 1,
+            "gid": np.arange(len(group_keys)),
+        })
+        joined = ranges[regular_range].merge(groups, on="file_key")
+        g = joined["gid"].to_numpy()
+        joined["count"] = (
+            np.searchsorted(begin_keys, _line_keys(g, joined["end_line"].to_numpy()), side="right")
+            - np.searchsorted(end_keys, _line_keys(g, joined["start_line"].to_numpy()), side="left")
+        )
+        parts.append(joined[["refactoring_id", "side", "name_code", "count"]])
+
+    # Direct comparison for the (rare) inverted ranges or smells
+    smell_rows = pd.DataFrame({"file_key": file_key, "name_code": name_codes, "begin": begin, "end": end})
+    brute = pd.concat([
+        ranges[~regular_range].merge(smell_rows, on="file_key"),
+        ranges[regular_range].merge(smell_rows[~regular_smell], on="file_key"),
+    ], ignore_index=True)
+    if len(brute):
+        overlaps = (brute["begin"] <= brute["end_line"]) & (brute["end"] >= brute["start_line"])
+        parts.append(brute.assign(count=overlaps.astype("int64"))[["refactoring_id", "side", "name_code", "count"]])
+
+    if not parts:
+        return pd.DataFrame(columns=out_columns)
+    counts = pd.concat(parts, ignore_index=True)
+    counts = counts.groupby(["refactoring_id", "side", "name_code"], sort=False)["count"].sum()
+    counts = counts[counts > 0].reset_index()
+    # name_code -1 is a smell without a name
+    categories = np.append(np.asarray(name.categories, dtype=object), None)
+    counts["smell_name"] = categories[counts["name_code"].to_numpy()]
+    return counts[out_columns]
+
+def counts_by_refactoring(counts):
+    """
+    Turn bulk_method_level_counts output into
+    {refactoring_id: {"before": {smell: n}, "after": {smell: n}}}.
+    """
+    result = {}
+    for refactoring_id, side, smell_name, count in counts[["refactoring_id", "side", "smell_name", "count"]].itertuples(index=False):
+        result.setdefault(refactoring_id, {"before": {}, "after": {}})[side][smell_name] = int(count)
+    return result
+
+def calculate_method_level_diff(elements, before_json, after_json, smell_columns=FILE_SMELL_COLUMNS):
+    """
+    Calculate method-level test smell counts and their differences for before/after.
+    `elements` are the element rows of one refactoring (see annotation_elements);
+    a raw parameter_data dict is also accepted.
+    Returns (before_counts, after_counts, diff_counts) as dicts.
+    """
+    elements = as_element_table(elements)
+    ranges = elements.assign(commit=elements["side"].astype(str))
+    smells = method_smell_frame({"before": before_json, "after": after_json})
+    sides = {"before": {}, "after": {}}
+    for counts in counts_by_refactoring(bulk_method_level_counts(ranges, smells)).values():
+        for side, side_counts in counts.items():
+            for smell, n in side_counts.items():
+                sides[side][smell] = sides[side].get(smell, 0) + n
+    before_counts, after_counts = sides["before"], sides["after"]
     diff_counts = {k: after_counts.get(k, 0) - before_counts.get(k, 0) for k in set(before_counts) | set(after_counts)}
     return before_counts, after_counts, diff_counts
 
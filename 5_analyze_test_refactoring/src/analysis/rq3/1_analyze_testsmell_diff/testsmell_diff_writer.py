@@ -1,5 +1,27 @@
 import pandas as pd
+import numpy as np
 import json
+import gzip
+import io
+import logging
+
+try:
+    import zstandard
+except ImportError:  # zstd圧縮は任意
+    zstandard = None
+
+try:
+    import pyarrow
+except ImportError:  # Parquet/Feather出力は任意
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Identifier columns of the wide tables; every other column is a smell count
+WIDE_ID_COLUMNS = ["commit_url", "type_name"]
+# Tidy long format: one row per (refactoring, level, smell)
+LONG_ID_COLUMNS = ["commit_url", "type_name", "level", "test_smell"]
+LONG_COLUMNS = LONG_ID_COLUMNS + ["before", "after", "diff"]
 
 def write_csv(rows, path):
     """
@@ -16,4 +38,160 @@ def write_json(obj, path):
     Write a list of dicts to a JSON file.
     """
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, ensure_ascii=False, indent=2) 
\ No newline at end of file
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+
+def compact_wide_frame(rows, id_columns=WIDE_ID_COLUMNS):
+    """
+    Return a wide smell table with categorical identifier columns and the
+    smallest nullable integer dtype (Int8/16/32/64) that holds each count column.
+    Missing counts stay missing; non-integral columns are kept as floats.
+    """
+    df = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    for col in df.columns:
+        if col in id_columns:
+            df[col] = df[col].astype("category")
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        if values.isna().sum() > df[col].isna().sum():
+            continue  # 数値でない列はそのまま残す
+        non_null = values.dropna()
+        if not (non_null == np.round(non_null)).all():
+            df[col] = values.astype("float64")
+            continue
+        low, high = (non_null.min(), non_null.max()) if len(non_null) else (0, 0)
+        for dtype in ("Int8", "Int16", "Int32", "Int64"):
+            info = np.iinfo(dtype.lower())
+            if info.min <= low and high <= info.max:
+                df[col] = values.astype(dtype)
+                break
+    return df
+
+def write_typed_table(rows, path):
+    """
+    Write a wide smell table as typed Parquet, or Feather when `path` ends with
+    ".feather". Returns False (and writes nothing) if pyarrow is not installed.
+    """
+    if pyarrow is None:
+        logger.warning(f"pyarrow is not installed; skipping {path}")
+        return False
+    df = compact_wide_frame(rows).reset_index(drop=True)
+    if path.endswith(".feather"):
+        df.to_feather(path)
+    else:
+        df.to_parquet(path, index=False)
+    return True
+
+def build_long_frame(rows, level):
+    """
+    Reshape a wide smell table into the long format (LONG_COLUMNS), keeping the
+    wide table's row order and smell order. Smells are the `<smell>_diff` columns.
+    """
+    df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    if df.empty:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    smells = [col[:-len("_diff")] for col in df.columns if col.endswith("_diff")]
+    n, k = len(df), len(smells)
+    data = {
+        "commit_url": np.repeat(df["commit_url"].to_numpy(), k),
+        "type_name": np.repeat(df["type_name"].to_numpy(), k),
+        "level": np.full(n * k, level, dtype=object),
+        "test_smell": np.tile(np.array(smells, dtype=object), n),
+    }
+    for part in ("before", "after", "diff"):
+        data[part] = df[[f"{smell}_{part}" for smell in smells]].to_numpy().reshape(-1)
+    return pd.DataFrame(data, columns=LONG_COLUMNS)
+
+def write_long_table(frames, path):
+    """
+    Write long frames (see build_long_frame) as one table: Parquet, Feather
+    when `path` ends with ".feather", or CSV when it ends with ".csv".
+    Returns False (and writes nothing) if a typed format is requested without pyarrow.
+    """
+    if not path.endswith(".csv") and pyarrow is None:
+        logger.warning(f"pyarrow is not installed; skipping {path}")
+        return False
+    df = compact_wide_frame(pd.concat(frames, ignore_index=True), id_columns=LONG_ID_COLUMNS)
+    if path.endswith(".csv"):
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+    elif path.endswith(".feather"):
+        df.to_feather(path)
+    else:
+        df.to_parquet(path, index=False)
+    return True
+
+def infer_compression(path):
+    """
+    Infer the compression ("gzip", "zstd" or None) from the file suffix.
+    """
+    if path.endswith(".gz"):
+        return "gzip"
+    if path.endswith(".zst"):
+        return "zstd"
+    return None
+
+def open_text(path, mode, compression=None):
+    """
+    Open a (possibly compressed) text file for reading ("r") or writing ("w").
+    """
+    if compression is None:
+        compression = infer_compression(path)
+    if compression is None:
+        return open(path, mode, encoding="utf-8")
+    if compression == "gzip":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression requires the 'zstandard' package")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    raise ValueError(f"Unsupported compression: {compression}")
+
+class NDJSONWriter:
+    """
+    Stream JSON objects to a file, one compact object per line.
+    The file is flushed every `flush_every` records, so a crash loses at most
+    the records written since the last flush.
+    """
+    def __init__(self, path, compression=None, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._f = open_text(path, "w", compression)
+
+    def write(self, obj):
+        self._f.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")))
+        self._f.write("\n")
+        self.count += 1
+        if self.flush_every and self.count % self.flush_every == 0:
+            self.flush()
+
+    # Allows the writer to be passed where a result list is expected
+    append = write
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def iter_ndjson(path, compression=None):
+    """
+    Lazily iterate over the objects of an NDJSON file written by NDJSONWriter.
+    Blank lines are skipped.
+    """
+    with open_text(path, "r", compression) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
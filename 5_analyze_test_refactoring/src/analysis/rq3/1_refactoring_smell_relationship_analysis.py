@@ -1,10 +1,21 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from scipy.stats import wilcoxon, norm
-from statsmodels.stats.multitest import multipletests
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from smell_tables import load_wide_tables
+from smell_pairs import load_paired_tables
+from batched_wilcoxon import tested_groups
+from bootstrap_ci import bootstrap_effect_sizes
+from power_analysis import power_analysis
+from figure_renderer import FigureSpec, render_figures
+
+# 重いライブラリは使う関数の中で初めてimportする
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+multipletests = lazy_import("statsmodels.stats.multitest", "multipletests")
 
 # --- ディレクトリ設定 ---
 BASE_DIR = "/Users/horikawa/Dev/Research-repo/InvestigatingTheImpactOfTestSpecificRefactoring"
@@ -15,160 +26,96 @@ RESULTS_DIR = f"{BASE_DIR}/5_analyze_test_refactoring/src/analysis/rq3/refactori
 # 出力ディレクトリが存在しない場合は作成
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# --- 効果量のブートストラップ信頼区間の設定 ---
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 42
 
-def load_data():
-    """データセットをCSVファイルからロードする"""
-    file_level_path = f"{CSV_DIR}/file_level_wide.csv"
-    method_level_path = f"{CSV_DIR}/method_level_wide.csv"
-    file_df = pd.read_csv(file_level_path)
-    method_df = pd.read_csv(method_level_path)
-    return file_df, method_df
+# --- 検定の設定 (sensitivity_sweep.pyで値を振って頑健性を確かめられる) ---
+MIN_PAIRS = 5
+FDR_METHOD = "fdr_bh"
+FDR_ALPHA = 0.05
 
+# --- Wilcoxon検定の検出力シミュレーションの設定 (サンプルサイズの妥当性判定に使う) ---
+POWER_SIMULATIONS = 1000
+POWER_TARGET = 0.8
+POWER_SEED = 42
 
-def preprocess_data(df):
-    """
-    データを整形し、コミット、タイプリファクタリング、テストスメルごとに
-    before/afterのペアが対応するようにする
-    """
-    test_smell_columns = [col for col in df.columns if "_diff" in col]
-    before_cols = [col.replace("_diff", "_before") for col in test_smell_columns]
-    after_cols = [col.replace("_diff", "_after") for col in test_smell_columns]
-    data = []
-    for idx, row in df.iterrows():
-        for smell, before_col, after_col in zip(test_smell_columns, before_cols, after_cols):
-            data.append({
-                "commit_url": row["commit_url"],
-                "type_name": row["type_name"],
-                "test_smell": smell.replace("_diff", ""),
-                "before_value": row[before_col] if pd.notnull(row[before_col]) else 0,
-                "after_value": row[after_col] if pd.notnull(row[after_col]) else 0,
-                "diff_value": row[smell] if pd.notnull(row[smell]) else 0
-            })
-    return pd.DataFrame(data)
-
-
-def calculate_effect_size_r(p_value, n, before, after):
-    """
-    p値から効果量rを計算する（ハイブリッド版）。
-    まず中央値で方向を判断し、0なら平均値をタイブレークに使う。
-    """
-    if n == 0 or p_value is None or p_value >= 1:
-        return 0.0
-
-    diff = after.values - before.values
-    diff_median = np.median(diff)
-
-    sign = 0
-    # まず中央値で判断
-    if diff_median != 0:
-        sign = np.sign(diff_median)
-    # 中央値が0の場合、タイブレークとして平均値で判断
-    else:
-        diff_mean = np.mean(diff)
-        if diff_mean != 0:
-            sign = np.sign(diff_mean)
-        else:
-            # 平均値も0なら、方向性はない
-            return 0.0
 
-    z_score = abs(norm.ppf(p_value / 2.0))
-    r = sign * (z_score / np.sqrt(n))
-    return r
+def load_data():
+    """データセットをロードする (Parquet/Featherがあれば優先し、無ければCSV)"""
+    return load_wide_tables(CSV_DIR)
 
 
-def run_statistical_analysis(df, group_by_cols, level):
+def run_statistical_analysis(df, group_by_cols, level, min_pairs=MIN_PAIRS):
     """
     指定された列でグループ化し、統計分析を実行する共通関数
     """
     print(f"\n=== Running analysis for: {group_by_cols} at {level} level ===")
-    results = []
-    for group_keys, group_data in df.groupby(group_by_cols):
-        total_pairs = len(group_data)
-        if total_pairs < 5:
-            continue
-
-        improvements = (group_data["after_value"] < group_data["before_value"]).sum()
-        degradations = (group_data["after_value"] > group_data["before_value"]).sum()
-        no_changes = total_pairs - improvements - degradations
-
-        p_value, effect_size_r, stat = 1.0, 0.0, np.nan
-
-        if no_changes < total_pairs:
-            try:
-                stat, p_value = wilcoxon(group_data["before_value"], group_data["after_value"])
-                effect_size_r = calculate_effect_size_r(p_value, total_pairs, group_data["before_value"],
-                                                        group_data["after_value"])
-            except ValueError:
-                p_value = 1.0
-
-        # 結果を辞書として作成
-        res = {
-            "level": level,
-            "total_pairs": total_pairs,
-            "improvements": improvements,
-            "degradations": degradations,
-            "no_changes": no_changes,
-            "improvement_rate": improvements / total_pairs * 100,
-            "degradation_rate": degradations / total_pairs * 100,
-            "wilcoxon_stat": stat,
-            "p_value": p_value,
-            "effect_size_r": effect_size_r
-        }
-
-        # グループ化のキーを結果に追加
-        if isinstance(group_keys, str):
-            res[group_by_cols[0]] = group_keys
-        else:
-            for i, key in enumerate(group_by_cols):
-                res[key] = group_keys[i]
-
-        results.append(res)
+    groups = tested_groups(df, group_by_cols, min_pairs)
+    if groups.empty:
+        return pd.DataFrame()
 
-    return pd.DataFrame(results)
+    results = pd.DataFrame({
+        "level": level,
+        "total_pairs": groups["total_pairs"],
+        "improvements": groups["improvements"],
+        "degradations": groups["degradations"],
+        "no_changes": groups["no_changes"],
+        "improvement_rate": groups["improvements"] / groups["total_pairs"] * 100,
+        "degradation_rate": groups["degradations"] / groups["total_pairs"] * 100,
+        "wilcoxon_stat": groups["wilcoxon_stat"],
+        "p_value": groups["p_value"],
+        "effect_size_r": groups["effect_size_r"]
+    })
+    # グループ化のキーを結果に追加
+    for key in group_by_cols:
+        results[key] = groups[key]
+    return results
+
+
+def add_bootstrap_ci(results_df, df, group_by_cols):
+    """
+    分析結果の各グループに、差(after - before)の中央値と順位双列相関rの
+    ブートストラップ信頼区間の列を追加する
+    """
+    if results_df.empty:
+        return results_df
+    ci_df = bootstrap_effect_sizes(df, group_by_cols, n_resamples=BOOTSTRAP_RESAMPLES,
+                                   confidence=BOOTSTRAP_CONFIDENCE, seed=BOOTSTRAP_SEED)
+    return results_df.merge(ci_df.drop(columns="n_pairs"), on=group_by_cols, how="left")
 
 
-def analyze_by_smell_only(df, level, adequate_sample_size=20):
+def analyze_by_smell_only(df, level):
     """
     【新規追加】テストスメル単体で集計し、統計分析を行う関数
     リファクタリングの種類は問わず、全体でのスメルの変化を評価する
     """
     print(f"\n=== Analysis by Test Smell Only for {level} Level ===")
-    results = []
-    for test_smell, group_data in df.groupby('test_smell'):
-        sample_size = len(group_data)
-        if sample_size < 5:
-            continue
-
-        no_change_pairs = (group_data["after_value"] == group_data["before_value"]).sum()
-        change_pairs = sample_size - no_change_pairs
-
-        p_value, effect_size_r, stat = 1.0, 0.0, np.nan
-
-        if change_pairs > 0:
-            try:
-                stat, p_value = wilcoxon(group_data["before_value"], group_data["after_value"])
-                effect_size_r = calculate_effect_size_r(p_value, sample_size, group_data["before_value"],
-                                                        group_data["after_value"])
-            except ValueError:
-                p_value = 1.0
-
-        results.append({
-            "test_smell": test_smell,
-            "sample_size": sample_size,
-            "no_change_pairs": no_change_pairs,
-            "change_pairs": change_pairs,
-            "Wilcoxon_stat": stat,
-            "p_value": p_value,
-            "effect_size_r": effect_size_r,
-            "sample_size_adequate": sample_size >= adequate_sample_size
+    groups = tested_groups(df, ['test_smell'], MIN_PAIRS)
+    results_df = pd.DataFrame()
+    if not groups.empty:
+        results_df = pd.DataFrame({
+            "test_smell": groups["test_smell"],
+            "sample_size": groups["total_pairs"],
+            "no_change_pairs": groups["no_changes"],
+            "change_pairs": groups["total_pairs"] - groups["no_changes"],
+            "Wilcoxon_stat": groups["wilcoxon_stat"],
+            "p_value": groups["p_value"],
+            "effect_size_r": groups["effect_size_r"],
         })
+        # 固定のペア数ではなく、観測された差の分布での検出力が目標に届くかで判定する
+        power = power_analysis(df, "test_smell", n_simulations=POWER_SIMULATIONS, target_power=POWER_TARGET,
+                               seed=POWER_SEED)
+        results_df = results_df.merge(power[["test_smell", "achieved_power", "required_n", "power_adequate"]],
+                                      on="test_smell", how="left")
+        results_df = results_df.rename(columns={"power_adequate": "sample_size_adequate"})
 
     # このレベル（file/method）内で多重比較補正
-    results_df = pd.DataFrame(results)
     if not results_df.empty:
         p_values_to_correct = results_df['p_value'].dropna()
         if not p_values_to_correct.empty:
-            reject, pvals_corrected, _, _ = multipletests(p_values_to_correct, alpha=0.05, method='fdr_bh')
+            reject, pvals_corrected, _, _ = multipletests(p_values_to_correct, alpha=FDR_ALPHA, method=FDR_METHOD)
             results_df['p_value_corrected'] = pvals_corrected
         else:
             results_df['p_value_corrected'] = 1.0
@@ -182,61 +129,33 @@ def analyze_refactoring_smell_effectiveness(df, level):
     """
     print(f"\n=== Corrected Refactoring-Smell Effectiveness Analysis for {level} Level ===")
 
-    results = []
-
-    for (refactoring_type, test_smell), group_data in df.groupby(['type_name', 'test_smell']):
-        total_pairs = len(group_data)
-        if total_pairs < 5:  # サンプルサイズが小さすぎる場合はスキップ
-            continue
-
-        # 記述統計の計算
-        improvements = (group_data["after_value"] < group_data["before_value"]).sum()
-        degradations = (group_data["after_value"] > group_data["before_value"]).sum()
-        no_changes = total_pairs - improvements - degradations
-
-        improvement_rate = improvements / total_pairs * 100
-        degradation_rate = degradations / total_pairs * 100
-        change_rate = (improvements + degradations) / total_pairs * 100
-
-        p_value = 1.0
-        effect_size_r = 0.0
-        stat = np.nan
-
-        # 【重要】検定はすべてのペアを対象に行い、選択バイアスを排除
-        if no_changes < total_pairs:
-            try:
-                stat, p_value = wilcoxon(group_data["before_value"], group_data["after_value"])
-                effect_size_r = calculate_effect_size_r(
-                    p_value, total_pairs, group_data["before_value"], group_data["after_value"]
-                )
-            except ValueError:
-                p_value = 1.0
-                effect_size_r = 0.0
-
-        results.append({
-            "level": level,
-            "refactoring_type": refactoring_type,
-            "test_smell": test_smell,
-            "total_pairs": total_pairs,
-            "improvements": improvements,
-            "degradations": degradations,
-            "no_changes": no_changes,
-            "improvement_rate": improvement_rate,
-            "degradation_rate": degradation_rate,
-            "change_rate": change_rate,
-            "wilcoxon_stat": stat,
-            "p_value": p_value,
-            "effect_size_r": effect_size_r
-        })
-
-    return pd.DataFrame(results)
-
+    # 【重要】検定はすべてのペアを対象に行い、選択バイアスを排除
+    # サンプルサイズが小さすぎる (5未満の) 場合はスキップ
+    groups = tested_groups(df, ['type_name', 'test_smell'], MIN_PAIRS)
+    if groups.empty:
+        return pd.DataFrame()
 
-def create_effectiveness_heatmap(results_df, level):
-    """【修正版】各リファクタリングタイプの効果をヒートマップで可視化する"""
-    # 1. 改善率のヒートマップ
+    # 記述統計の計算
+    total_pairs = groups["total_pairs"]
+    return pd.DataFrame({
+        "level": level,
+        "refactoring_type": groups["type_name"],
+        "test_smell": groups["test_smell"],
+        "total_pairs": total_pairs,
+        "improvements": groups["improvements"],
+        "degradations": groups["degradations"],
+        "no_changes": groups["no_changes"],
+        "improvement_rate": groups["improvements"] / total_pairs * 100,
+        "degradation_rate": groups["degradations"] / total_pairs * 100,
+        "change_rate": (groups["improvements"] + groups["degradations"]) / total_pairs * 100,
+        "wilcoxon_stat": groups["wilcoxon_stat"],
+        "p_value": groups["p_value"],
+        "effect_size_r": groups["effect_size_r"]
+    })
+
+
+def _draw_improvement_heatmap(results_df, level):
     pivot_improvement = results_df.pivot(index="refactoring_type", columns="test_smell", values="improvement_rate")
-    plt.figure(figsize=(18, 12))
     sns.heatmap(pivot_improvement, annot=True, fmt=".1f", cmap="Greens", center=0, vmin=0, vmax=50)
     plt.title(f"Improvement Rate (%) by Refactoring Type and Test Smell ({level} Level)", fontsize=16)
     plt.xlabel("Test Smell", fontsize=12)
@@ -244,25 +163,44 @@ def create_effectiveness_heatmap(results_df, level):
     plt.xticks(rotation=45, ha='right')
     plt.yticks(rotation=0)
     plt.tight_layout()
-    plt.savefig(f"{RESULTS_DIR}/improvement_heatmap_{level}.png", dpi=300)
-    plt.close()
+
+
+def _draw_significant_effect_heatmap(significant_results, level):
+    pivot_effect = significant_results.pivot(index="refactoring_type", columns="test_smell", values="effect_size_r")
+    sns.heatmap(pivot_effect, annot=True, fmt=".3f", cmap="RdBu_r", center=0) # 改善(負)が青、悪化(正)が赤
+    plt.title(f"Effect Size (r) for Statistically Significant Pairs ({level} Level, Corrected p-value)", fontsize=16)
+    plt.xlabel("Test Smell", fontsize=12)
+    plt.ylabel("Refactoring Type", fontsize=12)
+    plt.xticks(rotation=45, ha='right')
+    plt.yticks(rotation=0)
+    plt.tight_layout()
+
+
+def effectiveness_heatmap_specs(results_df, level):
+    """
+    【修正版】各リファクタリングタイプの効果のヒートマップ
+    (図の仕様のリストを返す。描画はfigure_renderer.render_figuresで行う)
+    """
+    # 1. 改善率のヒートマップ
+    figures = [FigureSpec(f"{RESULTS_DIR}/improvement_heatmap_{level}.png", _draw_improvement_heatmap,
+                          results_df[["refactoring_type", "test_smell", "improvement_rate"]], {"level": level},
+                          figsize=(18, 12), savefig={"dpi": 300})]
 
     # 2. 効果量rのヒートマップ（統計的に有意なもののみ）
     # 'significant_corrected'列が存在するか確認
     if 'significant_corrected' in results_df.columns:
         significant_results = results_df[results_df["significant_corrected"] == True]
         if not significant_results.empty:
-            pivot_effect = significant_results.pivot(index="refactoring_type", columns="test_smell", values="effect_size_r")
-            plt.figure(figsize=(18, 12))
-            sns.heatmap(pivot_effect, annot=True, fmt=".3f", cmap="RdBu_r", center=0) # 改善(負)が青、悪化(正)が赤
-            plt.title(f"Effect Size (r) for Statistically Significant Pairs ({level} Level, Corrected p-value)", fontsize=16)
-            plt.xlabel("Test Smell", fontsize=12)
-            plt.ylabel("Refactoring Type", fontsize=12)
-            plt.xticks(rotation=45, ha='right')
-            plt.yticks(rotation=0)
-            plt.tight_layout()
-            plt.savefig(f"{RESULTS_DIR}/effect_size_heatmap_significant_{level}.png", dpi=300)
-            plt.close()
+            figures.append(FigureSpec(
+                f"{RESULTS_DIR}/effect_size_heatmap_significant_{level}.png", _draw_significant_effect_heatmap,
+                significant_results[["refactoring_type", "test_smell", "effect_size_r"]], {"level": level},
+                figsize=(18, 12), savefig={"dpi": 300}))
+    return figures
+
+
+def create_effectiveness_heatmap(results_df, level, n_jobs=None):
+    """効果のヒートマップを描画して保存する (データが変わっていない図は描き直さない)"""
+    return render_figures(effectiveness_heatmap_specs(results_df, level), n_jobs=n_jobs)
 
 
 def find_best_refactoring_for_each_smell(results_df, level):
@@ -278,7 +216,7 @@ def find_best_refactoring_for_each_smell(results_df, level):
         smell_results = results_df[results_df["test_smell"] == test_smell]
 
         # サンプルサイズが十分な結果にフィルタリング
-        valid_results = smell_results[smell_results["total_pairs"] >= 5]
+        valid_results = smell_results[smell_results["total_pairs"] >= MIN_PAIRS]
         if valid_results.empty:
             continue
 
@@ -344,38 +282,44 @@ def analyze_refactoring_impact_summary(results_df, level):
     return pd.DataFrame(summary_list)
 
 
-def create_summary_visualizations(summary_df, level):
-    """リファクタリング効果のサマリーを可視化する"""
-    if summary_df.empty:
-        return
-
-    # 1. 全体的な改善率
-    plt.figure(figsize=(12, 8))
-    summary_df_sorted = summary_df.sort_values("overall_improvement_rate", ascending=True)
-    plt.barh(summary_df_sorted["refactoring_type"], summary_df_sorted["overall_improvement_rate"])
-    plt.xlabel("Overall Improvement Rate (%)")
-    plt.title(f"Overall Improvement Rate by Refactoring Type ({level} Level)")
-    plt.tight_layout()
-    plt.savefig(f"{RESULTS_DIR}/summary_improvement_rate_{level}.png", dpi=300)
-    plt.close()
-
-    # 2. 影響を与えたスメルの数
-    plt.figure(figsize=(12, 8))
-    summary_df_sorted = summary_df.sort_values("smells_affected", ascending=True)
-    plt.barh(summary_df_sorted["refactoring_type"], summary_df_sorted["smells_affected"])
-    plt.xlabel("Number of Test Smells Affected")
-    plt.title(f"Number of Test Smells Affected by Each Refactoring Type ({level} Level)")
+def _draw_summary_bars(summary_df, column, xlabel, title):
+    summary_df_sorted = summary_df.sort_values(column, ascending=True)
+    plt.barh(summary_df_sorted["refactoring_type"], summary_df_sorted[column])
+    plt.xlabel(xlabel)
+    plt.title(title)
     plt.tight_layout()
-    plt.savefig(f"{RESULTS_DIR}/summary_smells_affected_{level}.png", dpi=300)
-    plt.close()
+
+
+def summary_visualization_specs(summary_df, level):
+    """リファクタリング効果のサマリーの図 (図の仕様のリストを返す)"""
+    if summary_df.empty:
+        return []
+
+    return [
+        # 1. 全体的な改善率
+        FigureSpec(f"{RESULTS_DIR}/summary_improvement_rate_{level}.png", _draw_summary_bars,
+                   summary_df[["refactoring_type", "overall_improvement_rate"]],
+                   {"column": "overall_improvement_rate", "xlabel": "Overall Improvement Rate (%)",
+                    "title": f"Overall Improvement Rate by Refactoring Type ({level} Level)"},
+                   figsize=(12, 8), savefig={"dpi": 300}),
+        # 2. 影響を与えたスメルの数
+        FigureSpec(f"{RESULTS_DIR}/summary_smells_affected_{level}.png", _draw_summary_bars,
+                   summary_df[["refactoring_type", "smells_affected"]],
+                   {"column": "smells_affected", "xlabel": "Number of Test Smells Affected",
+                    "title": f"Number of Test Smells Affected by Each Refactoring Type ({level} Level)"},
+                   figsize=(12, 8), savefig={"dpi": 300}),
+    ]
+
+
+def create_summary_visualizations(summary_df, level, n_jobs=None):
+    """サマリーの図を描画して保存する (データが変わっていない図は描き直さない)"""
+    return render_figures(summary_visualization_specs(summary_df, level), n_jobs=n_jobs)
 
 
 def main():
     """メインの実行関数（最終改善版）"""
-    # データのロードと前処理
-    file_df_raw, method_df_raw = load_data()
-    file_df = preprocess_data(file_df_raw)
-    method_df = preprocess_data(method_df_raw)
+    # データのロードと前処理 (ロング形式の表があれば整形せずにそのまま読み込む)
+    file_df, method_df = load_paired_tables(CSV_DIR)
 
     # --- 1. 全ての分析を実行（この時点ではp値は未補正） ---
     # a) リファクタリング種別×スメル種別での詳細分析
@@ -386,6 +330,12 @@ def main():
     smell_only_file_results = run_statistical_analysis(file_df, ['test_smell'], "file")
     smell_only_method_results = run_statistical_analysis(method_df, ['test_smell'], "method")
 
+    # c) 効果量のブートストラップ信頼区間 (グループはプロセスに振り分けて並列に計算)
+    detailed_file_results = add_bootstrap_ci(detailed_file_results, file_df, ['type_name', 'test_smell'])
+    detailed_method_results = add_bootstrap_ci(detailed_method_results, method_df, ['type_name', 'test_smell'])
+    smell_only_file_results = add_bootstrap_ci(smell_only_file_results, file_df, ['test_smell'])
+    smell_only_method_results = add_bootstrap_ci(smell_only_method_results, method_df, ['test_smell'])
+
     # --- 2. 【改善点】グローバル多重比較補正 ---
     # 全ての分析結果を一度結合し、どの分析からのp値か分かるようにラベルを付ける
     detailed_file_results['analysis_type'] = 'detailed_by_type_and_smell'
@@ -404,7 +354,7 @@ def main():
     if not all_results.empty:
         p_values_to_correct = all_results['p_value'].dropna()
         if not p_values_to_correct.empty:
-            reject, pvals_corrected, _, _ = multipletests(p_values_to_correct, alpha=0.05, method='fdr_bh')
+            reject, pvals_corrected, _, _ = multipletests(p_values_to_correct, alpha=FDR_ALPHA, method=FDR_METHOD)
 
             # 元のDataFrameのインデックスを使って結果を正しくマッピング
             all_results.loc[p_values_to_correct.index, 'p_value_corrected'] = pvals_corrected
@@ -0,0 +1,166 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from signed_rank_table import null_table
+
+special = lazy_import("scipy.special")
+
+# scipy.stats.wilcoxon(method="auto")と同じ切り替え:
+# n <= 50 で同順位・ゼロが無ければ厳密分布、n <= 13 で同順位・ゼロがあれば全符号反転の並べ替え検定、
+# それ以外は正規近似 (連続性補正なし)
+EXACT_MAX_N = 50
+PERMUTATION_MAX_N = 13
+
+GROUP_RESULT_COLUMNS = [
+    "total_pairs", "improvements", "degradations", "no_changes", "n_nonzero",
+    "diff_median", "diff_mean", "statistic", "r_plus", "z", "p_value", "method",
+]
+
+
+def _subset_sum_counts(weights):
+    """Number of sign assignments giving each value of sum(w_i * B_i), B_i in {0, 1}."""
+    counts = np.zeros(int(np.sum(weights)) + 1)
+    counts[0] = 1
+    top = 0
+    for w in weights:
+        counts[w:top + w + 1] += counts[:top + 1].copy()
+        top += w
+    return counts
+
+
+def _two_sided_p(counts, observed):
+    """2 * min(P(S <= observed), P(S >= observed)), clipped to 1."""
+    total = counts.sum()
+    cdf = counts[:int(np.ceil(observed)) + 1].sum() / total
+    sf = counts[int(np.floor(observed)):].sum() / total
+    return min(1.0, 2 * min(cdf, sf))
+
+
+def signed_rank_tests(d, codes, n_groups):
+    """
+    Two-sided Wilcoxon signed-rank tests of the paired differences `d` for
+    every group at once (`codes` in 0..n_groups-1). Zeros are dropped
+    (zero_method="wilcox") and the p-value method follows
+    scipy.stats.wilcoxon(method="auto"). Returns a dict of per-group arrays.
+    """
+    d = np.asarray(d, dtype="float64")
+    codes = np.asarray(codes, dtype="int64")
+    n = np.bincount(codes, minlength=n_groups)
+    n_zero = np.bincount(codes[d == 0], minlength=n_groups)
+
+    nonzero = d != 0
+    d_nz, codes_nz = d[nonzero], codes[nonzero]
+    order = np.lexsort((np.abs(d_nz), codes_nz))
+    d_sorted, codes_sorted = d_nz[order], codes_nz[order]
+    abs_sorted = np.abs(d_sorted)
+    count = np.bincount(codes_sorted, minlength=n_groups)
+    group_start = np.concatenate([[0], np.cumsum(count)[:-1]])
+    position = np.arange(len(d_sorted)) - group_start[codes_sorted] + 1
+
+    # グループ内で|d|が等しい連続区間 (同順位) に平均順位を割り当てる
+    new_run = np.ones(len(d_sorted), dtype=bool)
+    new_run[1:] = (codes_sorted[1:] != codes_sorted[:-1]) | (abs_sorted[1:] != abs_sorted[:-1])
+    run_start = np.flatnonzero(new_run)
+    run_length = np.diff(np.append(run_start, len(d_sorted)))
+    run_rank = position[run_start] + (run_length - 1) / 2
+    ranks = np.repeat(run_rank, run_length)
+    run_codes = codes_sorted[run_start]
+
+    r_plus = np.bincount(codes_sorted, weights=ranks * (d_sorted > 0), minlength=n_groups)
+    r_minus = np.bincount(codes_sorted, weights=ranks * (d_sorted < 0), minlength=n_groups)
+    tie_correct = np.bincount(run_codes, weights=run_length.astype("float64") ** 3 - run_length, minlength=n_groups)
+    has_ties = np.bincount(run_codes, weights=run_length > 1, minlength=n_groups) > 0
+
+    mean = count * (count + 1.0) * 0.25
+    se = np.sqrt((count * (count + 1.0) * (2.0 * count + 1.0) - tie_correct / 2) / 24)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (r_plus - mean) / se
+    p_value = 2 * special.ndtr(-np.abs(z))
+
+    exact = (n <= EXACT_MAX_N) & ~has_ties & (n_zero == 0)
+    permutation = ~exact & (n <= PERMUTATION_MAX_N)
+    method = np.where(exact, "exact", np.where(permutation, "permutation", "asymptotic"))
+    if exact.any():
+        # 同順位が無い場合の帰無分布は n だけで決まるので、保存済みの表を引くだけ
+        p_value[exact] = null_table(EXACT_MAX_N).p_values(count[exact], r_plus[exact])
+    for g in np.flatnonzero(permutation):
+        # 順位は0.5刻みなので2倍して整数の重みにする
+        start = group_start[g]
+        doubled = np.rint(2 * ranks[start:start + count[g]]).astype("int64")
+        p_value[g] = _two_sided_p(_subset_sum_counts(doubled), 2 * r_plus[g])
+
+    return {
+        "n": n, "n_nonzero": count, "statistic": np.minimum(r_plus, r_minus), "r_plus": r_plus,
+        "r_minus": r_minus, "z": z, "p_value": p_value, "method": method,
+    }
+
+
+def grouped_wilcoxon(df, by, before="before_value", after="after_value", sort=True):
+    """
+    Per-group change counts and Wilcoxon signed-rank test of `before` vs `after`
+    (the same as scipy.stats.wilcoxon(before, after) on each group), for every
+    group of `by` in one pass. One row per observed group, in
+    df.groupby(by, sort=sort) order, with the `by` columns as plain values.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    grouped = df.groupby(by, observed=True, sort=sort)
+    codes = grouped.ngroup().to_numpy()
+    keys = grouped.size().index.to_frame(index=False).astype(object)
+    before_values = df[before].to_numpy(dtype="float64")
+    after_values = df[after].to_numpy(dtype="float64")
+    d = before_values - after_values
+    tests = signed_rank_tests(d, codes, len(keys))
+
+    change = pd.Series(after_values - before_values).groupby(codes)
+    improvements = np.bincount(codes, weights=after_values < before_values, minlength=len(keys)).astype("int64")
+    degradations = np.bincount(codes, weights=after_values > before_values, minlength=len(keys)).astype("int64")
+    results = pd.DataFrame({
+        "total_pairs": tests["n"],
+        "improvements": improvements,
+        "degradations": degradations,
+        "no_changes": tests["n"] - improvements - degradations,
+        "n_nonzero": tests["n_nonzero"],
+        "diff_median": change.median().to_numpy(),
+        "diff_mean": change.mean().to_numpy(),
+        "statistic": tests["statistic"],
+        "r_plus": tests["r_plus"],
+        "z": tests["z"],
+        "p_value": tests["p_value"],
+        "method": tests["method"],
+    }, columns=GROUP_RESULT_COLUMNS)
+    return pd.concat([keys, results], axis=1)
+
+
+def calculate_effect_size_r(p_value, n, diff_median, diff_mean):
+    """
+    p値から効果量rを計算する（ハイブリッド版）。グループごとの配列をまとめて受け取る。
+    まず差 (after - before) の中央値で方向を判断し、0なら平均値をタイブレークに使う。
+    """
+    p_value = np.asarray(p_value, dtype=float)
+    n = np.asarray(n, dtype=float)
+    # まず中央値で判断し、中央値が0の場合は平均値で判断 (平均値も0なら方向性はない)
+    sign = np.where(diff_median != 0, np.sign(diff_median), np.sign(diff_mean))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z_score = np.abs(special.ndtri(p_value / 2.0))
+        r = sign * (z_score / np.sqrt(n))
+    return np.where((n == 0) | (p_value >= 1) | (sign == 0), 0.0, r)
+
+
+def tested_groups(df, group_by_cols, min_pairs=5):
+    """
+    全グループのWilcoxon検定を一括で行い、ペア数がmin_pairs未満のグループを除く。
+    変化が1件も無いグループは検定せず p=1, 効果量0, 統計量NaN とする。
+    """
+    groups = grouped_wilcoxon(df, group_by_cols)
+    groups = groups[groups["total_pairs"] >= min_pairs].reset_index(drop=True)
+    tested = groups["no_changes"] < groups["total_pairs"]
+    groups["wilcoxon_stat"] = groups["statistic"].where(tested)
+    groups["p_value"] = groups["p_value"].where(tested, 1.0)
+    groups["effect_size_r"] = np.where(tested, calculate_effect_size_r(
+        groups["p_value"], groups["total_pairs"], groups["diff_median"], groups["diff_mean"]), 0.0)
+    return groups
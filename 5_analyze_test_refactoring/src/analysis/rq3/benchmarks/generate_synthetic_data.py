@@ -0,0 +1,186 @@
+import argparse
+import csv
+import json
+import logging
+import os
+import random
+import sys
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "1_analyze_testsmell_diff"))
+from testsmell_diff_calculator import FILE_SMELL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# 実データと同じ配置 (--base-dir にこのディレクトリを渡せば各スクリプトがそのまま動く)
+SMELL_DIR = "5_analyze_test_refactoring/TestSmellDetector/results/smells"
+ANNOTATION_JSON = "5_analyze_test_refactoring/src/results/annotation_result_2024-02-20.json"
+SAMPLING_CSV = "2_sampling_test_refactor_commits/result/sampling_test_commits_all.csv"
+SMELL_RESULT_DIR = "5_analyze_test_refactoring/src/smells_result"
+
+METHOD_SMELLS = [s for s in FILE_SMELL_COLUMNS if s != "NumberOfMethods"]
+ELEMENT_KINDS = [("method", "MethodDeclaration"), ("invocation", "MethodInvocation"), ("code fragment", "CodeFragment")]
+REFACTORING_TYPES = [
+    "Change Assertion Type", "Split Test Method", "Prebuilt Fixture", "Delegated Setup", "Grouping Tests",
+    "Parameterized Test", "Add explanation message", "Extract Method", "Inline Method", "Rename Method"
+]
+SAMPLING_COLUMNS = [
+    "repository_name", "repository_url", "commit_id", "parent_commit_id", "commit_url", "commit_date",
+    "changed_files_count", "total_addition_lines", "total_deletions_lines"
+]
+
+
+def _sha(rnd):
+    return f"{rnd.getrandbits(160):040x}"
+
+
+def _test_file(rnd, repo, files_per_commit, smells_per_file):
+    """One test file: its methods (line ranges) and method/class smells."""
+    module, package = rnd.randrange(max(1, files_per_commit // 10)), rnd.randrange(5)
+    path = f"module{module}/src/test/java/org/example/pkg{package}/Class{rnd.randrange(10 * files_per_commit)}Test.java"
+    methods, line = [], 20
+    for _ in range(rnd.randint(3, 30)):
+        length = rnd.randint(5, 40)
+        methods.append((line, line + length))
+        line += length + 2
+    smells = []
+    for _ in range(rnd.randint(0, 2 * smells_per_file)):
+        begin, end = rnd.choice(methods)
+        parent_type = "Method" if rnd.random() < 0.85 else "Class"
+        smells.append({"smellName": rnd.choice(METHOD_SMELLS), "smellParentType": parent_type,
+                       "beginLine": begin, "endLine": end})
+    return {"path": path, "abs_path": f"/work/repos/{repo}/{path}", "methods": methods, "smells": smells}
+
+
+def _perturb(rnd, test_file):
+    """The same file after a refactoring: some smells removed, a few added."""
+    smells = [s for s in test_file["smells"] if rnd.random() < 0.8]
+    for _ in range(rnd.randint(0, 2)):
+        begin, end = rnd.choice(test_file["methods"])
+        smells.append({"smellName": rnd.choice(METHOD_SMELLS), "smellParentType": "Method",
+                       "beginLine": begin, "endLine": end})
+    return dict(test_file, smells=smells)
+
+
+def _write_commit(smell_dir, commit_dir, files):
+    """Write smells_number.csv and smells_result.json in TestSmellDetector's layout."""
+    out_dir = os.path.join(smell_dir, commit_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "smells_number.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["App", "TestFileName", "TestFilePath", "ProductionFilePath"] + FILE_SMELL_COLUMNS)
+        for test_file in files:
+            counts = {name: 0 for name in FILE_SMELL_COLUMNS}
+            for smell in test_file["smells"]:
+                counts[smell["smellName"]] += 1
+            counts["NumberOfMethods"] = len(test_file["methods"])
+            name = os.path.basename(test_file["path"])[:-len(".java")]
+            writer.writerow(["app", name, test_file["abs_path"], test_file["abs_path"].replace("/test/", "/main/")]
+                            + [counts[c] for c in FILE_SMELL_COLUMNS])
+    entries = [{"testFilePath": f["abs_path"], "smells": f["smells"]} for f in files]
+    with open(os.path.join(out_dir, "smells_result.json"), "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+
+
+def _parameter_data(rnd, files, elements_per_refactoring):
+    """parameter_data with RefactorHub's before/after -> kind -> elements layout."""
+    param = {}
+    for side in ("before", "after"):
+        param[side] = {kind: {"type": type_name, "state": "Manual", "elements": [], "multiple": True}
+                       for kind, type_name in ELEMENT_KINDS}
+        for _ in range(elements_per_refactoring):
+            test_file = rnd.choice(files)
+            kind, type_name = rnd.choice(ELEMENT_KINDS)
+            begin, end = rnd.choice(test_file["methods"])
+            if kind == "invocation":
+                begin = end = rnd.randint(begin, end)
+            param[side][kind]["elements"].append({
+                "type": type_name,
+                "location": {"path": test_file["path"],
+                             "range": {"startLine": begin, "endLine": end, "startColumn": 5, "endColumn": 40}},
+            })
+    return param
+
+
+def generate(base_dir, commits=1300, files_per_commit=20, smells_per_file=10,
+             refactorings_per_commit=2, elements_per_refactoring=3, seed=0):
+    """
+    Generate a synthetic replication tree under `base_dir`: per-commit smell
+    results for every sampled commit and its parent, the annotation JSON and
+    the sampling CSV. Returns the generation config.
+    """
+    rnd = random.Random(seed)
+    smell_dir = os.path.join(base_dir, SMELL_DIR)
+    repos = [f"owner{i}/repo{i}" for i in range(max(1, commits // 10))]
+    annotations, sampling_rows = [], []
+    for i in range(commits):
+        repo = rnd.choice(repos)
+        sha, parent_sha = _sha(rnd), _sha(rnd)
+        parent_files = [_test_file(rnd, repo, files_per_commit, smells_per_file) for _ in range(files_per_commit)]
+        files = [_perturb(rnd, f) for f in parent_files]
+        _write_commit(smell_dir, f"{repo}/{parent_sha}", parent_files)
+        _write_commit(smell_dir, f"{repo}/{sha}", files)
+        url = f"https://github.com/{repo}/commit/{sha}"
+        sampling_rows.append({
+            "repository_name": repo, "repository_url": f"https://github.com/{repo}", "commit_id": sha,
+            "parent_commit_id": parent_sha, "commit_url": url, "commit_date": "Wed May 19 12:44:53 CEST 2021",
+            "changed_files_count": rnd.randint(1, 20), "total_addition_lines": rnd.randint(1, 500),
+            "total_deletions_lines": rnd.randint(1, 500),
+        })
+        for order in range(refactorings_per_commit):
+            annotations.append({
+                "commit_id": str(uuid.UUID(int=rnd.getrandbits(128))), "experiment_id": "synthetic",
+                "experiment_title": "test-refactoring-1", "order_index": i, "type_name": rnd.choice(REFACTORING_TYPES),
+                "description": "", "parameter_data": _parameter_data(rnd, files, elements_per_refactoring),
+                "snapshot_id": str(uuid.UUID(int=rnd.getrandbits(128))), "annotator_name": "synthetic", "url": url,
+            })
+        if (i + 1) % 1000 == 0:
+            logger.info(f"Generated {i + 1}/{commits} commits")
+
+    for rel_path in (ANNOTATION_JSON, SAMPLING_CSV):
+        os.makedirs(os.path.dirname(os.path.join(base_dir, rel_path)), exist_ok=True)
+    os.makedirs(os.path.join(base_dir, SMELL_RESULT_DIR), exist_ok=True)
+    with open(os.path.join(base_dir, ANNOTATION_JSON), "w", encoding="utf-8") as f:
+        json.dump(annotations, f, ensure_ascii=False)
+    with open(os.path.join(base_dir, SAMPLING_CSV), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=SAMPLING_COLUMNS)
+        writer.writeheader()
+        writer.writerows(sampling_rows)
+
+    config = {"commits": commits, "files_per_commit": files_per_commit, "smells_per_file": smells_per_file,
+              "refactorings_per_commit": refactorings_per_commit,
+              "elements_per_refactoring": elements_per_refactoring, "seed": seed}
+    with open(os.path.join(base_dir, "synthetic_config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+def add_generator_arguments(parser):
+    parser.add_argument("--commits", type=int, default=1300, help="Number of sampled commits (1300 ~ current data).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplier applied to --commits (e.g. 10, 100).")
+    parser.add_argument("--files-per-commit", type=int, default=20, help="Test files per commit.")
+    parser.add_argument("--smells-per-file", type=int, default=10, help="Mean number of smells per test file.")
+    parser.add_argument("--refactorings-per-commit", type=int, default=2, help="Annotated refactorings per commit.")
+    parser.add_argument("--elements-per-refactoring", type=int, default=3, help="Annotated elements per side.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+
+
+def generate_from_args(base_dir, args):
+    return generate(base_dir, commits=int(args.commits * args.scale), files_per_commit=args.files_per_commit,
+                    smells_per_file=args.smells_per_file, refactorings_per_commit=args.refactorings_per_commit,
+                    elements_per_refactoring=args.elements_per_refactoring, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic test smell results and annotations.")
+    parser.add_argument("--base-dir", type=str, required=True, help="Directory to generate the tree in.")
+    add_generator_arguments(parser)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    config = generate_from_args(args.base_dir, args)
+    logger.info(f"Generated synthetic data in {args.base_dir}: {config}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RQ3_DIR = os.path.dirname(HERE)
+DIFF_DIR = os.path.join(RQ3_DIR, "1_analyze_testsmell_diff")
+sys.path.append(DIFF_DIR)
+sys.path.append(os.path.dirname(RQ3_DIR))
+from annotation_data import compact_annotations, load_annotations, memory_usage
+from annotation_elements import build_element_table, side_elements, element_file_names
+from testsmell_data_loader import load_commit_data, get_parent_commit_url, load_smell_csv, load_smell_json
+from testsmell_diff_calculator import (
+    calculate_file_level_diff, bulk_method_level_counts, counts_by_refactoring, method_smell_frame, build_wide_row,
+    build_json_object
+)
+from testsmell_diff_writer import write_csv, write_typed_table, NDJSONWriter
+from generate_synthetic_data import (
+    SMELL_DIR, ANNOTATION_JSON, SAMPLING_CSV, add_generator_arguments, generate_from_args
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Context:
+    """Inputs shared by the benchmarks; each stage stores what the next one needs."""
+
+    def __init__(self, base_dir, work_dir):
+        self.base_dir = base_dir
+        self.work_dir = work_dir
+        self.smell_dir = os.path.join(base_dir, SMELL_DIR)
+        self.annotation_json = os.path.join(base_dir, ANNOTATION_JSON)
+        self.commit_csv = os.path.join(base_dir, SAMPLING_CSV)
+
+
+def bench_annotations_read_json(ctx):
+    """The annotation JSON with plain pd.read_json (object columns and nested parameter_data)."""
+    ctx.raw_annotations = pd.read_json(ctx.annotation_json)
+    return {"rows": len(ctx.raw_annotations), "frame_bytes": memory_usage(ctx.raw_annotations)}
+
+
+def bench_annotations_compact(ctx):
+    """The annotation JSON with annotation_data.load_annotations (categoricals, no parameter_data)."""
+    ctx.compact_annotations = load_annotations(ctx.annotation_json)
+    return {"rows": len(ctx.compact_annotations), "frame_bytes": memory_usage(ctx.compact_annotations)}
+
+
+def bench_load(ctx):
+    """Annotation/commit data plus the smell CSV and (filtered) JSON of every commit."""
+    raw = pd.read_json(ctx.annotation_json)
+    annotation_df = compact_annotations(raw)
+    commit_df = load_commit_data(ctx.commit_csv)
+    elements = build_element_table(raw)
+    del raw
+    parents = {url: get_parent_commit_url(url, commit_df) for url in annotation_df["url"].unique()}
+    rows, names = [], {}
+    for refactoring_id, url in annotation_df["url"].items():
+        if parents[url] is None:
+            continue
+        commit_dir = url.replace("https://github.com/", "").replace("commit/", "")
+        parent_dir = parents[url].replace("https://github.com/", "").replace("commit/", "")
+        rows.append((refactoring_id, url, annotation_df.at[refactoring_id, "type_name"], parent_dir, commit_dir))
+    elements_by_id = dict(tuple(elements.groupby("refactoring_id", sort=False)))
+    for refactoring_id, _, _, parent_dir, commit_dir in rows:
+        row_elements = elements_by_id.get(refactoring_id, elements.iloc[0:0])
+        names.setdefault(parent_dir, set()).update(element_file_names(side_elements(row_elements, "before")))
+        names.setdefault(commit_dir, set()).update(element_file_names(side_elements(row_elements, "after")))
+    csvs = {d: load_smell_csv(os.path.join(ctx.smell_dir, d, "smells_number.csv")) for d in names}
+    jsons = {d: load_smell_json(os.path.join(ctx.smell_dir, d, "smells_result.json"), n) for d, n in names.items()}
+    ctx.rows, ctx.elements, ctx.elements_by_id, ctx.csvs, ctx.jsons = rows, elements, elements_by_id, csvs, jsons
+    return {"refactorings": len(rows), "commits": len(names), "elements": len(elements)}
+
+
+def bench_file_diff(ctx):
+    """calculate_file_level_diff for every refactoring."""
+    empty = ctx.elements.iloc[0:0]
+    ctx.file_counts = {
+        refactoring_id: calculate_file_level_diff(ctx.elements_by_id.get(refactoring_id, empty),
+                                                  ctx.csvs[parent_dir], ctx.csvs[commit_dir])
+        for refactoring_id, _, _, parent_dir, commit_dir in ctx.rows
+    }
+
+
+def bench_method_diff(ctx):
+    """Method-level counts of all refactorings with one bulk interval join."""
+    pending = pd.DataFrame([(r, p, c) for r, _, _, p, c in ctx.rows], columns=["refactoring_id", "before", "after"])
+    ranges = ctx.elements.merge(pending, on="refactoring_id")
+    ranges["commit"] = ranges["before"].where(ranges["side"] == "before", ranges["after"])
+    smells = method_smell_frame(ctx.jsons)
+    ctx.method_counts = counts_by_refactoring(bulk_method_level_counts(ranges, smells))
+    return {"method_smells": len(smells), "ranges": len(ranges)}
+
+
+def bench_write(ctx):
+    """Wide CSVs, NDJSON and the typed (Parquet) tables."""
+    file_rows, method_rows = [], []
+    out_dir = os.path.join(ctx.work_dir, "write")
+    os.makedirs(out_dir, exist_ok=True)
+    with NDJSONWriter(os.path.join(out_dir, "test_smell_analysis.ndjson")) as writer:
+        for refactoring_id, url, type_name, _, _ in ctx.rows:
+            before_file, after_file, diff_file = ctx.file_counts[refactoring_id]
+            counts = ctx.method_counts.get(refactoring_id, {"before": {}, "after": {}})
+            diff_method = {k: counts["after"].get(k, 0) - counts["before"].get(k, 0)
+                           for k in set(counts["before"]) | set(counts["after"])}
+            file_rows.append(build_wide_row(url, type_name, before_file, after_file, diff_file))
+            method_rows.append(build_wide_row(url, type_name, counts["before"], counts["after"], diff_method))
+            writer.write(build_json_object(url, type_name, diff_file, before_file, after_file,
+                                           diff_method, counts["before"], counts["after"]))
+    write_csv(file_rows, os.path.join(out_dir, "file_level_wide.csv"))
+    write_csv(method_rows, os.path.join(out_dir, "method_level_wide.csv"))
+    write_typed_table(file_rows, os.path.join(out_dir, "file_level_wide.parquet"))
+    write_typed_table(method_rows, os.path.join(out_dir, "method_level_wide.parquet"))
+
+
+def _run_script(args):
+    subprocess.run([sys.executable] + args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def bench_analyze_testsmell_diff(ctx):
+    """End to end: analyze_testsmell_diff.py, recomputing every row."""
+    _run_script([os.path.join(DIFF_DIR, "analyze_testsmell_diff.py"), "--base-dir", ctx.base_dir,
+                 "--annotation-json", ctx.annotation_json, "--commit-csv", ctx.commit_csv,
+                 "--output-dir", os.path.join(ctx.work_dir, "analyze"), "--full"])
+
+
+def bench_calculate_testsmell_changed_amount(ctx):
+    """End to end: the standalone calculate_testsmell_changed_amount.py."""
+    _run_script([os.path.join(RQ3_DIR, "calculate_testsmell_changed_amount.py"), "--base-dir", ctx.base_dir,
+                 "--log-file", os.path.join(ctx.work_dir, "calculate.log")])
+
+
+# (名前, 関数, 既定で実行するか) の順に実行する。後の段は前の段の結果を使う
+REQUIRES = {"file_diff": ["load"], "method_diff": ["load"], "write": ["load", "file_diff", "method_diff"]}
+BENCHMARKS = [
+    ("annotations_read_json", bench_annotations_read_json, True),
+    ("annotations_compact", bench_annotations_compact, True),
+    ("load", bench_load, True),
+    ("file_diff", bench_file_diff, True),
+    ("method_diff", bench_method_diff, True),
+    ("write", bench_write, True),
+    ("analyze_testsmell_diff", bench_analyze_testsmell_diff, True),
+    ("calculate_testsmell_changed_amount", bench_calculate_testsmell_changed_amount, False),
+]
+# 計測後にtracemallocの下でもう1回実行してメモリを記録する (サブプロセスを起動するものは除く)
+MEASURE_MEMORY = {"annotations_read_json", "annotations_compact", "load"}
+
+
+def traced_memory(func, ctx):
+    """
+    Bytes allocated by one call of func: what is still allocated afterwards
+    (e.g. the frames it keeps on ctx) and the peak during the call.
+    """
+    tracemalloc.start()
+    try:
+        func(ctx)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"retained_bytes": retained, "peak_bytes": peak}
+
+
+def run_benchmarks(base_dir, repeat=3, names=None):
+    """
+    Run each benchmark `repeat` times and return a JSON-serialisable dict of
+    wall-clock timings (seconds) with min/median per benchmark, plus the
+    traced memory of one more run for those in MEASURE_MEMORY.
+    """
+    selected = [name for name, _, default in BENCHMARKS if (name in names if names is not None else default)]
+    needed = set(selected).union(*(REQUIRES.get(name, []) for name in selected))
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        ctx = Context(base_dir, work_dir)
+        for name, func, _ in BENCHMARKS:
+            if name not in needed:
+                continue
+            if name not in selected:
+                func(ctx)  # 後の段の入力を作るだけで計測しない
+                continue
+            runs, info = [], None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                info = func(ctx)
+                runs.append(time.perf_counter() - start)
+            results[name] = {"runs": runs, "min": min(runs), "median": statistics.median(runs)}
+            if info:
+                results[name]["info"] = info
+            message = f"{name}: median {results[name]['median']:.3f}s"
+            if name in MEASURE_MEMORY:
+                results[name]["memory"] = traced_memory(func, ctx)
+                message += f", peak {results[name]['memory']['peak_bytes'] / 2 ** 20:.1f} MiB"
+            logger.info(message)
+    return results
+
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "pandas": pd.__version__, "numpy": np.__version__, "cpu_count": os.cpu_count()}
+
+
+def compare(current, previous):
+    """Print the median of each benchmark next to a previous result file."""
+    print(f"{'benchmark':40s} {'previous':>10s} {'current':>10s} {'ratio':>7s}")
+    for name, result in current["benchmarks"].items():
+        before = previous.get("benchmarks", {}).get(name)
+        if before is None:
+            print(f"{name:40s} {'-':>10s} {result['median']:10.3f} {'-':>7s}")
+        else:
+            print(f"{name:40s} {before['median']:10.3f} {result['median']:10.3f} "
+                  f"{result['median'] / before['median']:7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RQ3 test smell diff pipeline on synthetic data.")
+    parser.add_argument("--base-dir", type=str, required=True,
+                        help="Synthetic tree to benchmark (see generate_synthetic_data.py).")
+    parser.add_argument("--generate", action="store_true", help="Generate the synthetic tree first.")
+    add_generator_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark.")
+    parser.add_argument("--only", type=str, nargs="+", choices=[b[0] for b in BENCHMARKS], default=None,
+                        help="Benchmarks to run (default: all except calculate_testsmell_changed_amount).")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Result JSON (default: benchmark_results/<timestamp>.json next to this script).")
+    parser.add_argument("--compare", type=str, default=None, help="Previous result JSON to compare against.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.generate:
+        generate_from_args(args.base_dir, args)
+    config_path = os.path.join(args.base_dir, "synthetic_config.json")
+    config = None
+    if os.path.isfile(config_path):
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+    result = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": config,
+        "environment": environment(),
+        "repeat": args.repeat,
+        "benchmarks": run_benchmarks(args.base_dir, repeat=args.repeat, names=args.only),
+    }
+    output = args.output or os.path.join(HERE, "benchmark_results",
+                                         f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    logger.info(f"Benchmark results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
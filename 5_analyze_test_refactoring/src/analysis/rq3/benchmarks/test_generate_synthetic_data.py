@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from generate_synthetic_data import generate, SMELL_DIR, ANNOTATION_JSON, SAMPLING_CSV
+from run_benchmarks import run_benchmarks
+
+
+class TestGenerateSyntheticData(unittest.TestCase):
+    """合成データ生成とベンチマーク実行のユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.base_dir = self.tmp_dir.name
+        self.config = generate(self.base_dir, commits=3, files_per_commit=4, smells_per_file=3,
+                               refactorings_per_commit=2, elements_per_refactoring=2, seed=1)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_layout(self):
+        """実データと同じ配置でコミットと親コミットの結果が生成されることをテストする"""
+        commits = pd.read_csv(os.path.join(self.base_dir, SAMPLING_CSV))
+        with open(os.path.join(self.base_dir, ANNOTATION_JSON), "r", encoding="utf-8") as f:
+            annotations = json.load(f)
+        self.assertEqual(len(commits), 3)
+        self.assertEqual(len(annotations), 6)
+        for _, row in commits.iterrows():
+            for sha in (row["commit_id"], row["parent_commit_id"]):
+                commit_dir = os.path.join(self.base_dir, SMELL_DIR, row["repository_name"], sha)
+                self.assertTrue(os.path.isfile(os.path.join(commit_dir, "smells_number.csv")))
+                self.assertTrue(os.path.isfile(os.path.join(commit_dir, "smells_result.json")))
+
+    def test_csv_counts_match_json(self):
+        """smells_number.csvの件数がsmells_result.jsonのスメル数と一致することをテストする"""
+        commit = pd.read_csv(os.path.join(self.base_dir, SAMPLING_CSV)).iloc[0]
+        commit_dir = os.path.join(self.base_dir, SMELL_DIR, commit["repository_name"], commit["commit_id"])
+        df = pd.read_csv(os.path.join(commit_dir, "smells_number.csv"))
+        with open(os.path.join(commit_dir, "smells_result.json"), "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        for entry in entries:
+            row = df[df["TestFilePath"] == entry["testFilePath"]].iloc[0]
+            for smell in {s["smellName"] for s in entry["smells"]}:
+                self.assertEqual(row[smell], sum(s["smellName"] == smell for s in entry["smells"]))
+
+    def test_run_in_process_benchmarks(self):
+        """プロセス内のベンチマークが実行され、計測結果が返ることをテストする"""
+        results = run_benchmarks(self.base_dir, repeat=1, names=["method_diff", "write"])
+        self.assertEqual(set(results), {"method_diff", "write"})
+        self.assertEqual(len(results["write"]["runs"]), 1)
+
+    def test_annotation_memory(self):
+        """アノテーションの読み込みでメモリも記録され、コンパクトな表の方が小さいことをテストする"""
+        results = run_benchmarks(self.base_dir, repeat=1, names=["annotations_read_json", "annotations_compact"])
+        raw, compact = results["annotations_read_json"], results["annotations_compact"]
+        self.assertEqual(raw["info"]["rows"], compact["info"]["rows"])
+        self.assertLess(compact["memory"]["retained_bytes"], raw["memory"]["retained_bytes"])
+        self.assertNotIn("memory", results.get("write", {}))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,102 @@
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+
+rankdata = lazy_import("scipy.stats", "rankdata")
+
+BOOTSTRAP_COLUMNS = [
+    "n_pairs", "median_diff", "median_diff_ci_low", "median_diff_ci_high",
+    "rank_biserial", "rank_biserial_ci_low", "rank_biserial_ci_high",
+]
+# 1回に作るリサンプル行列の要素数の上限 (メモリを抑える)
+MAX_CHUNK_ELEMENTS = 4_000_000
+
+
+def paired_statistics(samples):
+    """
+    Median difference and matched-pairs rank-biserial correlation of each row
+    of `samples` (differences after - before). Zeros are dropped for the
+    rank-biserial r, which is 0 for rows without any change.
+    """
+    samples = np.atleast_2d(samples)
+    median = np.median(samples, axis=1)
+    # ゼロは|d|が最小なので全体の順位からゼロの個数を引けばゼロを除いた順位になる
+    n_zero = (samples == 0).sum(axis=1, keepdims=True)
+    ranks = rankdata(np.abs(samples), axis=1) - n_zero
+    r_plus = (ranks * (samples > 0)).sum(axis=1)
+    r_minus = (ranks * (samples < 0)).sum(axis=1)
+    total = r_plus + r_minus
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rank_biserial = np.where(total > 0, (r_plus - r_minus) / total, 0.0)
+    return median, rank_biserial
+
+
+def bootstrap_group(diff, n_resamples, confidence, seed):
+    """
+    Percentile bootstrap intervals of paired_statistics for one group's
+    differences, resampling pairs with replacement.
+    """
+    diff = np.asarray(diff, dtype="float64")
+    n = len(diff)
+    rng = np.random.default_rng(seed)
+    chunk = max(1, MAX_CHUNK_ELEMENTS // max(n, 1))
+    medians, rank_biserials = [], []
+    for start in range(0, n_resamples, chunk):
+        index = rng.integers(0, n, size=(min(chunk, n_resamples - start), n))
+        median, rank_biserial = paired_statistics(diff[index])
+        medians.append(median)
+        rank_biserials.append(rank_biserial)
+    alpha = (1 - confidence) / 2
+    median_ci = np.quantile(np.concatenate(medians), [alpha, 1 - alpha])
+    rank_biserial_ci = np.quantile(np.concatenate(rank_biserials), [alpha, 1 - alpha])
+    median, rank_biserial = paired_statistics(diff)
+    return (n, median[0], median_ci[0], median_ci[1],
+            rank_biserial[0], rank_biserial_ci[0], rank_biserial_ci[1])
+
+
+def _bootstrap_batch(diffs, n_resamples, confidence, seeds):
+    return [bootstrap_group(diff, n_resamples, confidence, seed) for diff, seed in zip(diffs, seeds)]
+
+
+def bootstrap_effect_sizes(df, by, n_resamples=2000, confidence=0.95, seed=0, min_pairs=5, n_jobs=None,
+                           before="before_value", after="after_value"):
+    """
+    Bootstrap confidence intervals of the median difference and rank-biserial r
+    (after - before) for every group of `by` with at least `min_pairs` pairs.
+
+    Each group draws from its own child of SeedSequence(seed), so the result
+    does not depend on n_jobs or on how groups are split across processes.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    grouped = df.groupby(by, observed=True, sort=True)
+    keys = grouped.size().index.to_frame(index=False).astype(object)
+    codes = grouped.ngroup().to_numpy()
+    diff = df[after].to_numpy(dtype="float64") - df[before].to_numpy(dtype="float64")
+    order = np.argsort(codes, kind="stable")
+    diffs = np.split(diff[order], np.cumsum(np.bincount(codes, minlength=len(keys)))[:-1])
+    seeds = np.random.SeedSequence(seed).spawn(len(keys))
+
+    selected = [g for g in range(len(keys)) if len(diffs[g]) >= min_pairs]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(selected) < 2:
+        rows = _bootstrap_batch([diffs[g] for g in selected], n_resamples, confidence, [seeds[g] for g in selected])
+    else:
+        # 大きいグループから順に各プロセスへ振り分け、負荷を均す
+        by_size = sorted(selected, key=lambda g: -len(diffs[g]))
+        batches = [by_size[i::n_jobs] for i in range(n_jobs) if by_size[i::n_jobs]]
+        with ProcessPoolExecutor(max_workers=len(batches)) as executor:
+            futures = [executor.submit(_bootstrap_batch, [diffs[g] for g in batch], n_resamples, confidence,
+                                       [seeds[g] for g in batch]) for batch in batches]
+            results = dict(zip((g for batch in batches for g in batch),
+                               (row for future in futures for row in future.result())))
+        rows = [results[g] for g in selected]
+
+    result = pd.DataFrame(rows, columns=BOOTSTRAP_COLUMNS)
+    result["n_pairs"] = result["n_pairs"].astype("int64")
+    return pd.concat([keys.iloc[selected].reset_index(drop=True), result], axis=1)
@@ -3,10 +3,19 @@ import logging
 import os
 import argparse
 import platform
+import sys
 from collections import defaultdict
 
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "1_analyze_testsmell_diff"))
+from testsmell_diff_writer import NDJSONWriter, write_typed_table, build_long_frame, write_long_table
+from testsmell_data_loader import iter_smell_entries
+from annotation_elements import ELEMENT_COLUMNS, load_annotation_elements, side_elements, element_file_names
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from annotation_data import load_annotations
+
 # --- 設定 ---
 def get_default_base_dir():
     """実行OSに応じてデフォルトのBASE_DIRを返す"""
@@ -65,7 +74,12 @@ logger = logging.getLogger(__name__)
 
 
 def get_refactoring_data_from_annotation_data():
-    return pd.read_json(f"{RESULTS_DIR}/annotation_result_2024-02-20.json")
+    return load_annotations(f"{RESULTS_DIR}/annotation_result_2024-02-20.json")
+
+
+def get_annotation_elements():
+    """parameter_dataを要素ごとに展開した表 (アノテーションJSONのハッシュでキャッシュする)"""
+    return load_annotation_elements(f"{RESULTS_DIR}/annotation_result_2024-02-20.json", cache_dir=SMELL_RESULT_DIR)
 
 
 def get_parent_commit_id(df2, commit_id):
@@ -82,11 +96,11 @@ def load_csv_smell_data(commit_dir: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 
-def load_json_smell_data(commit_dir: str) -> list:
+def load_json_smell_data(commit_dir: str, file_names=None) -> list:
+    """file_namesを指定した場合は、該当ファイルのエントリのみをストリーミングで読み込む"""
     json_path = f"{TEST_SMELL_DIR}/results/smells/{commit_dir}/smells_result.json"
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return list(iter_smell_entries(json_path, file_names))
     except Exception as e:
         logger.error(f"Failed to load JSON file: {json_path} - {e}")
         return []
@@ -94,31 +108,17 @@ def load_json_smell_data(commit_dir: str) -> list:
 
 # ---------------------------
 # ファイルレベル
-def get_file_smell_counts(param_data: dict, df: pd.DataFrame) -> dict:
-    from collections import defaultdict
-    total_counts = defaultdict(int)
-    processed_files = set()
-
-    for data_type, data_dict in param_data.items():
-        elements = data_dict.get("elements", [])
-        for elem in elements:
-            # locationがNoneの場合はスキップ
-            if elem.get("location") is None:
-                logger.warning(f"Skipping element with None location in {data_type}: {elem}")
-                continue
-            
-            file_path = elem["location"]["path"]
-            file_name = os.path.basename(file_path)
-
-            if file_name in processed_files:
-                continue
-            processed_files.add(file_name)
-
-            matches = df[df["TestFilePath"].str.endswith(file_name)]
-            for _, row in matches.iterrows():
-                for col in FILE_SMELL_COLUMNS:
-                    total_counts[col] += row.get(col, 0)
-    return dict(total_counts)
+def get_file_smell_counts(elements: pd.DataFrame, df: pd.DataFrame) -> dict:
+    """elements: 片側(before/after)の要素の行"""
+    total_counts = {}
+    for file_name in elements["basename"].dropna().drop_duplicates():
+        matches = df[df["TestFilePath"].str.endswith(file_name)]
+        if matches.empty:
+            continue
+        for col in FILE_SMELL_COLUMNS:
+            value = matches[col].sum(skipna=False) if col in matches else 0
+            total_counts[col] = total_counts.get(col, 0) + (value.item() if hasattr(value, "item") else value)
+    return total_counts
 
 def diff_file_smell_counts(before_counts: dict, after_counts: dict) -> dict:
     result = {}
@@ -144,28 +144,15 @@ def extract_method_smells(entries: list, start_line, end_line, file_name) -> lis
                     method_smells.append(s)
     return method_smells
 
-def get_range_smell_count(param_data: dict, commit_json: list) -> dict:
-    from collections import defaultdict
+def get_range_smell_count(elements: pd.DataFrame, commit_json: list) -> dict:
+    """elements: 片側(before/after)の要素の行。範囲(range)を持つ要素のみ数える"""
     total_counts = defaultdict(int)
-
-    for data_type, data_dict in param_data.items():
-        elements = data_dict.get("elements", [])
-        for elem in elements:
-            # locationがNoneの場合はスキップ
-            if elem.get("location") is None:
-                logger.warning(f"Skipping element with None location in {data_type}: {elem}")
-                continue
-            
-            file_path = elem["location"]["path"]
-            file_name = os.path.basename(file_path)
-            rng = elem["location"].get("range")
-            if rng:
-                start_line = rng.get("startLine")
-                end_line   = rng.get("endLine")
-                matched    = extract_method_smells(commit_json, start_line, end_line, file_name)
-                for ms in matched:
-                    smell_name = ms.get("smellName")
-                    total_counts[smell_name] += 1
+    ranged = elements[elements["basename"].notna() & elements["start_line"].notna() & elements["end_line"].notna()]
+    for file_name, start_line, end_line in ranged[["basename", "start_line", "end_line"]].itertuples(index=False):
+        matched = extract_method_smells(commit_json, start_line, end_line, file_name)
+        for ms in matched:
+            smell_name = ms.get("smellName")
+            total_counts[smell_name] += 1
     return dict(total_counts)
 
 def compare_method_level_smells(after_smells: dict, before_smells: dict) -> dict:
@@ -239,7 +226,7 @@ def build_json_object(commit_url: str, type_name: str,
 # ---------------------------
 def process_parameter_data(
     ref_type: str,
-    parameter_data: dict,
+    elements: pd.DataFrame,
     commit_url: str,
     parent_commit_url: str,
     file_wide_df: pd.DataFrame,
@@ -251,18 +238,20 @@ def process_parameter_data(
     parent_commit_dir = parent_commit_url.replace("https://github.com/", "").replace("commit/", "")
     commit_df = load_csv_smell_data(commit_dir)
     parent_df = load_csv_smell_data(parent_commit_dir)
-    # JSON読み込み
-    commit_json = load_json_smell_data(commit_dir)
-    parent_json = load_json_smell_data(parent_commit_dir)
+    before_elements = side_elements(elements, "before")
+    after_elements = side_elements(elements, "after")
+    # JSON読み込み (アノテーションされたファイルのみ)
+    commit_json = load_json_smell_data(commit_dir, element_file_names(after_elements))
+    parent_json = load_json_smell_data(parent_commit_dir, element_file_names(before_elements))
 
     # ファイルレベル: before/after/diff
-    before_file = get_file_smell_counts(parameter_data.get("before", {}), parent_df)
-    after_file  = get_file_smell_counts(parameter_data.get("after", {}), commit_df)
+    before_file = get_file_smell_counts(before_elements, parent_df)
+    after_file  = get_file_smell_counts(after_elements, commit_df)
     diff_file   = diff_file_smell_counts(before_file, after_file)
 
     # rangeレベル: before/after/diff
-    before_range = get_range_smell_count(parameter_data.get("before", {}), parent_json)
-    after_range  = get_range_smell_count(parameter_data.get("after", {}), commit_json)
+    before_range = get_range_smell_count(before_elements, parent_json)
+    after_range  = get_range_smell_count(after_elements, commit_json)
     diff_range   = compare_method_level_smells(after_range, before_range)
 
     # --- ファイルレベル (ワイド形式) ---
@@ -304,7 +293,7 @@ def process_parameter_data(
     json_list.append(json_obj)
 
 
-def process_grouped_data(commit_url, df2, group,
+def process_grouped_data(commit_url, df2, group, elements_by_id: dict,
                          file_wide_df: pd.DataFrame,
                          range_wide_df: pd.DataFrame,
                          json_list: list):
@@ -319,8 +308,10 @@ def process_grouped_data(commit_url, df2, group,
         parent_commit_url = f"{repo_url}/commit/{parent_commit_id}"
         for i, row in group.iterrows():
             ref_type = row.get("type_name", "UnknownRefactoring")
-            param_data = row["parameter_data"]
-            process_parameter_data(ref_type, param_data,
+            row_elements = elements_by_id.get(i)
+            if row_elements is None:  # 位置情報を持つ要素が1つも無いリファクタリング
+                row_elements = pd.DataFrame(columns=ELEMENT_COLUMNS)
+            process_parameter_data(ref_type, row_elements,
                                    commit_url, parent_commit_url,
                                    file_wide_df, range_wide_df,
                                    json_list)
@@ -334,6 +325,14 @@ def main():
     parser = argparse.ArgumentParser(description="Calculate test smell changes from refactoring data.")
     parser.add_argument("--base-dir", type=str, default=get_default_base_dir(), help="Base directory of the project.")
     parser.add_argument("--log-file", type=str, default="logfile.log", help="Path to the log file.")
+    parser.add_argument("--json-format", type=str, choices=["ndjson", "json"], default="ndjson",
+                        help="ndjson: 1行1オブジェクトで逐次書き出す / json: 最後にまとめて書き出す")
+    parser.add_argument("--compression", type=str, choices=["gzip", "zstd"], default=None,
+                        help="NDJSON出力の圧縮形式")
+    parser.add_argument("--long-format", type=str, choices=["parquet", "feather", "csv", "none"], default="none",
+                        help="両レベルをまとめたロング形式の表 (test_smell_long.<形式>) も出力する")
+    parser.add_argument("--typed-format", type=str, choices=["parquet", "feather", "none"], default="parquet",
+                        help="ワイド形式の表を型付きの列指向形式でも出力する (pyarrowが必要)")
     args = parser.parse_args()
 
     # グローバル変数を設定
@@ -349,20 +348,32 @@ def main():
     try:
         df1 = get_refactoring_data_from_annotation_data()
         df2 = pd.read_csv(f"{BASE_DIR}/2_sampling_test_refactor_commits/result/sampling_test_commits_all.csv")
+        elements = get_annotation_elements()
+        elements_by_id = dict(tuple(elements.groupby("refactoring_id", sort=False)))
 
         # ワイド形式のDataFrame(ファイルレベル/メソッドレベル)
         file_wide_df = create_filelevel_wide_df()
         range_wide_df = create_rangelevel_wide_df()
 
-        # JSON出力用のリスト
-        json_list = []
-
-        grouped = df1.groupby("url")
-        for commit_url, group in grouped:
-            logger.info(f"Processing refactoring data for {commit_url}")
-            process_grouped_data(commit_url, df2, group,
-                                 file_wide_df, range_wide_df,
-                                 json_list)
+        # JSON出力用のリスト (ndjsonの場合は1リファクタリングごとに逐次書き出す)
+        if args.json_format == "ndjson":
+            suffix = {"gzip": ".gz", "zstd": ".zst"}.get(args.compression, "")
+            output_json = f"{SMELL_RESULT_DIR}/test_smell_analysis.ndjson{suffix}"
+            json_list = NDJSONWriter(output_json, compression=args.compression)
+        else:
+            output_json = f"{SMELL_RESULT_DIR}/test_smell_analysis.json"
+            json_list = []
+
+        try:
+            grouped = df1.groupby("url", observed=True)
+            for commit_url, group in grouped:
+                logger.info(f"Processing refactoring data for {commit_url}")
+                process_grouped_data(commit_url, df2, group, elements_by_id,
+                                     file_wide_df, range_wide_df,
+                                     json_list)
+        finally:
+            if isinstance(json_list, NDJSONWriter):
+                json_list.close()
 
         # CSV出力
         file_csv = f"{SMELL_RESULT_DIR}/file_level_wide.csv"
@@ -373,10 +384,24 @@ def main():
         logger.info(f"File-level wide CSV saved to: {file_csv}")
         logger.info(f"Method-level wide CSV saved to: {range_csv}")
 
+        # 型付きの列指向形式 (RQ3の各スクリプトはこちらを優先して読み込む)
+        if args.typed_format != "none":
+            for wide_df, name in [(file_wide_df, "file_level_wide"), (range_wide_df, "method_level_wide")]:
+                typed_path = f"{SMELL_RESULT_DIR}/{name}.{args.typed_format}"
+                if write_typed_table(wide_df, typed_path):
+                    logger.info(f"Typed table saved to: {typed_path}")
+
+        # ロング形式 (RQ3の各スクリプトはあればこれを整形なしで読み込む)
+        if args.long_format != "none":
+            long_path = f"{SMELL_RESULT_DIR}/test_smell_long.{args.long_format}"
+            if write_long_table([build_long_frame(file_wide_df, "file"), build_long_frame(range_wide_df, "method")],
+                                long_path):
+                logger.info(f"Long table saved to: {long_path}")
+
         # JSON出力 (1リファクタリング1オブジェクト)
-        output_json = f"{SMELL_RESULT_DIR}/test_smell_analysis.json"
-        with open(output_json, "w", encoding="utf-8") as f:
-            json.dump(json_list, f, ensure_ascii=False, indent=2)
+        if isinstance(json_list, list):
+            with open(output_json, "w", encoding="utf-8") as f:
+                json.dump(json_list, f, ensure_ascii=False, indent=2)
         logger.info(f"JSON saved to: {output_json}")
 
     except Exception as e:
@@ -0,0 +1,143 @@
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+import pandas as pd
+
+# 描画処理の共通部分を変えたら上げる (全ての図を描き直す)
+RENDER_VERSION = 1
+MANIFEST_NAME = ".figure_hashes.json"
+
+
+class FigureSpec(NamedTuple):
+    """
+    One figure: draw(data, **kwargs) draws on a fresh pyplot figure of
+    `figsize`, which is then saved to `path` with `savefig` options.
+    `draw` must be a module-level function so worker processes can load it.
+    The source of draw's whole module is part of the cache key; functions or
+    modules from elsewhere that the drawing relies on go in `depends`.
+    """
+    path: str
+    draw: Callable
+    data: object
+    kwargs: dict = {}
+    figsize: tuple = (12, 6)
+    savefig: Optional[dict] = None
+    depends: tuple = ()
+
+
+def _update_hash(h, value):
+    if isinstance(value, pd.DataFrame):
+        h.update(repr((list(value.columns), [str(t) for t in value.dtypes])).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        _update_hash(h, value.to_frame())
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _update_hash(h, item)
+    elif isinstance(value, dict):
+        for key in sorted(value):
+            h.update(repr(key).encode())
+            _update_hash(h, value[key])
+    else:
+        h.update(repr(value).encode())
+
+
+def _source(obj):
+    """Source code of a function or module, or its name if the source is unavailable."""
+    try:
+        return inspect.getsource(obj)
+    except (OSError, TypeError):
+        return f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', getattr(obj, '__name__', repr(obj)))}"
+
+
+def spec_hash(spec):
+    """
+    Hash of the figure's data, drawing code and style. The drawing code is the
+    source of draw's module (so helpers and constants next to it count) plus
+    that of every entry of `depends`.
+    """
+    h = hashlib.sha256(str(RENDER_VERSION).encode())
+    # 描画関数だけでなくモジュール全体 (同じファイルの補助関数・定数を含む)
+    h.update(_source(inspect.getmodule(spec.draw) or spec.draw).encode())
+    h.update(f"{spec.draw.__module__}.{spec.draw.__qualname__}".encode())
+    for dependency in spec.depends:
+        h.update(_source(dependency).encode())
+    _update_hash(h, spec.data)
+    _update_hash(h, (spec.kwargs, spec.figsize, spec.savefig))
+    return h.hexdigest()
+
+
+def _use_agg():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def render_figure(spec):
+    """Draw and save one figure, always closing it."""
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=spec.figsize)
+    try:
+        spec.draw(spec.data, **spec.kwargs)
+        fig.savefig(spec.path, **(spec.savefig or {}))
+    finally:
+        plt.close(fig)
+    return spec.path
+
+
+def _load_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def render_figures(specs, n_jobs=None, force=False):
+    """
+    Render the figures whose output is missing or whose data, drawing code or
+    style changed since the last run (recorded in .figure_hashes.json next to
+    the figures) on the Agg backend, in a process pool unless n_jobs is 1.
+    Returns {path: "rendered" | "cached"}.
+    """
+    manifests, hashes, pending, status = {}, {}, [], {}
+    for spec in specs:
+        directory = os.path.dirname(os.path.abspath(spec.path))
+        manifest = manifests.setdefault(directory, _load_manifest(directory))
+        hashes[spec.path] = spec_hash(spec)
+        name = os.path.basename(spec.path)
+        if not force and os.path.isfile(spec.path) and manifest.get(name) == hashes[spec.path]:
+            status[spec.path] = "cached"
+        else:
+            pending.append(spec)
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(pending))
+    if n_jobs <= 1:
+        # ワーカーと同じく非対話のバックエンドで描く
+        if pending:
+            _use_agg()
+        for spec in pending:
+            render_figure(spec)
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_use_agg) as executor:
+            # 例外はここで再送出される
+            list(executor.map(render_figure, pending))
+
+    for spec in pending:
+        status[spec.path] = "rendered"
+        directory = os.path.dirname(os.path.abspath(spec.path))
+        manifests[directory][os.path.basename(spec.path)] = hashes[spec.path]
+    for directory, manifest in manifests.items():
+        if any(os.path.dirname(os.path.abspath(s.path)) == directory for s in pending):
+            _save_manifest(directory, manifest)
+    return status
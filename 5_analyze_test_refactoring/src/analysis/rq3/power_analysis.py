@@ -0,0 +1,208 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from batched_wilcoxon import EXACT_MAX_N
+from signed_rank_table import null_table
+from smell_pairs import load_paired_tables
+
+special = lazy_import("scipy.special")
+
+POWER_COLUMNS = ["total_pairs", "n_nonzero", "achieved_power", "required_n", "power_adequate"]
+# 1バッチのグループ数 (乱数の割り当てはバッチ単位なので並列数によらず結果は同じ)
+BATCH_GROUPS = 32
+# 1回に作る (グループ × 反復 × 値) の件数配列の要素数の上限
+MAX_CHUNK_ELEMENTS = 8_000_000
+
+
+def group_distributions(diffs):
+    """
+    Empirical distribution of each group's differences as probabilities over
+    [0, +a_1, -a_1, +a_2, -a_2, ...] for its distinct non-zero |d| values
+    a_1 < a_2 < ..., padded with zero probability to a common width.
+    """
+    levels = [np.unique(np.abs(d[d != 0])) for d in diffs]
+    width = max((len(a) for a in levels), default=0)
+    pvals = np.zeros((len(diffs), 1 + 2 * width))
+    for g, (d, a) in enumerate(zip(diffs, levels)):
+        if len(d) == 0:
+            continue
+        pvals[g, 0] = np.mean(d == 0)
+        index = np.searchsorted(a, np.abs(d[d != 0]))
+        positive = d[d != 0] > 0
+        pvals[g, 1:1 + 2 * len(a):2] = np.bincount(index[positive], minlength=len(a)) / len(d)
+        pvals[g, 2:2 + 2 * len(a):2] = np.bincount(index[~positive], minlength=len(a)) / len(d)
+    return pvals
+
+
+def sample_counts(rng, sizes, pvals, n_simulations):
+    """
+    Multinomial(sizes[g], pvals[g]) counts for n_simulations replicates of
+    every group at once (shape: groups x replicates x values), drawn as a
+    chain of conditional binomials.
+    """
+    n_groups, width = pvals.shape
+    remaining = np.repeat(np.asarray(sizes, dtype="int64")[:, None], n_simulations, axis=1)
+    counts = np.zeros((n_groups, n_simulations, width), dtype="int64")
+    # 確率が正の最後の値に残りを全て割り当てる (丸め誤差で余りが出ないように)
+    last = width - 1 - np.argmax(pvals[:, ::-1] > 0, axis=1)
+    mass_left = np.ones(n_groups)
+    for k in range(width):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            q = np.clip(np.where(mass_left > 0, pvals[:, k] / mass_left, 0.0), 0.0, 1.0)
+        q = np.where(k == last, 1.0, np.where(k > last, 0.0, q))
+        counts[:, :, k] = rng.binomial(remaining, q[:, None])
+        remaining -= counts[:, :, k]
+        mass_left -= pvals[:, k]
+    return counts
+
+
+def signed_rank_p_values(counts):
+    """
+    Two-sided Wilcoxon signed-rank p-values of samples given as counts over
+    group_distributions' values (last axis). Zeros are dropped; the exact
+    null distribution is used without ties or zeros for n <= 50 (as scipy's
+    method="auto"), the normal approximation with tie correction otherwise.
+    """
+    zeros, positives, negatives = counts[..., 0], counts[..., 1::2], counts[..., 2::2]
+    ties = positives + negatives
+    n = ties.sum(axis=-1)
+    # 同じ|d|の値には平均順位を付ける
+    average_rank = np.cumsum(ties, axis=-1) - ties + (ties + 1) / 2
+    r_plus = (positives * average_rank).sum(axis=-1)
+    tie_correct = (ties.astype("float64") ** 3 - ties).sum(axis=-1)
+    mean = n * (n + 1.0) / 4
+    var = n * (n + 1.0) * (2 * n + 1.0) / 24 - tie_correct / 48
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (r_plus - mean) / np.sqrt(var)
+    p_value = np.where((n > 0) & (var > 0), 2 * special.ndtr(-np.abs(z)), 1.0)
+
+    exact = (n > 0) & (n <= EXACT_MAX_N) & (zeros == 0) & (ties.max(axis=-1, initial=0) <= 1)
+    if exact.any():
+        p_value[exact] = null_table(EXACT_MAX_N).p_values(n[exact], r_plus[exact])
+    return p_value
+
+
+def simulated_power(rng, sizes, pvals, n_simulations, alpha):
+    """Fraction of replicates of size sizes[g] drawn from pvals[g] with p < alpha, per group."""
+    n_groups, width = pvals.shape
+    power = np.empty(n_groups)
+    chunk = max(1, MAX_CHUNK_ELEMENTS // max(n_simulations * width, 1))
+    for start in range(0, n_groups, chunk):
+        stop = min(start + chunk, n_groups)
+        counts = sample_counts(rng, sizes[start:stop], pvals[start:stop], n_simulations)
+        power[start:stop] = (signed_rank_p_values(counts) < alpha).mean(axis=1)
+    return power
+
+
+def candidate_sizes(min_n, max_n, n_sizes=48):
+    """Roughly log-spaced sample sizes searched for the required n."""
+    return np.unique(np.round(np.geomspace(min_n, max_n, n_sizes)).astype("int64"))
+
+
+def _power_batch(pvals, observed_n, n_simulations, alpha, target_power, grid, seed):
+    rng = np.random.default_rng(seed)
+    testable = pvals[:, 0] < 1
+    achieved = np.zeros(len(pvals))
+    required = np.full(len(pvals), np.nan)
+    if not testable.any():
+        return achieved, required
+    pvals = pvals[testable]
+    achieved[testable] = simulated_power(rng, observed_n[testable], pvals, n_simulations, alpha)
+
+    # 検出力は標本サイズについて単調なので、候補サイズの上で二分探索する (全グループ同時)
+    lo = np.zeros(len(pvals), dtype="int64")
+    hi = np.full(len(pvals), len(grid) - 1)
+    reachable = simulated_power(rng, np.full(len(pvals), grid[-1]), pvals, n_simulations, alpha) >= target_power
+    active = reachable & (lo < hi)
+    while active.any():
+        mid = (lo + hi) // 2
+        power = simulated_power(rng, grid[mid[active]], pvals[active], n_simulations, alpha)
+        enough = np.zeros(len(pvals), dtype=bool)
+        enough[active] = power >= target_power
+        hi = np.where(active & enough, mid, hi)
+        lo = np.where(active & ~enough, mid + 1, lo)
+        active = reachable & (lo < hi)
+    required[np.flatnonzero(testable)[reachable]] = grid[lo[reachable]]
+    return achieved, required
+
+
+def power_analysis(df, by, n_simulations=1000, alpha=0.05, target_power=0.8, min_n=5, max_n=2000, seed=0,
+                   n_jobs=None, sort=True, before="before_value", after="after_value"):
+    """
+    Monte-Carlo power of the Wilcoxon signed-rank test for every group of
+    `by`, resampling each group's observed differences (after - before):
+    achieved_power at the group's own size and required_n, the smallest
+    candidate size in [min_n, max_n] reaching `target_power` (NaN if none
+    does, or if the group has no change at all).
+
+    Groups are simulated together in batches of BATCH_GROUPS with one child
+    of SeedSequence(seed) each, so the result does not depend on n_jobs.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    grouped = df.groupby(by, observed=True, sort=sort)
+    keys = grouped.size().index.to_frame(index=False).astype(object)
+    codes = grouped.ngroup().to_numpy()
+    diff = df[after].to_numpy(dtype="float64") - df[before].to_numpy(dtype="float64")
+    order = np.argsort(codes, kind="stable")
+    observed_n = np.bincount(codes, minlength=len(keys))
+    diffs = np.split(diff[order], np.cumsum(observed_n)[:-1])
+    grid = candidate_sizes(min_n, max_n)
+
+    batches = [range(start, min(start + BATCH_GROUPS, len(keys))) for start in range(0, len(keys), BATCH_GROUPS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    tasks = [(group_distributions([diffs[g] for g in batch]), observed_n[batch.start:batch.stop],
+              n_simulations, alpha, target_power, grid, batch_seed) for batch, batch_seed in zip(batches, seeds)]
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    if n_jobs <= 1:
+        results = [_power_batch(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(_power_batch, *zip(*tasks)))
+
+    achieved = np.concatenate([r[0] for r in results]) if results else np.zeros(0)
+    required = np.concatenate([r[1] for r in results]) if results else np.zeros(0)
+    n_nonzero = np.bincount(codes[diff != 0], minlength=len(keys))
+    result = pd.DataFrame({
+        "total_pairs": observed_n.astype("int64"),
+        "n_nonzero": n_nonzero.astype("int64"),
+        "achieved_power": achieved,
+        "required_n": required,
+        "power_adequate": achieved >= target_power,
+    }, columns=POWER_COLUMNS)
+    return pd.concat([keys, result], axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte-Carlo power of the Wilcoxon test for the RQ3 groups.")
+    parser.add_argument("--csv-dir", type=str, required=True, help="Directory with the smell result tables.")
+    parser.add_argument("--output-dir", type=str, default=".", help="Output directory for the CSV tables.")
+    parser.add_argument("--by", type=str, nargs="+", default=["type_name", "test_smell"], help="Group columns.")
+    parser.add_argument("--simulations", type=int, default=1000, help="Simulated samples per group and size.")
+    parser.add_argument("--alpha", type=float, default=0.05, help="Significance level of the test.")
+    parser.add_argument("--target-power", type=float, default=0.8, help="Power the required n must reach.")
+    parser.add_argument("--max-n", type=int, default=2000, help="Largest sample size searched.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores).")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    file_df, method_df = load_paired_tables(args.csv_dir)
+    for level, df in (("file", file_df), ("method", method_df)):
+        start = time.perf_counter()
+        result = power_analysis(df, args.by, args.simulations, args.alpha, args.target_power, max_n=args.max_n,
+                                seed=args.seed, n_jobs=args.jobs)
+        result.to_csv(os.path.join(args.output_dir, f"power_analysis_{level}.csv"), index=False)
+        print(f"{level}: {len(result)} groups, {result['power_adequate'].sum()} adequately powered "
+              f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
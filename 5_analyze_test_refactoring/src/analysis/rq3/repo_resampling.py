@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from smell_pairs import load_paired_tables
+
+binom = lazy_import("scipy.stats", "binom")
+
+# リポジトリごとに足し合わせられる統計量 (差は after - before)
+SUM_COLUMNS = ["n", "improvements", "degradations", "sum_diff", "sum_diff_sq"]
+STATISTIC_COLUMNS = [
+    "total_pairs", "improvement_rate", "degradation_rate", "mean_diff", "effect_size", "sign_test_p",
+]
+BOOTSTRAP_STATISTICS = ["improvement_rate", "degradation_rate", "mean_diff", "effect_size"]
+# 1回に作る (リサンプル × グループ × 統計量) 配列の要素数の上限
+MAX_CHUNK_ELEMENTS = 20_000_000
+
+
+def repository_of(commit_urls):
+    """owner/repo of each GitHub commit URL (https://github.com/<owner>/<repo>/commit/<sha>), as a Categorical."""
+    urls = pd.Categorical(commit_urls)
+    repos = urls.categories.str.replace("https://github.com/", "", regex=False).str.split("/commit/").str[0]
+    repo_codes, repo_names = pd.factorize(repos, sort=True)
+    return pd.Categorical.from_codes(np.where(urls.codes >= 0, repo_codes[urls.codes], -1), categories=repo_names)
+
+
+class RepositorySums:
+    """
+    Per (group, repository) sums of SUM_COLUMNS for the groups of `by`.
+    sums has shape (n_groups, n_repositories, len(SUM_COLUMNS)); any subset or
+    reweighting of repositories is a weighted sum over its second axis.
+    """
+
+    def __init__(self, df, by, before="before_value", after="after_value"):
+        self.by = [by] if isinstance(by, str) else list(by)
+        grouped = df.groupby(self.by, observed=True, sort=True)
+        self.keys = grouped.size().index.to_frame(index=False).astype(object)
+        group_codes = grouped.ngroup().to_numpy()
+        repos = repository_of(df["commit_url"])
+        self.repositories = pd.Index(repos.categories, name="repository")
+        repo_codes = repos.codes.astype("int64")
+
+        before_values = df[before].to_numpy(dtype="float64")
+        after_values = df[after].to_numpy(dtype="float64")
+        diff = after_values - before_values
+        cell = group_codes * len(self.repositories) + repo_codes
+        size = len(self.keys) * len(self.repositories)
+        columns = [np.ones(len(diff)), after_values < before_values, after_values > before_values, diff, diff ** 2]
+        self.sums = np.stack([np.bincount(cell, weights=c, minlength=size) for c in columns], axis=-1) \
+            .reshape(len(self.keys), len(self.repositories), len(SUM_COLUMNS))
+
+    def total(self, weights=None):
+        """Sums over repositories, optionally weighted: weights (..., n_repositories)."""
+        if weights is None:
+            return self.sums.sum(axis=1)
+        n_groups, n_repos, n_sums = self.sums.shape
+        # (..., R) @ (R, G*S) の行列積にしてBLASで計算する
+        flat = self.sums.transpose(1, 0, 2).reshape(n_repos, n_groups * n_sums)
+        return (weights @ flat).reshape(weights.shape[:-1] + (n_groups, n_sums))
+
+
+def statistics_from_sums(sums, sign_test=True):
+    """
+    Group statistics from summed SUM_COLUMNS (last axis): change rates, mean
+    difference, paired Cohen's d over changed pairs (as in the descriptive
+    analysis) and, if `sign_test`, the two-sided sign test p-value.
+    """
+    n, improvements, degradations, sum_diff, sum_diff_sq = np.moveaxis(sums, -1, 0)
+    changed = improvements + degradations
+    with np.errstate(divide="ignore", invalid="ignore"):
+        improvement_rate = np.where(n > 0, improvements / n * 100, np.nan)
+        degradation_rate = np.where(n > 0, degradations / n * 100, np.nan)
+        mean_diff = np.where(n > 0, sum_diff / n, np.nan)
+        # 変化したペアだけの平均と標準偏差 (ゼロは和に寄与しない)
+        changed_mean = sum_diff / changed
+        changed_std = np.sqrt(np.maximum(sum_diff_sq / changed - changed_mean ** 2, 0))
+        effect_size = np.where((changed > 1) & (changed_std > 0), changed_mean / changed_std, 0.0)
+    stats = {
+        "total_pairs": n, "improvement_rate": improvement_rate, "degradation_rate": degradation_rate,
+        "mean_diff": mean_diff, "effect_size": effect_size,
+    }
+    if sign_test:
+        sign_test_p = np.minimum(1.0, 2 * binom.cdf(np.minimum(improvements, degradations), changed, 0.5))
+        stats["sign_test_p"] = np.where(changed > 0, sign_test_p, 1.0)
+    return stats
+
+
+def group_statistics(repo_sums):
+    """STATISTIC_COLUMNS of every group on all repositories."""
+    stats = pd.DataFrame(statistics_from_sums(repo_sums.total()), columns=STATISTIC_COLUMNS)
+    stats["total_pairs"] = stats["total_pairs"].astype("int64")
+    return pd.concat([repo_sums.keys, stats], axis=1)
+
+
+def leave_one_repository_out(repo_sums):
+    """
+    Group statistics with each repository excluded in turn, for the (group,
+    repository) pairs where the repository contributes pairs, with the change
+    of each statistic relative to the full data.
+    """
+    full_sums = repo_sums.total()
+    group_index, repo_index = np.nonzero(repo_sums.sums[:, :, 0])
+    reduced = full_sums[group_index] - repo_sums.sums[group_index, repo_index]
+    full = statistics_from_sums(full_sums[group_index])
+    excluded = statistics_from_sums(reduced)
+
+    result = repo_sums.keys.iloc[group_index].reset_index(drop=True)
+    result["excluded_repository"] = repo_sums.repositories[repo_index]
+    result["excluded_pairs"] = repo_sums.sums[group_index, repo_index, 0].astype("int64")
+    for col in STATISTIC_COLUMNS:
+        result[col] = excluded[col]
+        if col != "total_pairs":
+            result[f"{col}_change"] = excluded[col] - full[col]
+    result["total_pairs"] = result["total_pairs"].astype("int64")
+    return result
+
+
+def cluster_bootstrap(repo_sums, n_resamples=2000, confidence=0.95, seed=0):
+    """
+    Repository-clustered bootstrap: resample repositories with replacement and
+    recompute every group's statistics from the weighted repository sums.
+    Returns percentile intervals of BOOTSTRAP_STATISTICS per group.
+    """
+    rng = np.random.default_rng(seed)
+    n_groups, n_repos, n_sums = repo_sums.sums.shape
+    chunk = max(1, MAX_CHUNK_ELEMENTS // max(n_groups * n_sums, 1))
+    draws = {col: [] for col in BOOTSTRAP_STATISTICS}
+    for start in range(0, n_resamples, chunk):
+        size = min(chunk, n_resamples - start)
+        picks = rng.integers(0, n_repos, size=(size, n_repos))
+        # 各リサンプルで各リポジトリが選ばれた回数を重みにする
+        cells = (np.arange(size)[:, None] * n_repos + picks).ravel()
+        weights = np.bincount(cells, minlength=size * n_repos).reshape(size, n_repos).astype("float64")
+        stats = statistics_from_sums(repo_sums.total(weights), sign_test=False)
+        for col in BOOTSTRAP_STATISTICS:
+            draws[col].append(stats[col])
+
+    alpha = (1 - confidence) / 2
+    result = group_statistics(repo_sums)
+    for col in BOOTSTRAP_STATISTICS:
+        values = np.concatenate(draws[col])
+        # 選ばれたリポジトリにグループのペアが無いリサンプルは除いて分位点を取る
+        low, high = np.nanquantile(values, [alpha, 1 - alpha], axis=0)
+        result[f"{col}_ci_low"] = low
+        result[f"{col}_ci_high"] = high
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Repository-clustered bootstrap and leave-one-repository-out sensitivity of the RQ3 groups.")
+    parser.add_argument("--csv-dir", type=str, required=True, help="Directory with the smell result tables.")
+    parser.add_argument("--output-dir", type=str, default=".", help="Output directory for the CSV tables.")
+    parser.add_argument("--by", type=str, nargs="+", default=["type_name", "test_smell"], help="Group columns.")
+    parser.add_argument("--resamples", type=int, default=2000, help="Cluster bootstrap resamples.")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the intervals.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the bootstrap.")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    file_df, method_df = load_paired_tables(args.csv_dir)
+    for level, df in (("file", file_df), ("method", method_df)):
+        start = time.perf_counter()
+        repo_sums = RepositorySums(df, args.by)
+        leave_one_repository_out(repo_sums).to_csv(
+            os.path.join(args.output_dir, f"leave_one_repository_out_{level}.csv"), index=False)
+        cluster_bootstrap(repo_sums, args.resamples, args.confidence, args.seed).to_csv(
+            os.path.join(args.output_dir, f"cluster_bootstrap_{level}.csv"), index=False)
+        print(f"{level}: {len(repo_sums.keys)} groups x {len(repo_sums.repositories)} repositories "
+              f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
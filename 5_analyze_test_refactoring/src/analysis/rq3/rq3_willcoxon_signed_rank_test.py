@@ -1,10 +1,21 @@
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from scipy.stats import wilcoxon, norm
-from statsmodels.stats.multitest import multipletests
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from smell_tables import load_wide_tables
+from smell_pairs import load_paired_tables
+from batched_wilcoxon import grouped_wilcoxon
+from power_analysis import power_analysis
+from figure_renderer import FigureSpec, render_figures
+
+# 重いライブラリは使う関数の中で初めてimportする
+plt = lazy_import("matplotlib.pyplot")
+sns = lazy_import("seaborn")
+norm = lazy_import("scipy.stats", "norm")
+multipletests = lazy_import("statsmodels.stats.multitest", "multipletests")
 
 # Directory settings
 BASE_DIR = "/Users/horikawa/Dev/Research-repo/InvestigatingTheImpactOfTestSpecificRefactoring"
@@ -14,114 +25,101 @@ RESULTS_DIR = f"{BASE_DIR}/5_analyze_test_refactoring/src/analysis/rq3/statistic
 # Create output directory if it does not exist
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+SAVEFIG_OPTIONS = {"bbox_inches": "tight"}
+
+# Monte-Carlo power analysis settings (replaces the fixed n >= 20 rule)
+POWER_SIMULATIONS = 1000
+POWER_TARGET = 0.8
+POWER_SEED = 42
+
 
 def load_data():
-    """Load the dataset from a CSV file."""
-    file_level_path = f"{CSV_DIR}/file_level_wide.csv"
-    method_level_path = f"{CSV_DIR}/method_level_wide.csv"
-    file_df = pd.read_csv(file_level_path)
-    method_df = pd.read_csv(method_level_path)
-    return file_df, method_df
+    """Load the dataset (typed Parquet/Feather if present, otherwise CSV)."""
+    return load_wide_tables(CSV_DIR)
 
 
-def preprocess_data(df):
-    """
-    Reshape data to ensure before/after values are paired for each commit, type, and test smell.
-    """
-    test_smell_columns = [col for col in df.columns if "_diff" in col]
-    before_cols = [col.replace("_diff", "_before") for col in test_smell_columns]
-    after_cols = [col.replace("_diff", "_after") for col in test_smell_columns]
-    data = []
-    for idx, row in df.iterrows():
-        for smell, before_col, after_col in zip(test_smell_columns, before_cols, after_cols):
-            data.append({
-                "commit_url": row["commit_url"],
-                "type_name": row["type_name"],
-                "test_smell": smell.replace("_diff", ""),
-                "before_value": row[before_col] if pd.notnull(row[before_col]) else 0,
-                "after_value": row[after_col] if pd.notnull(row[after_col]) else 0,
-                "diff_value": row[smell] if pd.notnull(row[smell]) else 0
-            })
-    return pd.DataFrame(data)
+def _power_by(df, by):
+    """Achieved power and required sample size of the Wilcoxon test per group."""
+    return power_analysis(df, by, n_simulations=POWER_SIMULATIONS, target_power=POWER_TARGET, seed=POWER_SEED,
+                          sort=False)
 
 
 def wilcoxon_signed_rank_test(df, level):
     """
     Perform Wilcoxon signed-rank test for each test smell, with effect size and multiple testing correction.
     """
-    results = []
-    p_values = []
-    test_smell_list = []
-    for test_smell in df["test_smell"].unique():
-        subset = df[df["test_smell"] == test_smell]
-        before = subset["before_value"]
-        after = subset["after_value"]
-        n = len(subset)
-        
-        if (before == after).all():
-            continue
-        try:
-            stat, p_value = wilcoxon(before, after)
-            # Z値の推定
-            z = norm.ppf(1 - p_value / 2) * (-1 if stat < 0 else 1)
-            r = z / np.sqrt(len(before))
-            results.append({
-                "test_smell": test_smell,
-                "sample_size": n,
-                "Wilcoxon_stat": stat,
-                "p_value": p_value,
-                "effect_size_r": r,
-                "sample_size_adequate": n >= 20
-            })
-            p_values.append(p_value)
-            test_smell_list.append(test_smell)
-        except ValueError:
-            continue
-    # 多重検定補正
-    if p_values:
-        _, pvals_corrected, _, _ = multipletests(p_values, alpha=0.05, method='fdr_bh')
-        for i, res in enumerate(results):
-            res["p_value_corrected"] = pvals_corrected[i]
-    results_df = pd.DataFrame(results)
+    # All test smells are tested in one batch, in order of first appearance;
+    # smells without any change are skipped
+    groups = grouped_wilcoxon(df, "test_smell", sort=False)
+    groups = groups[groups["no_changes"] < groups["total_pairs"]].reset_index(drop=True)
+    results_df = pd.DataFrame()
+    if not groups.empty:
+        n = groups["total_pairs"]
+        # Z値の推定
+        z = norm.ppf(1 - groups["p_value"] / 2)
+        results_df = pd.DataFrame({
+            "test_smell": groups["test_smell"],
+            "sample_size": n,
+            "Wilcoxon_stat": groups["statistic"],
+            "p_value": groups["p_value"],
+            "effect_size_r": z / np.sqrt(n),
+        })
+        # サンプルサイズの妥当性は観測された差の分布でのシミュレーション検出力で判定する
+        power = _power_by(df, "test_smell")
+        results_df = results_df.merge(power[["test_smell", "achieved_power", "required_n", "power_adequate"]],
+                                      on="test_smell", how="left")
+        results_df = results_df.rename(columns={"power_adequate": "sample_size_adequate"})
+        # 多重検定補正
+        _, pvals_corrected, _, _ = multipletests(results_df["p_value"], alpha=0.05, method='fdr_bh')
+        results_df["p_value_corrected"] = pvals_corrected
     results_df.to_csv(f"{RESULTS_DIR}/wilcoxon_test_results_{level}.csv", index=False)
     return results_df
 
 
-def plot_results(df, level):
-    """Plot bar charts for p-values and effect sizes for overall test smells."""
-    plt.figure(figsize=(12, 6))
-    sns.barplot(data=df, x="test_smell", y="p_value", hue="test_smell", palette="coolwarm", legend=False)
+def _draw_p_values(df, level, column="p_value", ylabel="p-value", title="Wilcoxon p-values for {level} Level"):
+    sns.barplot(data=df, x="test_smell", y=column, hue="test_smell", palette="coolwarm", legend=False)
     plt.axhline(0.05, color="red", linestyle="--", label="Significance threshold (0.05)")
     plt.xticks(rotation=90)
     plt.xlabel("Test Smell")
-    plt.ylabel("p-value")
-    plt.title(f"Wilcoxon p-values for {level} Level")
+    plt.ylabel(ylabel)
+    plt.title(title.format(level=level))
     plt.legend()
-    plt.savefig(f"{RESULTS_DIR}/wilcoxon_p_values_{level}.png", bbox_inches="tight")
-    # plt.show()
 
-    plt.figure(figsize=(12, 6))
+
+def _draw_effect_sizes(df, level):
     sns.barplot(data=df, x="test_smell", y="effect_size_r", hue="test_smell", palette="viridis", legend=False)
     plt.xticks(rotation=90)
     plt.xlabel("Test Smell")
     plt.ylabel("Effect Size (r)")
     plt.title(f"Wilcoxon Effect Sizes for {level} Level")
-    plt.savefig(f"{RESULTS_DIR}/wilcoxon_effect_sizes_{level}.png", bbox_inches="tight")
-    # plt.show()
 
 
-def plot_boxplot(df, level):
-    """Plot boxplot of before and after values for each test smell."""
-    plt.figure(figsize=(14, 8))
+def plot_results(df, level):
+    """Bar charts for p-values and effect sizes for overall test smells (figure specs, see render_figures)."""
+    return [
+        FigureSpec(f"{RESULTS_DIR}/wilcoxon_p_values_{level}.png", _draw_p_values,
+                   df[["test_smell", "p_value"]], {"level": level}, savefig=SAVEFIG_OPTIONS),
+        FigureSpec(f"{RESULTS_DIR}/wilcoxon_effect_sizes_{level}.png", _draw_effect_sizes,
+                   df[["test_smell", "effect_size_r"]], {"level": level}, savefig=SAVEFIG_OPTIONS),
+    ]
+
+
+def _draw_boxplot(df, level):
     melted_data = df.melt(id_vars=["test_smell"], value_vars=["before_value", "after_value"],
                           var_name="Condition", value_name="Value")
-    sns.boxplot(data=melted_data, x="test_smell", y="Value", hue="Condition", palette="Set2")
+    sns.boxplot(data=melted_data, x="test_smell", y="Value", hue="Condition", palette="Set2",
+                order=df["test_smell"].unique())
     plt.xticks(rotation=90)
     plt.xlabel("Test Smell")
     plt.ylabel("Value")
     plt.title(f"Boxplot of Test Smells Before and After Refactoring ({level} Level)")
-    plt.savefig(f"{RESULTS_DIR}/boxplot_{level}.png", bbox_inches="tight")
-    # plt.show()
+
+
+def plot_boxplot(df, level):
+    """Boxplot of before and after values for each test smell (figure spec)."""
+    return [FigureSpec(f"{RESULTS_DIR}/boxplot_{level}.png", _draw_boxplot,
+                       df[["test_smell", "before_value", "after_value"]], {"level": level},
+                       figsize=(14, 8), savefig=SAVEFIG_OPTIONS)]
 
 
 def wilcoxon_by_type(df, level):
@@ -130,49 +128,32 @@ def wilcoxon_by_type(df, level):
     Wilcoxon signed-rank test を実施し、統計量、p値、効果量（r）を算出する。
     結果はCSVとして保存します。
     """
-    results = []
-    for type_name, group in df.groupby("type_name"):
-        for test_smell in group["test_smell"].unique():
-            subset = group[group["test_smell"] == test_smell]
-            before = subset["before_value"].fillna(0)
-            after = subset["after_value"].fillna(0)
-            # 必要ならば、両者の長さを合わせる
-            min_len = min(len(before), len(after))
-            before = before.iloc[:min_len]
-            after = after.iloc[:min_len]
-            if (before == after).all():
-                continue
-            try:
-                stat, p_value = wilcoxon(before, after)
-                # Calculate Z from p-value (two-sided)
-                z = norm.ppf(1 - p_value / 2) * (-1 if stat < 0 else 1)
-                effect_size = z / np.sqrt(len(before))
-                results.append({
-                    "type_name": type_name,
-                    "test_smell": test_smell,
-                    "Wilcoxon_stat": stat,
-                    "p_value": p_value,
-                    "effect_size_r": effect_size
-                })
-            except Exception as e:
-                print(f"Error processing test smell {test_smell} for type {type_name}: {e}")
-    results_df = pd.DataFrame(results)
+    # 全ての (type_name, test_smell) を一括で検定し、type_name順・各type内ではスメルの出現順に並べる
+    groups = grouped_wilcoxon(df, ["type_name", "test_smell"], sort=False)
+    groups = groups.iloc[np.argsort(groups["type_name"].to_numpy(dtype=str), kind="stable")]
+    groups = groups[groups["no_changes"] < groups["total_pairs"]].reset_index(drop=True)
+    results_df = pd.DataFrame()
+    if not groups.empty:
+        # Calculate Z from p-value (two-sided)
+        z = norm.ppf(1 - groups["p_value"] / 2)
+        results_df = pd.DataFrame({
+            "type_name": groups["type_name"],
+            "test_smell": groups["test_smell"],
+            "Wilcoxon_stat": groups["statistic"],
+            "p_value": groups["p_value"],
+            "effect_size_r": z / np.sqrt(groups["total_pairs"])
+        })
     results_df.to_csv(f"{RESULTS_DIR}/wilcoxon_by_type_{level}.csv", index=False)
     return results_df
 
 
-def plot_results_by_type(results_df, level):
-    """
-    各テストリファクタリング（type_name）ごとのp値と効果量をヒートマップで可視化します。
-    p値については、0.05以下のセルにアスタリスクを付け、太字・赤文字で強調します。
-    """
+def _draw_p_value_heatmap(results_df, level):
     # ----- p値のヒートマップ -----
     # Pivot table for p-values: type_name x test_smell
     pivot_p = results_df.pivot(index="type_name", columns="test_smell", values="p_value").fillna(1.0)
     # アノテーション用：p値が0.05以下の場合にアスタリスクを付与
     annot_p = pivot_p.map(lambda x: f"{x:.3f}*" if x <= 0.05 else f"{x:.3f}")
 
-    plt.figure(figsize=(14, 8))
     cmap_p = sns.diverging_palette(220, 170, as_cmap=True)
     ax = sns.heatmap(pivot_p, cmap=cmap_p, annot=annot_p, fmt="", center=0.05, vmin=0, vmax=1)
 
@@ -187,34 +168,40 @@ def plot_results_by_type(results_df, level):
             pass
 
     plt.title(f"Wilcoxon p-values by Test Refactoring Type - {level} Level")
-    plt.savefig(f"{RESULTS_DIR}/wilcoxon_by_type_p_values_{level}.png", bbox_inches="tight")
-    # plt.show()
 
+
+def _draw_effect_size_heatmap(results_df, level):
     # ----- 効果量のヒートマップ -----
     # Pivot table for effect sizes: type_name x test_smell
     pivot_effect = results_df.pivot(index="type_name", columns="test_smell", values="effect_size_r").fillna(0.0)
     # アノテーションは単純に数値を表示（必要に応じて条件付きの強調も可能）
     annot_effect = pivot_effect.map(lambda x: f"{x:.3f}")
 
-    plt.figure(figsize=(14, 8))
     cmap_effect = sns.diverging_palette(240, 10, as_cmap=True)
     sns.heatmap(pivot_effect, cmap=cmap_effect, annot=annot_effect, fmt="", center=0,
                 vmin=pivot_effect.min().min(), vmax=pivot_effect.max().max())
     plt.title(f"Wilcoxon Effect Sizes by Test Refactoring Type - {level} Level")
-    plt.savefig(f"{RESULTS_DIR}/wilcoxon_by_type_effect_sizes_{level}.png", bbox_inches="tight")
-    # plt.show()
+
+
+def plot_results_by_type(results_df, level):
+    """
+    各テストリファクタリング（type_name）ごとのp値と効果量のヒートマップ (図の仕様を返す)。
+    p値については、0.05以下のセルにアスタリスクを付け、太字・赤文字で強調します。
+    """
+    data = results_df[["type_name", "test_smell", "p_value", "effect_size_r"]]
+    return [
+        FigureSpec(f"{RESULTS_DIR}/wilcoxon_by_type_p_values_{level}.png", _draw_p_value_heatmap,
+                   data, {"level": level}, figsize=(14, 8), savefig=SAVEFIG_OPTIONS),
+        FigureSpec(f"{RESULTS_DIR}/wilcoxon_by_type_effect_sizes_{level}.png", _draw_effect_size_heatmap,
+                   data, {"level": level}, figsize=(14, 8), savefig=SAVEFIG_OPTIONS),
+    ]
 
 
 def plot_corrected_pvalues(df, level):
-    plt.figure(figsize=(12, 6))
-    sns.barplot(data=df, x="test_smell", y="p_value_corrected", hue="test_smell", palette="coolwarm", legend=False)
-    plt.axhline(0.05, color="red", linestyle="--", label="Significance threshold (0.05)")
-    plt.xticks(rotation=90)
-    plt.xlabel("Test Smell")
-    plt.ylabel("Corrected p-value (FDR)")
-    plt.title(f"Corrected p-values (FDR) for {level} Level")
-    plt.legend()
-    plt.savefig(f"{RESULTS_DIR}/corrected_p_values_{level}.png", bbox_inches="tight")
+    return [FigureSpec(f"{RESULTS_DIR}/corrected_p_values_{level}.png", _draw_p_values,
+                       df[["test_smell", "p_value_corrected"]],
+                       {"level": level, "column": "p_value_corrected", "ylabel": "Corrected p-value (FDR)",
+                        "title": "Corrected p-values (FDR) for {level} Level"}, savefig=SAVEFIG_OPTIONS)]
 
 
 def categorize_effect_size(r):
@@ -228,103 +215,125 @@ def categorize_effect_size(r):
         return "large"
 
 
-def plot_violin(df, level):
-    plt.figure(figsize=(16, 8))
+def _draw_violin(df, level):
     melted = df.melt(id_vars=["test_smell"], value_vars=["before_value", "after_value"],
                      var_name="Condition", value_name="Value")
-    sns.violinplot(data=melted, x="test_smell", y="Value", hue="Condition", split=True)
+    sns.violinplot(data=melted, x="test_smell", y="Value", hue="Condition", split=True,
+                   order=df["test_smell"].unique())
     plt.xticks(rotation=90)
     plt.title(f"Before/After Distribution for Each Test Smell ({level} Level)")
-    plt.savefig(f"{RESULTS_DIR}/violin_{level}.png", bbox_inches="tight")
 
 
-def plot_heatmap_with_significance(results_df, level):
-    # p_value_corrected列が存在しない場合はp_value列を使用
-    value_column = "p_value_corrected" if "p_value_corrected" in results_df.columns else "p_value"
+def plot_violin(df, level):
+    return [FigureSpec(f"{RESULTS_DIR}/violin_{level}.png", _draw_violin,
+                       df[["test_smell", "before_value", "after_value"]], {"level": level},
+                       figsize=(16, 8), savefig=SAVEFIG_OPTIONS)]
+
+
+def _draw_significance_heatmap(results_df, level, value_column):
     pivot = results_df.pivot(index="type_name", columns="test_smell", values=value_column).fillna(1.0)
     annot = pivot.map(lambda x: "*" if x <= 0.05 else "")
-    plt.figure(figsize=(14, 8))
     sns.heatmap(pivot, annot=annot, fmt="", cmap="coolwarm", center=0.05, vmin=0, vmax=1)
     plt.title(f"{value_column.replace('_', ' ').title()} by Type ({level} Level)")
-    plt.savefig(f"{RESULTS_DIR}/heatmap_corrected_p_{level}.png", bbox_inches="tight")
+
+
+def plot_heatmap_with_significance(results_df, level):
+    # p_value_corrected列が存在しない場合はp_value列を使用
+    value_column = "p_value_corrected" if "p_value_corrected" in results_df.columns else "p_value"
+    return [FigureSpec(f"{RESULTS_DIR}/heatmap_corrected_p_{level}.png", _draw_significance_heatmap,
+                       results_df[["type_name", "test_smell", value_column]],
+                       {"level": level, "value_column": value_column}, figsize=(14, 8), savefig=SAVEFIG_OPTIONS)]
 
 
 def analyze_sample_sizes(df, level):
     """
-    各テストスメルのサンプルサイズを分析し、統計的検出力の観点から評価する
+    各テストスメルのサンプルサイズを、観測された差の分布でのWilcoxon検定の
+    シミュレーション検出力で評価する (adequate / underpowered / untestable)
     """
     print(f"\n=== Sample Size Analysis for {level} Level ===")
-    
+
+    power = _power_by(df, "test_smell")
     sample_sizes = []
-    for test_smell in df["test_smell"].unique():
-        subset = df[df["test_smell"] == test_smell]
-        n = len(subset)
+    for row in power.itertuples(index=False):
+        if row.power_adequate:
+            status = "adequate"
+        elif row.n_nonzero > 0:
+            status = "underpowered"
+        else:
+            status = "untestable"
         sample_sizes.append({
-            "test_smell": test_smell,
-            "sample_size": n,
-            "status": "adequate" if n >= 20 else "small" if n >= 10 else "very_small"
+            "test_smell": row.test_smell,
+            "sample_size": row.total_pairs,
+            "achieved_power": row.achieved_power,
+            "required_n": row.required_n,
+            "status": status
         })
-        print(f"{test_smell}: n = {n} ({'adequate' if n >= 20 else 'small' if n >= 10 else 'very small'})")
-    
+        needed = "unreachable" if np.isnan(row.required_n) else f"{row.required_n:.0f}"
+        print(f"{row.test_smell}: n = {row.total_pairs}, power = {row.achieved_power:.2f}, "
+              f"required n = {needed} ({status})")
+
     # 統計的検出力の評価
-    adequate_count = sum(1 for s in sample_sizes if s["status"] == "adequate")
-    small_count = sum(1 for s in sample_sizes if s["status"] == "small")
-    very_small_count = sum(1 for s in sample_sizes if s["status"] == "very_small")
-    
+    counts = pd.Series([s["status"] for s in sample_sizes], dtype=object).value_counts()
+
     print(f"\nSummary:")
-    print(f"Adequate sample size (≥20): {adequate_count}/{len(sample_sizes)}")
-    print(f"Small sample size (10-19): {small_count}/{len(sample_sizes)}")
-    print(f"Very small sample size (<10): {very_small_count}/{len(sample_sizes)}")
-    
+    print(f"Adequate power (≥{POWER_TARGET:.0%}): {counts.get('adequate', 0)}/{len(sample_sizes)}")
+    print(f"Underpowered: {counts.get('underpowered', 0)}/{len(sample_sizes)}")
+    print(f"Untestable (no change): {counts.get('untestable', 0)}/{len(sample_sizes)}")
+
     return sample_sizes
 
 
 def main():
     """Main function to execute the analysis."""
-    # Load the dataset
-    file_df, method_df = load_data()
-
-    # Preprocess the data
-    file_melted_df = preprocess_data(file_df)
-    method_melted_df = preprocess_data(method_df)
+    # Load the dataset, paired per commit, type and test smell
+    # (read as-is from the long table if present, otherwise reshaped from the wide tables)
+    file_melted_df, method_melted_df = load_paired_tables(CSV_DIR)
 
     # Overall Wilcoxon signed-rank test (aggregated by test smell)
     file_results = wilcoxon_signed_rank_test(file_melted_df, "file")
     method_results = wilcoxon_signed_rank_test(method_melted_df, "method")
-    plot_results(file_results, "file")
-    plot_results(method_results, "method")
-    plot_boxplot(file_melted_df, "file")
-    plot_boxplot(method_melted_df, "method")
-    plot_violin(file_melted_df, "file")
-    plot_violin(method_melted_df, "method")
+    # Figures are collected as specs and rendered together at the end
+    figures = []
+    figures += plot_results(file_results, "file")
+    figures += plot_results(method_results, "method")
+    figures += plot_boxplot(file_melted_df, "file")
+    figures += plot_boxplot(method_melted_df, "method")
+    figures += plot_violin(file_melted_df, "file")
+    figures += plot_violin(method_melted_df, "method")
 
     # Wilcoxon test grouped by test refactoring type (type_name)
     file_by_type = wilcoxon_by_type(file_melted_df, "file")
     method_by_type = wilcoxon_by_type(method_melted_df, "method")
     file_by_type.to_csv(f"{RESULTS_DIR}/wilcoxon_by_type_file.csv", index=False)
     method_by_type.to_csv(f"{RESULTS_DIR}/wilcoxon_by_type_method.csv", index=False)
-    plot_results_by_type(file_by_type, "file")
-    plot_results_by_type(method_by_type, "method")
+    figures += plot_results_by_type(file_by_type, "file")
+    figures += plot_results_by_type(method_by_type, "method")
 
     # p_values: list of p-values
     p_values = file_results["p_value"].tolist() + method_results["p_value"].tolist()
     rejected, pvals_corrected, _, _ = multipletests(p_values, alpha=0.05, method='fdr_bh')
     # pvals_correctedが補正後のp値
 
-    plot_corrected_pvalues(file_results, "file")
-    plot_corrected_pvalues(method_results, "method")
+    figures += plot_corrected_pvalues(file_results, "file")
+    figures += plot_corrected_pvalues(method_results, "method")
 
     # Add effect size category
     file_results["effect_size_category"] = file_results["effect_size_r"].apply(categorize_effect_size)
     method_results["effect_size_category"] = method_results["effect_size_r"].apply(categorize_effect_size)
 
     # plot_heatmap_with_significanceにはtype_name列を含むデータフレームを渡す
-    plot_heatmap_with_significance(file_by_type, "file")
-    plot_heatmap_with_significance(method_by_type, "method")
+    figures += plot_heatmap_with_significance(file_by_type, "file")
+    figures += plot_heatmap_with_significance(method_by_type, "method")
+
+    # Render in parallel, skipping figures whose data and style are unchanged
+    render_figures(figures)
 
     # Analyze sample sizes
     analyze_sample_sizes(file_melted_df, "file")
     analyze_sample_sizes(method_melted_df, "method")
+    # Power and required sample size for every (type, smell) group
+    for level, df in (("file", file_melted_df), ("method", method_melted_df)):
+        _power_by(df, ["type_name", "test_smell"]).to_csv(f"{RESULTS_DIR}/power_by_type_{level}.csv", index=False)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,217 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lazy_imports import lazy_import
+from batched_wilcoxon import tested_groups
+from smell_pairs import load_paired_tables
+
+multipletests = lazy_import("statsmodels.stats.multitest", "multipletests")
+
+# 1_refactoring_smell_relationship_analysis.pyのmain()と同じ2種類の分析
+ANALYSES = {
+    "detailed_by_type_and_smell": ["type_name", "test_smell"],
+    "summary_by_smell_only": ["test_smell"],
+}
+LEVEL_SCOPES = {"file": ("file",), "method": ("method",), "both": ("file", "method")}
+NUMBER_OF_METHODS = "NumberOfMethods"
+# include: 他のスメルと同じ族で補正 / exclude: 除外 / separate: 検定するが別の族で補正
+NUMBER_OF_METHODS_MODES = ("include", "exclude", "separate")
+GROUP_KEYS = ["level", "analysis_type", "type_name", "test_smell"]
+
+# fork した子プロセスが親のメモリをそのまま参照する検定済みの表
+_shared_groups = None
+
+
+class SweepConfig(NamedTuple):
+    """One setting of the analysis; the defaults are those of the main analysis."""
+    min_pairs: int = 5
+    fdr_method: str = "fdr_bh"
+    alpha: float = 0.05
+    number_of_methods: str = "include"
+    levels: str = "both"
+
+
+def config_grid(min_pairs=(5,), fdr_methods=("fdr_bh",), alphas=(0.05,), number_of_methods=("include",),
+                levels=("both",)):
+    """Every combination of the given values, as SweepConfigs."""
+    for mode in number_of_methods:
+        if mode not in NUMBER_OF_METHODS_MODES:
+            raise ValueError(f"Unknown NumberOfMethods handling: {mode}")
+    for scope in levels:
+        if scope not in LEVEL_SCOPES:
+            raise ValueError(f"Unknown level scope: {scope}")
+    return [SweepConfig(*values) for values in itertools.product(min_pairs, fdr_methods, alphas, number_of_methods,
+                                                                  levels)]
+
+
+def all_tested_groups(tables, smells=None):
+    """
+    Wilcoxon tests and effect sizes of every group of both analyses at each
+    level, computed once for the whole sweep (no minimum number of pairs; the
+    configurations only filter and correct these rows). `tables` maps a level
+    to its paired table; `smells` restricts the test smells.
+    """
+    frames = []
+    for level, df in tables.items():
+        if smells is not None:
+            df = df[df["test_smell"].isin(smells)]
+        for analysis_type, by in ANALYSES.items():
+            groups = tested_groups(df, by, min_pairs=1)
+            frames.append(pd.DataFrame({
+                "level": level,
+                "analysis_type": analysis_type,
+                "type_name": groups["type_name"] if "type_name" in by else None,
+                "test_smell": groups["test_smell"],
+                "total_pairs": groups["total_pairs"],
+                "improvements": groups["improvements"],
+                "degradations": groups["degradations"],
+                "no_changes": groups["no_changes"],
+                "wilcoxon_stat": groups["wilcoxon_stat"],
+                "p_value": groups["p_value"],
+                "effect_size_r": groups["effect_size_r"],
+            }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=GROUP_KEYS)
+
+
+def apply_config(groups, config):
+    """
+    Groups kept by `config` with their FDR-corrected p-values: the global
+    correction of the main analysis over both analyses and the selected
+    levels, with NumberOfMethods handled as `config.number_of_methods`.
+    """
+    keep = groups["level"].isin(LEVEL_SCOPES[config.levels]) & (groups["total_pairs"] >= config.min_pairs)
+    if config.number_of_methods == "exclude":
+        keep &= groups["test_smell"] != NUMBER_OF_METHODS
+    rows = groups[keep].copy()
+    if config.number_of_methods == "separate":
+        rows["family"] = np.where(rows["test_smell"] == NUMBER_OF_METHODS, NUMBER_OF_METHODS, "smells")
+    else:
+        rows["family"] = "smells"
+    rows["p_value_corrected"] = 1.0
+    rows["significant_corrected"] = False
+    for _, family in rows.groupby("family", sort=False):
+        if family.empty:
+            continue
+        reject, corrected, _, _ = multipletests(family["p_value"], alpha=config.alpha, method=config.fdr_method)
+        rows.loc[family.index, "p_value_corrected"] = corrected
+        rows.loc[family.index, "significant_corrected"] = reject
+    for field, value in zip(SweepConfig._fields, config):
+        rows[field] = value
+    return rows
+
+
+def _run_config(config):
+    return apply_config(_shared_groups, config)
+
+
+def _init_worker(groups):
+    global _shared_groups
+    _shared_groups = groups
+
+
+def summarize_sweep(results, configs, baseline=SweepConfig()):
+    """
+    One row per configuration: tested and significant groups, and how the set
+    of significant groups compares with `baseline` (or the first
+    configuration if the baseline is not in the grid).
+    """
+    if baseline not in configs:
+        baseline = configs[0]
+    significant = results[results["significant_corrected"]]
+    keys = {config: set(map(tuple, rows[GROUP_KEYS].astype(str).to_numpy()))
+            for config, rows in significant.groupby(list(SweepConfig._fields), sort=False)}
+    baseline_keys = keys.get(tuple(baseline), set())
+    tested = results[results["no_changes"] < results["total_pairs"]].groupby(list(SweepConfig._fields), sort=False)
+    n_tested = tested.size()
+    improvements = significant[significant["effect_size_r"] < 0].groupby(list(SweepConfig._fields), sort=False).size()
+    degradations = significant[significant["effect_size_r"] > 0].groupby(list(SweepConfig._fields), sort=False).size()
+
+    rows = []
+    for config in configs:
+        config_keys = keys.get(tuple(config), set())
+        union = config_keys | baseline_keys
+        rows.append({
+            **config._asdict(),
+            "tested_groups": int(n_tested.get(tuple(config), 0)),
+            "significant_groups": len(config_keys),
+            "significant_improvements": int(improvements.get(tuple(config), 0)),
+            "significant_degradations": int(degradations.get(tuple(config), 0)),
+            "gained_vs_baseline": len(config_keys - baseline_keys),
+            "lost_vs_baseline": len(baseline_keys - config_keys),
+            "jaccard_vs_baseline": len(config_keys & baseline_keys) / len(union) if union else 1.0,
+        })
+    return pd.DataFrame(rows)
+
+
+def run_sweep(tables, configs, smells=None, n_jobs=None):
+    """
+    Run every configuration on the tables (level -> paired table) and return
+    (per-group results of all configurations, one summary row per
+    configuration). The groups are tested once in this process; workers
+    started with fork share them without copying, other start methods
+    receive them once per worker.
+    """
+    global _shared_groups
+    if not configs:
+        raise ValueError("No configurations to run")
+    groups = all_tested_groups(tables, smells)
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(configs))
+    if n_jobs <= 1:
+        results = [apply_config(groups, config) for config in configs]
+    elif "fork" in multiprocessing.get_all_start_methods():
+        # statsmodelsもforkの前に読み込んでおく (ワーカーごとにimportしない)
+        multipletests._load()
+        _shared_groups = groups
+        try:
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context("fork")) as executor:
+                results = list(executor.map(_run_config, configs))
+        finally:
+            _shared_groups = None
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=(groups,)) as executor:
+            results = list(executor.map(_run_config, configs))
+
+    columns = list(SweepConfig._fields) + [c for c in results[0].columns if c not in SweepConfig._fields]
+    results = pd.concat(results, ignore_index=True)[columns]
+    return results, summarize_sweep(results, configs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sensitivity of the RQ3 findings to the analysis thresholds.")
+    parser.add_argument("--csv-dir", type=str, required=True, help="Directory with the smell result tables.")
+    parser.add_argument("--output-dir", type=str, default=".", help="Output directory for the CSV tables.")
+    parser.add_argument("--min-pairs", type=int, nargs="+", default=[3, 5, 10, 20], help="Minimum pairs per group.")
+    parser.add_argument("--fdr-methods", type=str, nargs="+", default=["fdr_bh", "fdr_by", "bonferroni"],
+                        help="statsmodels multipletests methods.")
+    parser.add_argument("--alphas", type=float, nargs="+", default=[0.01, 0.05, 0.1], help="FDR levels.")
+    parser.add_argument("--number-of-methods", type=str, nargs="+", default=list(NUMBER_OF_METHODS_MODES),
+                        choices=NUMBER_OF_METHODS_MODES, help="Handling of the NumberOfMethods metric.")
+    parser.add_argument("--levels", type=str, nargs="+", default=["both"], choices=list(LEVEL_SCOPES),
+                        help="Levels corrected together.")
+    parser.add_argument("--smells", type=str, nargs="+", default=None, help="Only these test smells.")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores).")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    file_df, method_df = load_paired_tables(args.csv_dir)
+    configs = config_grid(args.min_pairs, args.fdr_methods, args.alphas, args.number_of_methods, args.levels)
+    results, summary = run_sweep({"file": file_df, "method": method_df}, configs, args.smells, args.jobs)
+    results.to_csv(os.path.join(args.output_dir, "sensitivity_results.csv"), index=False)
+    summary.to_csv(os.path.join(args.output_dir, "sensitivity_summary.csv"), index=False)
+    print(summary.to_string(index=False))
+    print(f"{len(configs)} configurations in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 表の形式を変えたら上げる (古いファイルを無効にする)
+TABLE_VERSION = 1
+# 表の保存先 (空文字列なら保存しない)。未設定なら default_cache_dir() のユーザーキャッシュ
+CACHE_DIR_ENV = "WILCOXON_CACHE_DIR"
+
+_tables = {}
+_lock = threading.Lock()
+
+
+def build_null_counts(max_n):
+    """
+    Number of sign assignments of ranks 1..n giving each rank sum R+, for
+    every n = 0..max_n (row n, padded with zeros), by the recurrence
+    c_n(r) = c_{n-1}(r) + c_{n-1}(r - n). Exact in int64 up to n = 62.
+    """
+    size = max_n * (max_n + 1) // 2 + 1
+    counts = np.zeros((max_n + 1, size), dtype="int64")
+    counts[0, 0] = 1
+    for n in range(1, max_n + 1):
+        counts[n] = counts[n - 1]
+        counts[n, n:] += counts[n - 1, :size - n]
+    return counts
+
+
+class SignedRankTable:
+    """
+    Exact null distribution of the Wilcoxon signed-rank statistic R+ without
+    ties for n = 0..max_n, as P(R+ <= r) and P(R+ >= r) tables, so two-sided
+    p-values of any number of groups are one fancy-indexing lookup.
+    """
+
+    def __init__(self, counts):
+        self.counts = counts
+        self.max_n = len(counts) - 1
+        total = counts.sum(axis=1, keepdims=True).astype("float64")
+        self.cdf = np.cumsum(counts, axis=1) / total
+        self.sf = np.cumsum(counts[:, ::-1], axis=1)[:, ::-1] / total
+
+    @classmethod
+    def build(cls, max_n):
+        return cls(build_null_counts(max_n))
+
+    def save(self, path):
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, counts=self.counts, version=TABLE_VERSION)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if int(data["version"]) != TABLE_VERSION:
+                raise ValueError(f"table version {int(data['version'])} != {TABLE_VERSION}")
+            return cls(data["counts"])
+
+    def p_values(self, n, r_plus):
+        """
+        Two-sided exact p-values 2 * min(P(R+ <= r), P(R+ >= r)), clipped to
+        1, for arrays of sample sizes n (<= max_n) and observed rank sums.
+        A non-integer r_plus counts both neighbouring integers as extreme.
+        """
+        n = np.asarray(n, dtype="int64")
+        r_plus = np.asarray(r_plus, dtype="float64")
+        if n.size and n.max() > self.max_n:
+            raise ValueError(f"n = {n.max()} exceeds the table size {self.max_n}")
+        cdf = self.cdf[n, np.ceil(r_plus).astype("int64")]
+        sf = self.sf[n, np.floor(r_plus).astype("int64")]
+        return np.minimum(1.0, 2 * np.minimum(cdf, sf))
+
+
+def default_cache_dir():
+    """
+    $WILCOXON_CACHE_DIR if set (empty: do not persist), otherwise
+    signed_rank_table/ under the user cache directory ($XDG_CACHE_HOME or ~/.cache).
+    """
+    if CACHE_DIR_ENV in os.environ:
+        return os.environ[CACHE_DIR_ENV]
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "signed_rank_table")
+
+
+def null_table(max_n, cache_dir=None):
+    """
+    SignedRankTable for n = 0..max_n, built once per process and persisted
+    under `cache_dir` (None: default_cache_dir(), "": not persisted). An
+    unreadable or outdated file is rebuilt.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    key = (max_n, cache_dir)
+    with _lock:
+        if key in _tables:
+            return _tables[key]
+        path = None if not cache_dir else os.path.join(cache_dir, f"signed_rank_null_v{TABLE_VERSION}_{max_n}.npz")
+        table = None
+        if path is not None and os.path.isfile(path):
+            try:
+                table = SignedRankTable.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Rebuilding the signed-rank table {path}: {e}")
+        if table is None or table.max_n != max_n:
+            table = SignedRankTable.build(max_n)
+            if path is not None:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    table.save(path)
+                except OSError as e:
+                    logger.warning(f"Could not save the signed-rank table to {path}: {e}")
+        _tables[key] = table
+        return table
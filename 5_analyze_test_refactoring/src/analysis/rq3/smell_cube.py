@@ -0,0 +1,346 @@
+import argparse
+import json
+import logging
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from smell_tables import find_table, find_long_table
+from smell_pairs import load_paired_table
+from repo_resampling import SUM_COLUMNS, repository_of, statistics_from_sums
+
+try:
+    import pyarrow
+except ImportError:  # pyarrowが無ければCSVで保存する
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# 集約の軸と、足し合わせられる統計量 (差は after - before)
+DIMENSIONS = ["level", "type_name", "test_smell", "repository", "commit_size"]
+MEASURES = SUM_COLUMNS + ["sum_before", "sum_after"]
+QUERY_COLUMNS = [
+    "total_pairs", "improvements", "degradations", "no_changes", "improvement_rate", "degradation_rate",
+    "no_change_rate", "mean_before", "mean_after", "mean_diff", "effect_size", "sign_test_p",
+]
+LEVELS = ["file", "method"]
+# コミットの変更行数 (追加 + 削除) の区間
+COMMIT_SIZE_EDGES = [0, 10, 50, 200, 1000, np.inf]
+COMMIT_SIZE_LABELS = ["1-10", "11-50", "51-200", "201-1000", ">1000"]
+UNKNOWN_SIZE = "unknown"
+# 集約方法を変えたら上げる (古いキューブを作り直す)
+CUBE_VERSION = 2
+CUBE_NAME = "smell_cube"
+DEFAULT_PORT = 8765
+
+
+COMMIT_SIZE_CATEGORIES = COMMIT_SIZE_LABELS + [UNKNOWN_SIZE]
+
+
+def _commit_sha(commit_urls):
+    # URLのowner/repoは大文字小文字が揃っていないことがあるので、コミットはSHAで突き合わせる
+    return pd.Index(commit_urls, dtype=object).str.rsplit("/", n=1).str[-1]
+
+
+def load_commit_sizes(commit_csv):
+    """Changed lines (total_addition_lines + total_deletions_lines) per commit SHA of the sampling CSV."""
+    commits = pd.read_csv(commit_csv, usecols=lambda c: c in {
+        "commit_id", "commit_url", "total_addition_lines", "total_deletions_lines"})
+    shas = commits["commit_id"] if "commit_id" in commits.columns else _commit_sha(commits["commit_url"])
+    sizes = commits["total_addition_lines"].fillna(0) + commits["total_deletions_lines"].fillna(0)
+    return pd.Series(sizes.to_numpy(), index=pd.Index(shas, dtype=object)).groupby(level=0).first()
+
+
+def _dimension_values(dim, values):
+    """Categorical of one dimension: commit_size in bucket order, the others sorted."""
+    if dim == "commit_size":
+        values = pd.Categorical(values, categories=COMMIT_SIZE_CATEGORIES, ordered=True)
+        return values.remove_unused_categories()
+    return pd.Categorical(values)
+
+
+def commit_size_of(commit_urls, commit_sizes=None):
+    """
+    COMMIT_SIZE_LABELS bucket of each commit, UNKNOWN_SIZE if it has no size.
+    `commit_sizes` is indexed by commit SHA (see load_commit_sizes).
+    """
+    categories = COMMIT_SIZE_CATEGORIES
+    urls = pd.Categorical(commit_urls)
+    if commit_sizes is None:
+        return pd.Categorical.from_codes(np.full(len(urls), len(categories) - 1), categories=categories)
+    buckets = pd.cut(commit_sizes.reindex(_commit_sha(urls.categories)).to_numpy(dtype="float64"),
+                     COMMIT_SIZE_EDGES, labels=False, include_lowest=True)
+    bucket_codes = np.where(np.isnan(buckets), len(categories) - 1, buckets).astype("int64")
+    return pd.Categorical.from_codes(bucket_codes[urls.codes], categories=categories)
+
+
+def cube_cells(df, level, commit_sizes=None):
+    """
+    Sums of MEASURES for every observed combination of DIMENSIONS in one
+    level's paired table (see smell_pairs.load_paired_table).
+    """
+    before = df["before_value"].to_numpy(dtype="float64")
+    after = df["after_value"].to_numpy(dtype="float64")
+    diff = after - before
+    frame = pd.DataFrame({
+        "level": pd.Categorical.from_codes(np.full(len(df), LEVELS.index(level)), categories=LEVELS),
+        "type_name": pd.Categorical(df["type_name"]),
+        "test_smell": pd.Categorical(df["test_smell"]),
+        "repository": repository_of(df["commit_url"]),
+        "commit_size": commit_size_of(df["commit_url"], commit_sizes),
+        "n": np.ones(len(df), dtype="int64"),
+        "improvements": (after < before).astype("int64"),
+        "degradations": (after > before).astype("int64"),
+        "sum_diff": diff,
+        "sum_diff_sq": diff ** 2,
+        "sum_before": before,
+        "sum_after": after,
+    })
+    return frame.groupby(DIMENSIONS, observed=True, sort=True)[MEASURES].sum().reset_index()
+
+
+def _source_paths(csv_dir, commit_csv=None):
+    long_path = find_long_table(csv_dir)
+    paths = [long_path] if long_path else [find_table(csv_dir, f"{level}_level_wide") for level in LEVELS]
+    return paths + ([commit_csv] if commit_csv else [])
+
+
+def _signature(paths):
+    """Size and modification time of the source tables (to detect a stale cube)."""
+    return {os.path.abspath(p): [os.path.getsize(p), os.path.getmtime(p)] for p in paths if os.path.isfile(p)}
+
+
+class SmellCube:
+    """
+    Pre-aggregated smell changes: one row per observed combination of
+    DIMENSIONS with the additive MEASURES, so any slice (filter on dimension
+    values) and roll-up (group by a subset of dimensions) is a sum of cells.
+    """
+
+    def __init__(self, cells, metadata=None):
+        self.cells = cells
+        self.metadata = metadata or {}
+
+    @classmethod
+    def build(cls, csv_dir, commit_csv=None):
+        """Build the cube from the paired file- and method-level tables in csv_dir."""
+        commit_sizes = load_commit_sizes(commit_csv) if commit_csv else None
+        frames = [cube_cells(load_paired_table(csv_dir, level), level, commit_sizes) for level in LEVELS]
+        cells = pd.concat(frames, ignore_index=True)
+        for dim in DIMENSIONS:
+            # レベルをまたいでカテゴリを揃える
+            cells[dim] = _dimension_values(dim, cells[dim].astype(object))
+        metadata = {"version": CUBE_VERSION, "sources": _signature(_source_paths(csv_dir, commit_csv)),
+                    "commit_csv": os.path.abspath(commit_csv) if commit_csv else None}
+        return cls(cells, metadata)
+
+    def save(self, path):
+        """Save the cells (Parquet if pyarrow is available, CSV otherwise) and a JSON sidecar."""
+        path = os.path.splitext(path)[0] + (".parquet" if pyarrow is not None else ".csv")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if pyarrow is not None:
+            self.cells.to_parquet(path, index=False)
+        else:
+            self.cells.to_csv(path, index=False)
+        with open(os.path.splitext(path)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump(self.metadata, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Load a cube written by save() (the path with or without its extension)."""
+        base = os.path.splitext(path)[0]
+        for suffix in (".parquet", ".csv"):
+            if os.path.isfile(base + suffix):
+                break
+        else:
+            raise FileNotFoundError(f"No cube at {base}(.parquet|.csv)")
+        cells = pd.read_parquet(base + suffix) if suffix == ".parquet" else pd.read_csv(base + suffix)
+        for dim in DIMENSIONS:
+            cells[dim] = _dimension_values(dim, cells[dim].astype(object))
+        metadata = {}
+        if os.path.isfile(base + ".json"):
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                metadata = json.load(f)
+        return cls(cells, metadata)
+
+    def dimensions(self):
+        """{dimension: values present in the cube}."""
+        return {dim: [str(v) for v in self.cells[dim].cat.categories] for dim in DIMENSIONS}
+
+    def query(self, by=None, where=None, sign_test=True):
+        """
+        Slice the cube by `where` ({dimension: value or list of values}) and
+        roll it up to the dimensions in `by` (all of them summed if empty).
+        Returns the `by` columns and QUERY_COLUMNS, one row per group.
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        where = where or {}
+        unknown = [dim for dim in by + list(where) if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s) {unknown}; expected some of {DIMENSIONS}")
+
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, values in where.items():
+            values = [values] if isinstance(values, str) else list(values)
+            column = self.cells[dim].cat
+            wanted = column.categories.get_indexer(values)
+            mask &= np.isin(column.codes.to_numpy(), wanted[wanted >= 0])
+        selected = self.cells[mask]
+
+        if by:
+            sums = selected.groupby(by, observed=True, sort=True)[MEASURES].sum()
+            keys = sums.index.to_frame(index=False).astype(object)
+        else:
+            sums = selected[MEASURES].sum().to_frame().T
+            keys = pd.DataFrame(index=range(1))
+        values = sums.to_numpy(dtype="float64")
+        stats = statistics_from_sums(values[:, :len(SUM_COLUMNS)], sign_test=sign_test)
+        n, improvements, degradations = values[:, 0], values[:, 1], values[:, 2]
+        no_changes = n - improvements - degradations
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns = {
+                "total_pairs": n.astype("int64"),
+                "improvements": improvements.astype("int64"),
+                "degradations": degradations.astype("int64"),
+                "no_changes": no_changes.astype("int64"),
+                "improvement_rate": stats["improvement_rate"],
+                "degradation_rate": stats["degradation_rate"],
+                "no_change_rate": np.where(n > 0, no_changes / n * 100, np.nan),
+                "mean_before": np.where(n > 0, values[:, MEASURES.index("sum_before")] / n, np.nan),
+                "mean_after": np.where(n > 0, values[:, MEASURES.index("sum_after")] / n, np.nan),
+                "mean_diff": stats["mean_diff"],
+                "effect_size": stats["effect_size"],
+                "sign_test_p": stats["sign_test_p"] if sign_test else np.full(len(n), np.nan),
+            }
+        result = pd.concat([keys, pd.DataFrame(columns, columns=QUERY_COLUMNS)], axis=1)
+        return result
+
+
+def cube_path(csv_dir):
+    return os.path.join(csv_dir, CUBE_NAME)
+
+
+def load_or_build_cube(csv_dir, commit_csv=None, path=None):
+    """
+    The cube saved at `path` (default <csv_dir>/smell_cube.*) if it was built
+    from the current source tables, otherwise a freshly built and saved one.
+    """
+    path = path or cube_path(csv_dir)
+    try:
+        cube = SmellCube.load(path)
+        if (cube.metadata.get("version") == CUBE_VERSION
+                and cube.metadata.get("sources") == _signature(_source_paths(csv_dir, commit_csv))):
+            return cube
+    except FileNotFoundError:
+        pass
+    cube = SmellCube.build(csv_dir, commit_csv)
+    cube.save(path)
+    return cube
+
+
+def _query_from_params(cube, params):
+    by = [dim for value in params.pop("by", []) for dim in value.split(",") if dim]
+    sign_test = params.pop("sign_test", ["true"])[-1].lower() not in ("0", "false", "no")
+    unknown = [key for key in params if key not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) {unknown}")
+    return cube.query(by=by, where=params, sign_test=sign_test)
+
+
+def make_handler(cube):
+    """
+    HTTP handler answering
+      GET /dimensions  -> {"dimension": [values, ...], ...}
+      GET /query?by=type_name,test_smell&level=file&test_smell=Eager%20Test&...
+                      -> {"rows": [...], "elapsed_ms": ...}
+    Repeating a dimension parameter selects several values.
+    """
+
+    class CubeRequestHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = body.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            start = time.perf_counter()
+            try:
+                if url.path == "/dimensions":
+                    self._send(200, json.dumps(cube.dimensions()))
+                elif url.path == "/query":
+                    result = _query_from_params(cube, parse_qs(url.query))
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    # NaNはnullとして返す
+                    self._send(200, f'{{"rows": {result.to_json(orient="records")}, "elapsed_ms": {elapsed_ms:.3f}}}')
+                else:
+                    self._send(404, json.dumps({"error": f"Unknown path {url.path}"}))
+            except ValueError as e:
+                self._send(400, json.dumps({"error": str(e)}))
+
+        def log_message(self, format, *args):
+            logger.info(f"{self.address_string()} {format % args}")
+
+    return CubeRequestHandler
+
+
+def serve(cube, host="127.0.0.1", port=DEFAULT_PORT):
+    """Serve the cube over HTTP until interrupted."""
+    server = ThreadingHTTPServer((host, port), make_handler(cube))
+    logger.info(f"Serving the smell cube ({len(cube.cells)} cells) on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def _parse_where(items):
+    where = {}
+    for item in items or []:
+        dim, _, value = item.partition("=")
+        where.setdefault(dim, []).append(value)
+    return where
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-aggregated cube of RQ3 smell changes with a query service.")
+    parser.add_argument("--csv-dir", type=str, required=True, help="Directory with the smell result tables.")
+    parser.add_argument("--commit-csv", type=str, default=None,
+                        help="Sampling CSV with total_addition_lines/total_deletions_lines for the commit_size dimension.")
+    parser.add_argument("--cube", type=str, default=None, help="Cube path (default: <csv-dir>/smell_cube).")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("build", help="(Re)build and save the cube.")
+    query_parser = subparsers.add_parser("query", help="Print one query.")
+    query_parser.add_argument("--by", type=str, nargs="*", default=[], help="Dimensions to group by.")
+    query_parser.add_argument("--where", type=str, nargs="*", default=[], help="Filters as dimension=value.")
+    serve_parser = subparsers.add_parser("serve", help="Serve queries over HTTP/JSON.")
+    serve_parser.add_argument("--host", type=str, default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "build":
+        cube = SmellCube.build(args.csv_dir, args.commit_csv)
+        path = cube.save(args.cube or cube_path(args.csv_dir))
+        logger.info(f"Saved {len(cube.cells)} cells to {path}")
+        return
+    cube = load_or_build_cube(args.csv_dir, args.commit_csv, args.cube)
+    if args.command == "query":
+        with pd.option_context("display.max_rows", None, "display.width", 200):
+            print(cube.query(by=args.by, where=_parse_where(args.where)).to_string(index=False))
+    else:
+        serve(cube, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
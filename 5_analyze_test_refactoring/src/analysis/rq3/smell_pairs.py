@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from smell_tables import find_table, read_table, find_long_table
+
+try:
+    import pyarrow
+except ImportError:  # キャッシュ(Feather)はpyarrowが無ければ使わない
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+PAIRED_COLUMNS = ["commit_url", "type_name", "test_smell", "before_value", "after_value", "diff_value"]
+# 整形結果の形式を変えたら上げる (古いキャッシュを無効にする)
+CACHE_VERSION = 1
+CACHE_DIR_NAME = ".paired_cache"
+
+
+def _categorical(values):
+    """Categorical with lexically sorted categories, so groupby order matches plain strings."""
+    return pd.Categorical(values)
+
+
+def _counts(values):
+    """Missing counts become 0; int32 if every value is integral, float64 otherwise."""
+    values = np.nan_to_num(values, nan=0.0)
+    if np.array_equal(values, np.round(values)) and np.abs(values).max(initial=0) < 2 ** 31:
+        return values.astype("int32")
+    return values
+
+
+def preprocess_data(df):
+    """
+    Reshape a wide smell table so before/after values are paired for each
+    commit, type and test smell (one row per refactoring and smell, in the
+    wide table's row and smell order). Identifier columns are categorical.
+    """
+    test_smell_columns = [col for col in df.columns if "_diff" in col]
+    before_cols = [col.replace("_diff", "_before") for col in test_smell_columns]
+    after_cols = [col.replace("_diff", "_after") for col in test_smell_columns]
+    n, k = len(df), len(test_smell_columns)
+    smells = [col.replace("_diff", "") for col in test_smell_columns]
+    smell_categories = sorted(set(smells))
+    smell_codes = np.array([smell_categories.index(s) for s in smells], dtype="int32")
+
+    def stacked(cols):
+        return df[cols].to_numpy(dtype="float64", na_value=np.nan).reshape(-1)
+
+    return pd.DataFrame({
+        "commit_url": _categorical(np.repeat(df["commit_url"].to_numpy(), k)),
+        "type_name": _categorical(np.repeat(df["type_name"].to_numpy(), k)),
+        "test_smell": pd.Categorical.from_codes(np.tile(smell_codes, n), categories=smell_categories),
+        "before_value": _counts(stacked(before_cols)),
+        "after_value": _counts(stacked(after_cols)),
+        "diff_value": _counts(stacked(test_smell_columns)),
+    }, columns=PAIRED_COLUMNS)
+
+
+def paired_from_long(long_df, level):
+    """
+    Rows of one level of the long table (see testsmell_diff_writer.write_long_table)
+    in preprocess_data's layout.
+    """
+    df = long_df[long_df["level"] == level]
+    return pd.DataFrame({
+        "commit_url": _categorical(df["commit_url"].astype(object).to_numpy()),
+        "type_name": _categorical(df["type_name"].astype(object).to_numpy()),
+        "test_smell": _categorical(df["test_smell"].astype(object).to_numpy()),
+        "before_value": _counts(df["before"].to_numpy(dtype="float64", na_value=np.nan)),
+        "after_value": _counts(df["after"].to_numpy(dtype="float64", na_value=np.nan)),
+        "diff_value": _counts(df["diff"].to_numpy(dtype="float64", na_value=np.nan)),
+    }, columns=PAIRED_COLUMNS)
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cached(csv_dir, level, source_path, build):
+    """
+    Return build(), cached as Feather under <csv_dir>/.paired_cache keyed by
+    the source table's content hash. Without pyarrow, build() is returned as is.
+    """
+    if pyarrow is None:
+        return build()
+    key = hashlib.sha256(f"{CACHE_VERSION}:{level}:{_file_hash(source_path)}".encode()).hexdigest()[:16]
+    cache_dir = os.path.join(csv_dir, CACHE_DIR_NAME)
+    cache_path = os.path.join(cache_dir, f"paired_{level}_{key}.feather")
+    if os.path.isfile(cache_path):
+        return pd.read_feather(cache_path)
+    df = build()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            if name.startswith(f"paired_{level}_") and name.endswith(".feather"):
+                os.remove(os.path.join(cache_dir, name))
+        tmp_path = cache_path + ".tmp"
+        df.to_feather(tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"Could not cache paired table to {cache_path}: {e}")
+    return df
+
+
+def load_paired_table(csv_dir, level, preprocess=preprocess_data):
+    """
+    Paired table of one level ("file" or "method"): from the long table when
+    present and current, otherwise the wide table reshaped by `preprocess`.
+    """
+    long_path = find_long_table(csv_dir)
+    if long_path is not None:
+        return _cached(csv_dir, level, long_path, lambda: paired_from_long(read_table(long_path), level))
+    wide_path = find_table(csv_dir, f"{level}_level_wide")
+    if preprocess is not preprocess_data:
+        return preprocess(read_table(wide_path))
+    return _cached(csv_dir, level, wide_path, lambda: preprocess_data(read_table(wide_path)))
+
+
+def load_paired_tables(csv_dir, preprocess=preprocess_data):
+    """(file_df, method_df) with one row per commit, refactoring type and test smell."""
+    return load_paired_table(csv_dir, "file", preprocess), load_paired_table(csv_dir, "method", preprocess)
@@ -0,0 +1,78 @@
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 型付きの形式を優先し、無ければCSVにフォールバックする
+TYPED_SUFFIXES = [".parquet", ".feather"]
+# testsmell_diff_writer.write_long_tableで両レベルをまとめて書き出した表
+LONG_TABLE = "test_smell_long"
+
+
+def find_table(csv_dir, name):
+    """
+    Return the path of the preferred on-disk version of a result table
+    (Parquet, then Feather, then CSV). A typed file older than the CSV is
+    left over from an earlier run (e.g. rerun with --typed-format none or
+    without pyarrow) and is skipped.
+    """
+    csv_path = os.path.join(csv_dir, name + ".csv")
+    csv_mtime = os.path.getmtime(csv_path) if os.path.isfile(csv_path) else None
+    for suffix in TYPED_SUFFIXES:
+        path = os.path.join(csv_dir, name + suffix)
+        if not os.path.isfile(path):
+            continue
+        if csv_mtime is not None and os.path.getmtime(path) < csv_mtime:
+            logger.warning(f"Ignoring {path}: older than {csv_path}")
+            continue
+        return path
+    return csv_path
+
+
+def read_table(path, columns=None):
+    """
+    Read a table written by testsmell_diff_writer, loading only `columns` if given.
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, columns=columns)
+    if path.endswith(".feather"):
+        return pd.read_feather(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def load_wide_table(csv_dir, level, columns=None):
+    """Load `<level>_level_wide` (level: "file" or "method")."""
+    return read_table(find_table(csv_dir, f"{level}_level_wide"), columns=columns)
+
+
+def load_wide_tables(csv_dir, columns=None):
+    """Load the file-level and method-level wide tables."""
+    return load_wide_table(csv_dir, "file", columns), load_wide_table(csv_dir, "method", columns)
+
+
+def find_long_table(csv_dir):
+    """
+    Return the path of the long table (see testsmell_diff_writer.write_long_table)
+    in the first format (Parquet, Feather, CSV) that is not older than the
+    wide tables, nor than the long CSV for a typed file; None if there is none.
+    """
+    wide_path = find_table(csv_dir, "file_level_wide")
+    wide_mtime = os.path.getmtime(wide_path) if os.path.isfile(wide_path) else None
+    csv_path = os.path.join(csv_dir, LONG_TABLE + ".csv")
+    csv_mtime = os.path.getmtime(csv_path) if os.path.isfile(csv_path) else None
+    for suffix in TYPED_SUFFIXES + [".csv"]:
+        path = os.path.join(csv_dir, LONG_TABLE + suffix)
+        if not os.path.isfile(path):
+            continue
+        mtime = os.path.getmtime(path)
+        if wide_mtime is not None and mtime < wide_mtime:
+            logger.warning(f"Ignoring {path}: older than {wide_path}")
+            continue
+        if csv_mtime is not None and mtime < csv_mtime:
+            logger.warning(f"Ignoring {path}: older than {csv_path}")
+            continue
+        return path
+    return None
+
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.stats import wilcoxon
+
+import signed_rank_table
+from batched_wilcoxon import signed_rank_tests, grouped_wilcoxon
+
+_cache_dir = None
+
+
+def setUpModule():
+    # 厳密な帰無分布の表はユーザーキャッシュではなく一時ディレクトリに保存する
+    global _cache_dir
+    _cache_dir = tempfile.TemporaryDirectory()
+    os.environ[signed_rank_table.CACHE_DIR_ENV] = _cache_dir.name
+
+
+def tearDownModule():
+    del os.environ[signed_rank_table.CACHE_DIR_ENV]
+    _cache_dir.cleanup()
+
+
+def sample_groups():
+    rng = np.random.default_rng(0)
+    return [
+        rng.normal(size=20),                                        # 厳密分布 (同順位なし)
+        np.arange(1.0, 61.0) * rng.choice([-1, 1], size=60),        # n > 50 で正規近似
+        np.array([0, 1, -1, 2, 2, -3, 1, 0], dtype=float),          # n <= 13 で同順位・ゼロあり (並べ替え検定)
+        rng.integers(-3, 4, size=30).astype(float),                 # 同順位あり・n > 13 で正規近似
+        np.array([4.0]),
+    ]
+
+
+class TestSignedRankTests(unittest.TestCase):
+    """batched_wilcoxon.pyの一括Wilcoxon検定のユニットテスト"""
+
+    def test_matches_scipy(self):
+        """各グループの統計量とp値がscipy.stats.wilcoxonと一致することをテストする"""
+        groups = sample_groups()
+        codes = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+        result = signed_rank_tests(np.concatenate(groups), codes, len(groups))
+        self.assertEqual(list(result["method"]),
+                         ["exact", "asymptotic", "permutation", "asymptotic", "exact"])
+        for i, d in enumerate(groups):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                expected = wilcoxon(d, np.zeros_like(d))
+            self.assertAlmostEqual(result["statistic"][i], expected.statistic, places=10)
+            self.assertAlmostEqual(result["p_value"][i], expected.pvalue, places=12)
+
+    def test_interleaved_groups(self):
+        """グループの行が混在していても結果が変わらないことをテストする"""
+        groups = sample_groups()
+        d = np.concatenate(groups)
+        codes = np.repeat(np.arange(len(groups)), [len(g) for g in groups])
+        order = np.random.default_rng(1).permutation(len(d))
+        expected = signed_rank_tests(d, codes, len(groups))
+        result = signed_rank_tests(d[order], codes[order], len(groups))
+        np.testing.assert_array_equal(result["p_value"], expected["p_value"])
+        np.testing.assert_array_equal(result["statistic"], expected["statistic"])
+
+
+class TestGroupedWilcoxon(unittest.TestCase):
+    """batched_wilcoxon.grouped_wilcoxonのユニットテスト"""
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            "type_name": pd.Categorical(["B", "B", "B", "A", "A", "A", "B"]),
+            "test_smell": pd.Categorical(["x", "y", "x", "x", "x", "x", "x"]),
+            "before_value": [3, 1, 2, 0, 5, 1, 4],
+            "after_value": [1, 1, 2, 1, 2, 0, 1],
+        })
+
+    def test_group_order_and_counts(self):
+        """groupbyと同じ順序で、変化の件数が集計されることをテストする"""
+        result = grouped_wilcoxon(self.df, ["type_name", "test_smell"])
+        self.assertEqual(list(zip(result["type_name"], result["test_smell"])), [("A", "x"), ("B", "x"), ("B", "y")])
+        self.assertEqual(result["type_name"].dtype, object)
+        self.assertEqual(list(result["total_pairs"]), [3, 3, 1])
+        self.assertEqual(list(result["improvements"]), [2, 2, 0])
+        self.assertEqual(list(result["degradations"]), [1, 0, 0])
+        self.assertEqual(list(result["no_changes"]), [0, 1, 1])
+        self.assertEqual(list(result["diff_median"]), [-1.0, -2.0, 0.0])
+
+    def test_unsorted_keeps_first_appearance(self):
+        """sort=Falseでは出現順に並ぶことをテストする"""
+        result = grouped_wilcoxon(self.df, "type_name", sort=False)
+        self.assertEqual(list(result["type_name"]), ["B", "A"])
+        subset = self.df[self.df["type_name"] == "B"]
+        expected = wilcoxon(subset["before_value"], subset["after_value"])
+        self.assertAlmostEqual(result["p_value"].iloc[0], expected.pvalue, places=12)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
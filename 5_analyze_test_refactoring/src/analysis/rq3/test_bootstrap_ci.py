@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+
+from bootstrap_ci import paired_statistics, bootstrap_group, bootstrap_effect_sizes
+
+
+class TestPairedStatistics(unittest.TestCase):
+    """bootstrap_ci.paired_statisticsのユニットテスト"""
+
+    def test_matches_row_by_row(self):
+        """各行の中央値と順位双列相関が1行ずつの計算と一致することをテストする"""
+        rng = np.random.default_rng(0)
+        samples = rng.integers(-3, 4, size=(50, 12)).astype(float)
+        samples[0] = 0
+        median, rank_biserial = paired_statistics(samples)
+        for i, d in enumerate(samples):
+            nonzero = d[d != 0]
+            ranks = rankdata(np.abs(nonzero))
+            total = ranks.sum()
+            expected = (ranks[nonzero > 0].sum() - ranks[nonzero < 0].sum()) / total if total else 0.0
+            self.assertAlmostEqual(rank_biserial[i], expected)
+            self.assertEqual(median[i], np.median(d))
+
+
+class TestBootstrap(unittest.TestCase):
+    """bootstrap_ci.pyのブートストラップ信頼区間のユニットテスト"""
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        rows = []
+        for type_name, shift in [("A", -1), ("B", 0), ("C", 1)]:
+            for _ in range(30):
+                before = int(rng.integers(0, 5))
+                rows.append((type_name, "x", before, max(0, before + shift + int(rng.integers(-1, 2)))))
+        rows += [("D", "x", 1, 0)] * 3
+        self.df = pd.DataFrame(rows, columns=["type_name", "test_smell", "before_value", "after_value"])
+
+    def test_interval_contains_estimate(self):
+        """信頼区間が点推定を含み、改善したグループでは負になることをテストする"""
+        result = bootstrap_effect_sizes(self.df, ["type_name", "test_smell"], n_resamples=500, n_jobs=1)
+        self.assertEqual(list(result["type_name"]), ["A", "B", "C"])
+        for _, row in result.iterrows():
+            self.assertLessEqual(row["rank_biserial_ci_low"], row["rank_biserial"])
+            self.assertLessEqual(row["rank_biserial"], row["rank_biserial_ci_high"])
+        self.assertLess(result.loc[0, "rank_biserial_ci_high"], 0)
+        self.assertGreater(result.loc[2, "rank_biserial_ci_low"], 0)
+
+    def test_reproducible_across_processes(self):
+        """同じseedなら並列数によらず同じ結果になることをテストする"""
+        serial = bootstrap_effect_sizes(self.df, "type_name", n_resamples=200, seed=7, n_jobs=1)
+        parallel = bootstrap_effect_sizes(self.df, "type_name", n_resamples=200, seed=7, n_jobs=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+
+    def test_constant_differences(self):
+        """差が一定なら区間の幅が0になることをテストする"""
+        n, median, low, high, rank_biserial, rb_low, rb_high = bootstrap_group(
+            np.full(10, -2.0), n_resamples=100, confidence=0.95, seed=0)
+        self.assertEqual((n, median, low, high), (10, -2.0, -2.0, -2.0))
+        self.assertEqual((rank_biserial, rb_low, rb_high), (-1.0, -1.0, -1.0))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.stats import wilcoxon
+
+import signed_rank_table
+
+# ファイル名が数字で始まるのでパスから読み込む
+_spec = importlib.util.spec_from_file_location(
+    "descriptive_analysis", os.path.join(os.path.dirname(os.path.abspath(__file__)), "0_descriptive_analysis.py"))
+descriptive_analysis = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(descriptive_analysis)
+
+_cache_dir = None
+
+
+def setUpModule():
+    # 厳密な帰無分布の表はユーザーキャッシュではなく一時ディレクトリに保存する
+    global _cache_dir
+    _cache_dir = tempfile.TemporaryDirectory()
+    os.environ[signed_rank_table.CACHE_DIR_ENV] = _cache_dir.name
+
+
+def tearDownModule():
+    del os.environ[signed_rank_table.CACHE_DIR_ENV]
+    _cache_dir.cleanup()
+
+
+def paired_frame():
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(300):
+        type_name = ["B", "A", "C"][int(rng.integers(0, 3))]
+        test_smell = ["y", "x", "z"][int(rng.integers(0, 3))]
+        before = int(rng.integers(0, 4))
+        after = max(0, before + int(rng.integers(-2, 2))) if type_name != "C" else before
+        rows.append((f"c{i}", type_name, test_smell, before, after))
+    df = pd.DataFrame(rows, columns=["commit_url", "type_name", "test_smell", "before_value", "after_value"])
+    # 変化が1件だけのグループ
+    df.loc[len(df)] = ("c300", "D", "x", 1, 0)
+    return df.astype({"type_name": "category", "test_smell": "category"})
+
+
+def direct_patterns(subset):
+    """1グループ分の変化パターンを直接計算する (元の実装と同じ)"""
+    improvements = (subset["after_value"] < subset["before_value"]).sum()
+    degradations = (subset["after_value"] > subset["before_value"]).sum()
+    changed = subset[subset["after_value"] != subset["before_value"]]
+    effect_size = 0
+    if len(changed) > 1:
+        diff = changed["after_value"] - changed["before_value"]
+        effect_size = np.mean(diff) / np.std(diff) if np.std(diff) > 0 else 0
+    return {
+        "total_pairs": len(subset), "improvements": improvements, "degradations": degradations,
+        "no_changes": len(subset) - improvements - degradations,
+        "improvement_rate": improvements / len(subset) * 100, "effect_size": effect_size,
+    }
+
+
+class TestChangePatterns(unittest.TestCase):
+    """0_descriptive_analysis.pyの変化パターン集計のユニットテスト"""
+
+    def setUp(self):
+        self.df = paired_frame()
+
+    def test_matches_per_group_computation(self):
+        """1回のgroupbyの集計がグループごとの計算と一致し、出現順に並ぶことをテストする"""
+        summary = descriptive_analysis.summarize_change_patterns(self.df, ["type_name", "test_smell"])
+        keys = list(dict.fromkeys(zip(self.df["type_name"], self.df["test_smell"])))
+        self.assertEqual(list(zip(summary["type_name"], summary["test_smell"])), keys)
+        for row in summary.itertuples(index=False):
+            subset = self.df[(self.df["type_name"] == row.type_name) & (self.df["test_smell"] == row.test_smell)]
+            for key, value in direct_patterns(subset).items():
+                self.assertAlmostEqual(getattr(row, key), value, places=12, msg=key)
+
+    def test_type_smell_details(self):
+        """タイプごとの詳細がタイプの出現順にまとまり、変化5件以上のグループだけ検定することをテストする"""
+        by_type, details = descriptive_analysis.summarize_type_smell_changes(self.df)
+        types = list(self.df["type_name"].unique())
+        self.assertEqual(list(by_type["type_name"]), types)
+        self.assertEqual(list(dict.fromkeys(details["type_name"])), types)
+        for row in details.itertuples(index=False):
+            subset = self.df[(self.df["type_name"] == row.type_name) & (self.df["test_smell"] == row.test_smell)]
+            changed = subset[subset["after_value"] != subset["before_value"]]
+            if len(changed) >= 5:
+                self.assertAlmostEqual(row.p_value, wilcoxon(changed["before_value"], changed["after_value"]).pvalue)
+                self.assertEqual(row.significant, row.p_value < 0.05)
+            else:
+                self.assertIsNone(row.p_value)
+                self.assertFalse(row.significant)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,93 @@
+import importlib
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import pandas as pd
+
+from figure_renderer import FigureSpec, render_figures, spec_hash
+
+
+def draw_bars(df, title):
+    plt.bar(df["name"], df["value"])
+    plt.title(title)
+
+
+def draw_line(df, title):
+    plt.plot(df["name"], df["value"])
+    plt.title(title)
+
+
+class TestFigureRenderer(unittest.TestCase):
+    """figure_renderer.pyの並列・キャッシュ付き描画のユニットテスト"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({"name": ["a", "b", "c"], "value": [1.0, 2.0, 3.0]})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def spec(self, name, draw=draw_bars, df=None, title="t"):
+        return FigureSpec(os.path.join(self.tmp.name, name), draw, self.df if df is None else df, {"title": title})
+
+    def test_unchanged_figures_are_cached(self):
+        """データと描画が同じなら2回目は描き直さないことをテストする"""
+        specs = [self.spec("a.png"), self.spec("b.png", title="u")]
+        self.assertEqual(set(render_figures(specs, n_jobs=1).values()), {"rendered"})
+        self.assertTrue(all(os.path.isfile(s.path) for s in specs))
+        self.assertEqual(set(render_figures(specs, n_jobs=1).values()), {"cached"})
+        self.assertEqual(set(render_figures(specs, n_jobs=1, force=True).values()), {"rendered"})
+
+    def test_changes_invalidate_cache(self):
+        """データ・引数・描画関数・出力の有無が変わったら描き直すことをテストする"""
+        render_figures([self.spec("a.png")], n_jobs=1)
+        changed = self.df.assign(value=[1.0, 2.0, 4.0])
+        for spec in [self.spec("a.png", df=changed), self.spec("a.png", title="x"), self.spec("a.png", draw=draw_line)]:
+            self.assertNotEqual(spec_hash(spec), spec_hash(self.spec("a.png")))
+            self.assertEqual(render_figures([spec], n_jobs=1)[spec.path], "rendered")
+        os.remove(self.spec("a.png").path)
+        self.assertEqual(render_figures([self.spec("a.png")], n_jobs=1)[self.spec("a.png").path], "rendered")
+
+    def test_module_and_dependency_changes_invalidate_cache(self):
+        """描画関数の外 (同じモジュールの補助関数や depends) が変わっても描き直すことをテストする"""
+        module_path = os.path.join(self.tmp.name, "figure_module_under_test.py")
+        source = ("import matplotlib.pyplot as plt\n"
+                  "def style():\n    return {COLOR!r}\n"
+                  "def draw(df):\n    plt.bar(df['name'], df['value'], color=style())\n")
+        with open(module_path, "w", encoding="utf-8") as f:
+            f.write(source.replace("{COLOR!r}", "'red'"))
+        sys.path.insert(0, self.tmp.name)
+        self.addCleanup(sys.path.remove, self.tmp.name)
+        self.addCleanup(sys.modules.pop, "figure_module_under_test", None)
+        module = importlib.import_module("figure_module_under_test")
+        before = spec_hash(FigureSpec("a.png", module.draw, self.df))
+        with open(module_path, "w", encoding="utf-8") as f:
+            f.write(source.replace("{COLOR!r}", "'darkblue'"))
+        module = importlib.reload(module)
+        self.assertNotEqual(spec_hash(FigureSpec("a.png", module.draw, self.df)), before)
+        self.assertNotEqual(spec_hash(self.spec("a.png")._replace(depends=(draw_line,))),
+                            spec_hash(self.spec("a.png")))
+
+    def test_serial_rendering_uses_agg(self):
+        """n_jobs=1でもAggバックエンドに切り替えてから描画することをテストする"""
+        with patch.object(matplotlib, "use", wraps=matplotlib.use) as use:
+            render_figures([self.spec("a.png")], n_jobs=1)
+        use.assert_called_with("Agg")
+
+    def test_parallel_rendering(self):
+        """ワーカープロセスで描画しても全ての図が保存されることをテストする"""
+        specs = [self.spec(f"{i}.png", title=str(i)) for i in range(3)]
+        status = render_figures(specs, n_jobs=2)
+        self.assertEqual(status, {s.path: "rendered" for s in specs})
+        self.assertTrue(all(os.path.getsize(s.path) > 0 for s in specs))
+        self.assertEqual(set(render_figures(specs, n_jobs=2).values()), {"cached"})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.stats import wilcoxon
+
+import signed_rank_table
+from power_analysis import group_distributions, sample_counts, signed_rank_p_values, power_analysis, POWER_COLUMNS
+
+_cache_dir = None
+
+
+def setUpModule():
+    # 厳密な帰無分布の表はユーザーキャッシュではなく一時ディレクトリに保存する
+    global _cache_dir
+    _cache_dir = tempfile.TemporaryDirectory()
+    os.environ[signed_rank_table.CACHE_DIR_ENV] = _cache_dir.name
+
+
+def tearDownModule():
+    del os.environ[signed_rank_table.CACHE_DIR_ENV]
+    _cache_dir.cleanup()
+
+
+def expand(counts, levels):
+    """group_distributionsの値ごとの件数を標本に戻す"""
+    values = np.concatenate([[0.0], np.ravel(np.column_stack([levels, -levels]))])
+    return np.repeat(values[:len(counts)], counts)
+
+
+def paired_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for smell, shift in [("strong", -2), ("weak", -1), ("none", 0)]:
+        for i in range(60):
+            before = int(rng.integers(0, 5))
+            change = shift if smell != "weak" or i % 4 == 0 else int(rng.integers(-1, 2))
+            after = before + change if smell != "none" else before
+            rows.append(("A", smell, before, after))
+    return pd.DataFrame(rows, columns=["type_name", "test_smell", "before_value", "after_value"])
+
+
+class TestSignedRankPValues(unittest.TestCase):
+    """件数から計算するWilcoxon検定のp値がscipyと一致することをテストする"""
+
+    def test_matches_scipy(self):
+        rng = np.random.default_rng(1)
+        compared = 0
+        for _ in range(400):
+            d = rng.choice([0.0, 1.0, -1.0, 2.0, -2.5, 3.0, 0.5], size=int(rng.integers(2, 40)))
+            levels = np.unique(np.abs(d[d != 0]))
+            counts = sample_counts(rng, [int(rng.integers(1, 70))], group_distributions([d]), 1)[0, 0]
+            sample = expand(counts, levels)
+            nonzero = sample[sample != 0]
+            has_ties = len(np.unique(np.abs(nonzero))) < len(nonzero)
+            # scipyは小さい標本で同順位・ゼロがあると並べ替え検定になるので比較しない
+            if len(nonzero) == 0 or (len(sample) <= 13 and (has_ties or (sample == 0).any())):
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                expected = wilcoxon(sample).pvalue
+            self.assertAlmostEqual(signed_rank_p_values(counts[None])[0], expected, places=12)
+            compared += 1
+        self.assertGreater(compared, 200)
+
+    def test_exact_without_ties(self):
+        """同順位もゼロも無い小標本では正確な帰無分布を使うことをテストする"""
+        sample = np.array([1.0, -2.0, 3.0, 4.0, 5.0, -6.0, 7.0, 8.0])
+        # |d|の小さい順に +a, -a の位置へ1件ずつ
+        counts = np.zeros((1, 1 + 2 * len(sample)), dtype="int64")
+        counts[0, np.where(sample > 0, 1, 2) + 2 * np.arange(len(sample))] = 1
+        self.assertAlmostEqual(signed_rank_p_values(counts)[0], wilcoxon(sample, method="exact").pvalue, places=12)
+        self.assertAlmostEqual(signed_rank_p_values(counts)[0], wilcoxon(sample).pvalue, places=12)
+
+
+class TestSampling(unittest.TestCase):
+
+    def test_counts_keep_sizes_and_proportions(self):
+        """各反復の件数の合計がサイズに一致し、平均が確率に近いことをテストする"""
+        diffs = [np.array([0, 0, 1, -1, 2, 2]), np.array([3.0]), np.array([0, -1])]
+        pvals = group_distributions(diffs)
+        np.testing.assert_allclose(pvals.sum(axis=1), 1.0)
+        counts = sample_counts(np.random.default_rng(0), [50, 7, 20], pvals, 2000)
+        np.testing.assert_array_equal(counts.sum(axis=2), [[50] * 2000, [7] * 2000, [20] * 2000])
+        np.testing.assert_allclose(counts.mean(axis=1) / np.array([[50], [7], [20]]), pvals, atol=0.01)
+        self.assertTrue((counts.sum(axis=1)[pvals == 0] == 0).all())
+
+
+class TestPowerAnalysis(unittest.TestCase):
+    """power_analysis.pyの検出力と必要サンプルサイズのユニットテスト"""
+
+    def setUp(self):
+        self.df = paired_frame()
+
+    def test_power_follows_effect(self):
+        result = power_analysis(self.df, "test_smell", n_simulations=300, sort=False).set_index("test_smell")
+        self.assertEqual(list(result.columns), POWER_COLUMNS)
+        self.assertEqual(result.loc["strong", "achieved_power"], 1.0)
+        self.assertTrue(result.loc["strong", "power_adequate"])
+        self.assertLess(result.loc["weak", "achieved_power"], result.loc["strong", "achieved_power"])
+        self.assertGreater(result.loc["weak", "required_n"], result.loc["strong", "required_n"])
+        # 変化が無いグループは検定できない
+        self.assertEqual(result.loc["none", "achieved_power"], 0.0)
+        self.assertTrue(np.isnan(result.loc["none", "required_n"]))
+        self.assertEqual(result.loc["none", "n_nonzero"], 0)
+
+    def test_independent_of_jobs(self):
+        """同じseedなら並列数によらず同じ結果になることをテストする"""
+        frames = [paired_frame(seed).assign(type_name=f"T{seed}") for seed in range(3)]
+        df = pd.concat(frames, ignore_index=True)
+        serial = power_analysis(df, ["type_name", "test_smell"], n_simulations=200, seed=3, n_jobs=1)
+        parallel = power_analysis(df, ["type_name", "test_smell"], n_simulations=200, seed=3, n_jobs=2)
+        pd.testing.assert_frame_equal(serial, parallel)
+        self.assertEqual(len(serial), 9)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,75 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use("Agg")
+import pandas as pd
+
+import signed_rank_table
+
+# ファイル名が数字で始まるのでパスから読み込む
+_spec = importlib.util.spec_from_file_location(
+    "refactoring_smell_relationship_analysis",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "1_refactoring_smell_relationship_analysis.py"))
+relationship = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(relationship)
+
+_cache_dir = None
+
+
+def setUpModule():
+    # 厳密な帰無分布の表はユーザーキャッシュではなく一時ディレクトリに保存する
+    global _cache_dir
+    _cache_dir = tempfile.TemporaryDirectory()
+    os.environ[signed_rank_table.CACHE_DIR_ENV] = _cache_dir.name
+
+
+def tearDownModule():
+    del os.environ[signed_rank_table.CACHE_DIR_ENV]
+    _cache_dir.cleanup()
+
+
+class TestRelationshipFigures(unittest.TestCase):
+    """1_refactoring_smell_relationship_analysis.pyの図が実際に保存されることのテスト"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.results_dir = relationship.RESULTS_DIR
+        relationship.RESULTS_DIR = self.tmp.name
+
+    def tearDown(self):
+        relationship.RESULTS_DIR = self.results_dir
+        self.tmp.cleanup()
+
+    def test_effectiveness_heatmaps_are_written(self):
+        """改善率と有意な効果量のヒートマップが保存されることをテストする"""
+        results_df = pd.DataFrame({
+            "refactoring_type": ["A", "A", "B", "B"],
+            "test_smell": ["x", "y", "x", "y"],
+            "improvement_rate": [10.0, 20.0, 30.0, 0.0],
+            "effect_size_r": [-0.4, 0.1, -0.2, 0.3],
+            "significant_corrected": [True, False, True, True],
+        })
+        status = relationship.create_effectiveness_heatmap(results_df, "file", n_jobs=1)
+        names = ["improvement_heatmap_file.png", "effect_size_heatmap_significant_file.png"]
+        self.assertEqual(set(status.values()), {"rendered"})
+        for name in names:
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, name)), name)
+
+    def test_summary_figures_are_written(self):
+        """サマリーの2つの棒グラフが保存され、空の表では何も描かないことをテストする"""
+        summary_df = pd.DataFrame({
+            "refactoring_type": ["A", "B"],
+            "overall_improvement_rate": [12.5, 40.0],
+            "smells_affected": [3, 1],
+        })
+        relationship.create_summary_visualizations(summary_df, "method", n_jobs=1)
+        for name in ["summary_improvement_rate_method.png", "summary_smells_affected_method.png"]:
+            self.assertTrue(os.path.isfile(os.path.join(self.tmp.name, name)), name)
+        self.assertEqual(relationship.create_summary_visualizations(pd.DataFrame(), "file"), {})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.stats import binomtest
+
+from repo_resampling import (
+    repository_of, RepositorySums, statistics_from_sums, group_statistics, leave_one_repository_out,
+    cluster_bootstrap
+)
+
+
+def paired_frame():
+    rng = np.random.default_rng(0)
+    rows = []
+    for repo in ["o1/r1", "o1/r2", "o2/r1", "o3/r3"]:
+        for i in range(int(rng.integers(3, 8))):
+            url = f"https://github.com/{repo}/commit/{i:040x}"
+            for type_name in ["A", "B"]:
+                before = int(rng.integers(0, 4))
+                rows.append((url, type_name, "x", before, max(0, before + int(rng.integers(-2, 2)))))
+    return pd.DataFrame(rows, columns=["commit_url", "type_name", "test_smell", "before_value", "after_value"])
+
+
+def direct_statistics(df):
+    """1グループ分の統計量を直接計算する (比較用)"""
+    diff = (df["after_value"] - df["before_value"]).to_numpy(dtype=float)
+    changed = diff[diff != 0]
+    improvements, degradations = int((diff < 0).sum()), int((diff > 0).sum())
+    std = np.std(changed) if len(changed) > 1 else 0
+    return {
+        "total_pairs": len(diff),
+        "improvement_rate": improvements / len(diff) * 100,
+        "mean_diff": diff.mean(),
+        "effect_size": np.mean(changed) / std if std > 0 else 0,
+        "sign_test_p": binomtest(improvements, len(changed)).pvalue if len(changed) else 1.0,
+    }
+
+
+class TestRepoResampling(unittest.TestCase):
+    """repo_resampling.pyのリポジトリ単位の再標本化のユニットテスト"""
+
+    def setUp(self):
+        self.df = paired_frame()
+        self.repo_sums = RepositorySums(self.df, ["type_name", "test_smell"])
+        self.repos = np.asarray(repository_of(self.df["commit_url"]))
+
+    def assertStatisticsEqual(self, stats, expected):
+        for key, value in expected.items():
+            self.assertAlmostEqual(float(stats[key]), value, places=10, msg=key)
+
+    def test_repository_of(self):
+        """コミットURLからowner/repoを取り出すことをテストする"""
+        self.assertEqual(list(repository_of(["https://github.com/o/r/commit/abc"])), ["o/r"])
+        self.assertEqual(list(self.repo_sums.repositories), ["o1/r1", "o1/r2", "o2/r1", "o3/r3"])
+
+    def test_group_statistics_match_direct(self):
+        """全リポジトリの統計量が直接計算と一致することをテストする"""
+        result = group_statistics(self.repo_sums)
+        for i, type_name in enumerate(["A", "B"]):
+            self.assertStatisticsEqual(result.iloc[i], direct_statistics(self.df[self.df["type_name"] == type_name]))
+
+    def test_leave_one_out_matches_direct(self):
+        """1リポジトリを除いた統計量が、そのリポジトリを除いて計算した値と一致することをテストする"""
+        result = leave_one_repository_out(self.repo_sums)
+        self.assertEqual(len(result), 8)
+        for _, row in result.iterrows():
+            subset = self.df[(self.df["type_name"] == row["type_name"]) & (self.repos != row["excluded_repository"])]
+            self.assertStatisticsEqual(row, direct_statistics(subset))
+
+    def test_weighted_sums_match_resampled_rows(self):
+        """重み付きの和が、リポジトリを重複して選んだデータと一致することをテストする"""
+        weights = np.array([[2.0, 0.0, 1.0, 1.0]])
+        stats = statistics_from_sums(self.repo_sums.total(weights))
+        resampled = pd.concat([self.df[self.repos == "o1/r1"]] * 2 + [self.df[self.repos == r] for r in ["o2/r1", "o3/r3"]])
+        expected = direct_statistics(resampled[resampled["type_name"] == "B"])
+        self.assertStatisticsEqual({k: v[0, 1] for k, v in stats.items()}, expected)
+
+    def test_cluster_bootstrap_intervals(self):
+        """クラスタブートストラップの区間が点推定を含み、seedで再現できることをテストする"""
+        result = cluster_bootstrap(self.repo_sums, n_resamples=300, seed=3)
+        self.assertTrue((result["mean_diff_ci_low"] <= result["mean_diff"]).all())
+        self.assertTrue((result["mean_diff"] <= result["mean_diff_ci_high"]).all())
+        pd.testing.assert_frame_equal(result, cluster_bootstrap(self.repo_sums, n_resamples=300, seed=3))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from statsmodels.stats.multitest import multipletests
+
+import batched_wilcoxon
+import signed_rank_table
+from sensitivity_sweep import SweepConfig, config_grid, run_sweep, NUMBER_OF_METHODS
+
+_cache_dir = None
+
+
+def setUpModule():
+    # 厳密な帰無分布の表はユーザーキャッシュではなく一時ディレクトリに保存する
+    global _cache_dir
+    _cache_dir = tempfile.TemporaryDirectory()
+    os.environ[signed_rank_table.CACHE_DIR_ENV] = _cache_dir.name
+
+
+def tearDownModule():
+    del os.environ[signed_rank_table.CACHE_DIR_ENV]
+    _cache_dir.cleanup()
+
+
+def paired_frame(seed):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(400):
+        type_name = ["A", "B", "C", "D"][int(rng.integers(0, 4))]
+        test_smell = ["x", "y", "z", NUMBER_OF_METHODS][int(rng.integers(0, 4))]
+        before = int(rng.integers(0, 5))
+        shift = -1 if test_smell == "x" else 1 if test_smell == NUMBER_OF_METHODS else 0
+        after = max(0, before + shift + int(rng.integers(-1, 2)) * (i % 3 == 0))
+        rows.append((f"c{i}", type_name, test_smell, before, after))
+    return pd.DataFrame(rows, columns=["commit_url", "type_name", "test_smell", "before_value", "after_value"])
+
+
+class TestSensitivitySweep(unittest.TestCase):
+    """sensitivity_sweep.pyの設定の組み合わせの一括実行のユニットテスト"""
+
+    def setUp(self):
+        self.tables = {"file": paired_frame(0), "method": paired_frame(1)}
+
+    def test_baseline_matches_main_analysis(self):
+        """既定の設定が1_refactoring_smell_relationship_analysis.pyの全体補正と一致することをテストする"""
+        results, summary = run_sweep(self.tables, [SweepConfig()], n_jobs=1)
+        groups = pd.concat([batched_wilcoxon.tested_groups(df, by, 5) for df in self.tables.values()
+                            for by in (["type_name", "test_smell"], ["test_smell"])], ignore_index=True)
+        reject, corrected, _, _ = multipletests(groups["p_value"], alpha=0.05, method="fdr_bh")
+        self.assertEqual(len(results), len(groups))
+        np.testing.assert_allclose(np.sort(results["p_value_corrected"]), np.sort(corrected))
+        self.assertEqual(results["significant_corrected"].sum(), reject.sum())
+        self.assertEqual(summary.loc[0, "jaccard_vs_baseline"], 1.0)
+
+    def test_number_of_methods_handling(self):
+        results, summary = run_sweep(self.tables, config_grid(number_of_methods=["include", "exclude", "separate"]),
+                                     n_jobs=1)
+        excluded = results[results["number_of_methods"] == "exclude"]
+        self.assertNotIn(NUMBER_OF_METHODS, set(excluded["test_smell"]))
+        # separateではNumberOfMethodsの行だけで補正する
+        separate = results[(results["number_of_methods"] == "separate") & (results["test_smell"] == NUMBER_OF_METHODS)]
+        _, corrected, _, _ = multipletests(separate["p_value"], alpha=0.05, method="fdr_bh")
+        np.testing.assert_allclose(separate["p_value_corrected"], corrected)
+        self.assertEqual(list(summary["number_of_methods"]), ["include", "exclude", "separate"])
+
+    def test_filters_and_thresholds(self):
+        configs = config_grid(min_pairs=[5, 40], levels=["file", "both"])
+        results, summary = run_sweep(self.tables, configs, smells=["x", "y"], n_jobs=1)
+        self.assertEqual(set(results["test_smell"]), {"x", "y"})
+        self.assertEqual(set(results.loc[results["levels"] == "file", "level"]), {"file"})
+        self.assertTrue((results.loc[results["min_pairs"] == 40, "total_pairs"] >= 40).all())
+        tested = summary.set_index(["min_pairs", "levels"])["tested_groups"]
+        self.assertLess(tested[(40, "both")], tested[(5, "both")])
+        self.assertLess(tested[(5, "file")], tested[(5, "both")])
+
+    def test_parallel_matches_serial(self):
+        """forkしたワーカーで実行しても逐次実行と同じ結果になることをテストする"""
+        configs = config_grid(min_pairs=[3, 5], fdr_methods=["fdr_bh", "bonferroni"], alphas=[0.01, 0.05])
+        serial = run_sweep(self.tables, configs, n_jobs=1)
+        parallel = run_sweep(self.tables, configs, n_jobs=2)
+        pd.testing.assert_frame_equal(serial[0], parallel[0])
+        pd.testing.assert_frame_equal(serial[1], parallel[1])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
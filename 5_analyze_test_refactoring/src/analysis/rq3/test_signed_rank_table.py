@@ -0,0 +1,67 @@
+import itertools
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from scipy.stats import wilcoxon
+
+import signed_rank_table
+from signed_rank_table import SignedRankTable, build_null_counts, null_table, default_cache_dir, CACHE_DIR_ENV
+
+
+class TestSignedRankTable(unittest.TestCase):
+    """signed_rank_table.pyの厳密な帰無分布の表のユニットテスト"""
+
+    def test_counts_match_enumeration(self):
+        """動的計画法の件数が全符号の列挙と一致することをテストする"""
+        counts = build_null_counts(10)
+        for n in range(11):
+            sums = [sum(r for r, s in zip(range(1, n + 1), signs) if s) for signs in itertools.product([0, 1], repeat=n)]
+            expected = np.bincount(sums, minlength=counts.shape[1])
+            np.testing.assert_array_equal(counts[n], expected)
+
+    def test_p_values_match_scipy(self):
+        rng = np.random.default_rng(0)
+        table = SignedRankTable.build(50)
+        samples = [rng.permutation(np.arange(1, n + 1)) * rng.choice([-1, 1], size=n) for n in [1, 2, 5, 13, 27, 50]]
+        expected = [wilcoxon(d, method="exact").pvalue for d in samples]
+        # |d| は 1..n の並べ替えなので、そのまま順位になる
+        r_plus = [d[d > 0].sum() for d in samples]
+        actual = table.p_values([len(d) for d in samples], r_plus)
+        np.testing.assert_allclose(actual, expected, rtol=1e-12)
+        with self.assertRaises(ValueError):
+            table.p_values([51], [3])
+
+    def test_persisted_once(self):
+        """表は一度だけ作られてファイルに保存され、壊れたファイルは作り直すことをテストする"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            table = null_table(20, cache_dir)
+            self.assertIs(null_table(20, cache_dir), table)
+            path = os.path.join(cache_dir, f"signed_rank_null_v{signed_rank_table.TABLE_VERSION}_20.npz")
+            np.testing.assert_array_equal(SignedRankTable.load(path).counts, table.counts)
+
+            signed_rank_table._tables.clear()
+            with open(path, "wb") as f:
+                f.write(b"broken")
+            rebuilt = null_table(20, cache_dir)
+            np.testing.assert_array_equal(rebuilt.counts, table.counts)
+            np.testing.assert_array_equal(SignedRankTable.load(path).counts, table.counts)
+
+    def test_cache_dir_from_environment(self):
+        """保存先は環境変数で変えられ、空なら保存せず、未設定ならユーザーキャッシュになることをテストする"""
+        with tempfile.TemporaryDirectory() as cache_home:
+            with patch.dict(os.environ, {"XDG_CACHE_HOME": cache_home}):
+                os.environ.pop(CACHE_DIR_ENV, None)
+                self.assertEqual(default_cache_dir(), os.path.join(cache_home, "signed_rank_table"))
+            with patch.dict(os.environ, {CACHE_DIR_ENV: cache_home}):
+                null_table(7)
+                self.assertEqual(os.listdir(cache_home), [f"signed_rank_null_v{signed_rank_table.TABLE_VERSION}_7.npz"])
+            with patch.dict(os.environ, {CACHE_DIR_ENV: ""}):
+                self.assertEqual(default_cache_dir(), "")
+                self.assertEqual(null_table(8).max_n, 8)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,145 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+from smell_cube import SmellCube, cube_cells, commit_size_of, make_handler, load_or_build_cube, LEVELS, UNKNOWN_SIZE
+
+
+def wide_table(seed):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(40):
+        repo = ["o1/r1", "o1/r2", "o2/r1"][i % 3]
+        row = {"commit_url": f"https://github.com/{repo}/commit/{i:040x}", "type_name": ["A", "B"][i % 2]}
+        for smell in ["x", "y"]:
+            before = int(rng.integers(0, 4))
+            after = max(0, before + int(rng.integers(-2, 2)))
+            row.update({f"{smell}_before": before, f"{smell}_after": after, f"{smell}_diff": after - before})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+class TestSmellCube(unittest.TestCase):
+    """smell_cube.pyの集計キューブと問い合わせのユニットテスト"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv_dir = self.tmp.name
+        self.wide = {level: wide_table(seed) for seed, level in enumerate(LEVELS)}
+        for level, df in self.wide.items():
+            df.to_csv(os.path.join(self.csv_dir, f"{level}_level_wide.csv"), index=False)
+        self.commit_csv = os.path.join(self.csv_dir, "sampling.csv")
+        urls = self.wide["file"]["commit_url"]
+        pd.DataFrame({"commit_url": urls[:30], "total_addition_lines": np.arange(30) * 40,
+                      "total_deletions_lines": 5}).to_csv(self.commit_csv, index=False)
+        self.cube = SmellCube.build(self.csv_dir, self.commit_csv)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def pairs(self, level):
+        df = self.wide[level]
+        return pd.concat([pd.DataFrame({"commit_url": df["commit_url"], "type_name": df["type_name"], "test_smell": s,
+                                        "before": df[f"{s}_before"], "after": df[f"{s}_after"]}) for s in ["x", "y"]])
+
+    def test_slice_matches_raw_data(self):
+        """絞り込みと集約の結果が元データを直接集計した値と一致することをテストする"""
+        result = self.cube.query(by="type_name", where={"level": "file", "test_smell": "x"})
+        pairs = self.pairs("file")
+        for row in result.itertuples(index=False):
+            subset = pairs[(pairs["type_name"] == row.type_name) & (pairs["test_smell"] == "x")]
+            diff = subset["after"] - subset["before"]
+            self.assertEqual(row.total_pairs, len(subset))
+            self.assertEqual(row.improvements, (diff < 0).sum())
+            self.assertEqual(row.no_changes, (diff == 0).sum())
+            self.assertAlmostEqual(row.mean_diff, diff.mean())
+            self.assertAlmostEqual(row.mean_before, subset["before"].mean())
+
+    def test_roll_up_is_consistent(self):
+        """細かい集約を足し合わせると粗い集約に一致することをテストする"""
+        fine = self.cube.query(by=["level", "repository", "commit_size"], sign_test=False)
+        total = self.cube.query()
+        self.assertEqual(fine["total_pairs"].sum(), total.loc[0, "total_pairs"])
+        self.assertEqual(fine["improvements"].sum(), total.loc[0, "improvements"])
+        self.assertEqual(total.loc[0, "total_pairs"], 2 * 40 * 2)
+        self.assertEqual(set(fine["repository"]), {"o1/r1", "o1/r2", "o2/r1"})
+
+    def test_commit_size_buckets(self):
+        """変更行数の区間と、サイズの無いコミットがunknownになることをテストする"""
+        sizes = pd.Series([3, 45, 5000], index=["a", "b", "c"])
+        self.assertEqual(list(commit_size_of(["a", "b", "c", "d"], sizes)), ["1-10", "11-50", ">1000", UNKNOWN_SIZE])
+        unknown = self.cube.query(where={"commit_size": UNKNOWN_SIZE, "level": "file"})
+        self.assertEqual(unknown.loc[0, "total_pairs"], 10 * 2)
+
+    def test_commit_size_joined_on_sha(self):
+        """owner/repoの大文字小文字がサンプリングCSVと違ってもSHAで変更行数が対応付くことをテストする"""
+        urls = self.wide["file"]["commit_url"]
+        pd.DataFrame({
+            "commit_id": urls.str.rsplit("/", n=1).str[-1],
+            "commit_url": urls.str.replace("https://github.com/o1/r1", "https://github.com/O1/R1", regex=False),
+            "total_addition_lines": 100, "total_deletions_lines": 0,
+        }).to_csv(self.commit_csv, index=False)
+        cube = SmellCube.build(self.csv_dir, self.commit_csv)
+        self.assertEqual(cube.dimensions()["commit_size"], ["51-200"])
+        self.assertEqual(commit_size_of(["https://github.com/o1/r1/commit/abc"],
+                                        pd.Series([5], index=["abc"]))[0], "1-10")
+
+    def test_commit_size_order(self):
+        """commit_sizeは区間の順に並び、保存して読み直しても変わらないことをテストする"""
+        expected = ["1-10", "11-50", "51-200", "201-1000", ">1000", UNKNOWN_SIZE]
+        self.assertEqual(self.cube.dimensions()["commit_size"], expected)
+        self.assertEqual(list(self.cube.query(by="commit_size")["commit_size"]), expected)
+        loaded = SmellCube.load(self.cube.save(os.path.join(self.csv_dir, "cube")))
+        self.assertEqual(list(loaded.query(by="commit_size")["commit_size"]), expected)
+
+    def test_unknown_dimension(self):
+        with self.assertRaises(ValueError):
+            self.cube.query(by="author")
+
+    def test_save_load_and_staleness(self):
+        """保存したキューブを読み直し、元の表が変わったら作り直すことをテストする"""
+        path = os.path.join(self.csv_dir, "cube")
+        self.cube.save(path)
+        loaded = load_or_build_cube(self.csv_dir, self.commit_csv, path)
+        pd.testing.assert_frame_equal(loaded.query(by="test_smell"), self.cube.query(by="test_smell"))
+
+        wide = self.wide["method"].copy()
+        wide["x_after"] = wide["x_before"] + 1
+        wide["x_diff"] = 1
+        wide.to_csv(os.path.join(self.csv_dir, "method_level_wide.csv"), index=False)
+        os.utime(os.path.join(self.csv_dir, "method_level_wide.csv"), (1e9, 2e9))
+        rebuilt = load_or_build_cube(self.csv_dir, self.commit_csv, path)
+        degraded = rebuilt.query(where={"level": "method", "test_smell": "x"})
+        self.assertEqual(degraded.loc[0, "degradations"], 40)
+
+    def test_http_service(self):
+        """HTTPの問い合わせがPython APIと同じ結果を返すことをテストする"""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self.cube))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            base = f"http://127.0.0.1:{server.server_port}"
+            with urlopen(f"{base}/dimensions") as response:
+                self.assertEqual(json.load(response)["level"], ["file", "method"])
+            with urlopen(f"{base}/query?by=type_name&level=file&test_smell=x&test_smell=y") as response:
+                rows = json.load(response)["rows"]
+            expected = self.cube.query(by="type_name", where={"level": "file"})
+            self.assertEqual([r["total_pairs"] for r in rows], list(expected["total_pairs"]))
+            with self.assertRaises(HTTPError) as context:
+                urlopen(f"{base}/query?author=x")
+            self.assertEqual(context.exception.code, 400)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
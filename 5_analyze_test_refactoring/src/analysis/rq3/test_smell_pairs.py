@@ -0,0 +1,131 @@
+import os
+import tempfile
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import smell_pairs
+from smell_pairs import preprocess_data, paired_from_long, load_paired_tables, CACHE_DIR_NAME
+
+
+def reference_preprocess(df):
+    """以前の各スクリプトにあった行ごとの整形 (比較用)"""
+    test_smell_columns = [col for col in df.columns if "_diff" in col]
+    data = []
+    for _, row in df.iterrows():
+        for smell in test_smell_columns:
+            before_col, after_col = smell.replace("_diff", "_before"), smell.replace("_diff", "_after")
+            data.append({
+                "commit_url": row["commit_url"],
+                "type_name": row["type_name"],
+                "test_smell": smell.replace("_diff", ""),
+                "before_value": row[before_col] if pd.notnull(row[before_col]) else 0,
+                "after_value": row[after_col] if pd.notnull(row[after_col]) else 0,
+                "diff_value": row[smell] if pd.notnull(row[smell]) else 0
+            })
+    return pd.DataFrame(data)
+
+
+def wide_frame():
+    return pd.DataFrame({
+        "commit_url": ["https://github.com/o/r/commit/b", "https://github.com/o/r/commit/a"],
+        "type_name": ["Rename Method", "Add Assertion"],
+        "Lazy Test_before": [1, np.nan], "Lazy Test_after": [0, 2], "Lazy Test_diff": [-1, np.nan],
+        "Eager Test_before": [3, 0], "Eager Test_after": [3, 1], "Eager Test_diff": [0, 1],
+    })
+
+
+class TestPreprocessData(unittest.TestCase):
+    """smell_pairs.pyの整形のユニットテスト"""
+
+    def test_matches_row_by_row_reshape(self):
+        """行ごとの整形と同じ順序・値になることをテストする"""
+        df = wide_frame()
+        result = preprocess_data(df)
+        expected = reference_preprocess(df)
+        pd.testing.assert_frame_equal(
+            result.astype({"commit_url": object, "type_name": object, "test_smell": object}), expected,
+            check_dtype=False)
+
+    def test_compact_dtypes(self):
+        """識別子はカテゴリ型、件数は整数ならint32になることをテストする"""
+        result = preprocess_data(wide_frame())
+        for col in ["commit_url", "type_name", "test_smell"]:
+            self.assertIsInstance(result[col].dtype, pd.CategoricalDtype)
+        self.assertEqual(list(result["test_smell"].cat.categories), ["Eager Test", "Lazy Test"])
+        self.assertEqual(result["before_value"].dtype, np.int32)
+
+    def test_fractional_values_stay_float(self):
+        """整数でない値があればfloat64のまま残すことをテストする"""
+        df = wide_frame()
+        df["Lazy Test_diff"] = [0.5, np.nan]
+        self.assertEqual(preprocess_data(df)["diff_value"].dtype, np.float64)
+
+    def test_groupby_order_matches_strings(self):
+        """observed=Trueのgroupbyが文字列列の場合と同じ順序になることをテストする"""
+        df = wide_frame()
+        keys = [k for k, _ in preprocess_data(df).groupby(["type_name", "test_smell"], observed=True)]
+        self.assertEqual(keys, [k for k, _ in reference_preprocess(df).groupby(["type_name", "test_smell"])])
+
+
+class TestLoadPairedTables(unittest.TestCase):
+    """smell_pairs.load_paired_tablesのキャッシュのユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_dir = self.tmp_dir.name
+        self.df = wide_frame()
+        self.df.to_csv(os.path.join(self.csv_dir, "file_level_wide.csv"), index=False)
+        self.df.to_csv(os.path.join(self.csv_dir, "method_level_wide.csv"), index=False)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _cache_files(self):
+        cache_dir = os.path.join(self.csv_dir, CACHE_DIR_NAME)
+        return sorted(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else []
+
+    def test_reshapes_wide_tables(self):
+        """ワイド形式の表から整形されることをテストする"""
+        file_df, method_df = load_paired_tables(self.csv_dir)
+        pd.testing.assert_frame_equal(file_df, preprocess_data(self.df))
+        pd.testing.assert_frame_equal(method_df, preprocess_data(self.df))
+
+    @unittest.skipIf(smell_pairs.pyarrow is None, "pyarrow is not installed")
+    def test_cache_reused_and_invalidated(self):
+        """入力が同じならキャッシュを使い、入力が変われば作り直すことをテストする"""
+        first, _ = load_paired_tables(self.csv_dir)
+        cached = self._cache_files()
+        self.assertEqual(len(cached), 2)
+        second, _ = load_paired_tables(self.csv_dir)
+        pd.testing.assert_frame_equal(first, second)
+
+        self.df.loc[0, "Lazy Test_after"] = 5
+        time.sleep(0.01)
+        self.df.to_csv(os.path.join(self.csv_dir, "file_level_wide.csv"), index=False)
+        third, _ = load_paired_tables(self.csv_dir)
+        self.assertEqual(third["after_value"].iloc[0], 5)
+        self.assertEqual(len(self._cache_files()), 2)
+        self.assertNotEqual(self._cache_files(), cached)
+
+    def test_custom_preprocess_bypasses_cache(self):
+        """独自の整形関数を渡した場合はキャッシュを使わないことをテストする"""
+        file_df, _ = load_paired_tables(self.csv_dir, preprocess=reference_preprocess)
+        self.assertEqual(file_df["commit_url"].dtype, object)
+        self.assertEqual(self._cache_files(), [])
+
+    def test_long_table_layout(self):
+        """ロング形式の表からもpreprocess_dataと同じ形式で読み込めることをテストする"""
+        rows = []
+        for _, row in self.df.iterrows():
+            for smell in ["Lazy Test", "Eager Test"]:
+                rows.append({"level": "file", "commit_url": row["commit_url"], "type_name": row["type_name"],
+                             "test_smell": smell, "before": row[f"{smell}_before"],
+                             "after": row[f"{smell}_after"], "diff": row[f"{smell}_diff"]})
+        pd.testing.assert_frame_equal(paired_from_long(pd.DataFrame(rows), "file"), preprocess_data(self.df))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import smell_pairs
+from smell_tables import find_table, find_long_table, load_wide_table
+
+
+class TestFindTable(unittest.TestCase):
+    """smell_tables.find_tableの形式の選択のユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.csv_dir = self.tmp_dir.name
+        self.csv_path = os.path.join(self.csv_dir, "file_level_wide.csv")
+        self.parquet_path = os.path.join(self.csv_dir, "file_level_wide.parquet")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_csv_only(self):
+        """型付きの表が無ければCSVを返すことをテストする"""
+        pd.DataFrame({"a": [1]}).to_csv(self.csv_path, index=False)
+        self.assertEqual(find_table(self.csv_dir, "file_level_wide"), self.csv_path)
+
+    @unittest.skipIf(smell_pairs.pyarrow is None, "pyarrow is not installed")
+    def test_prefers_fresh_typed_table(self):
+        """CSVと同時かそれより新しいParquetを優先することをテストする"""
+        pd.DataFrame({"a": [1]}).to_csv(self.csv_path, index=False)
+        pd.DataFrame({"a": [1]}).to_parquet(self.parquet_path, index=False)
+        os.utime(self.csv_path, (1e9, 1e9))
+        os.utime(self.parquet_path, (1e9, 1e9))
+        self.assertEqual(find_table(self.csv_dir, "file_level_wide"), self.parquet_path)
+
+    @unittest.skipIf(smell_pairs.pyarrow is None, "pyarrow is not installed")
+    def test_skips_stale_typed_table(self):
+        """CSVより古いParquet (前回の実行の残り) は読まないことをテストする"""
+        pd.DataFrame({"a": [1]}).to_parquet(self.parquet_path, index=False)
+        pd.DataFrame({"a": [2]}).to_csv(self.csv_path, index=False)
+        os.utime(self.parquet_path, (1e9, 1e9))
+        os.utime(self.csv_path, (2e9, 2e9))
+        self.assertEqual(find_table(self.csv_dir, "file_level_wide"), self.csv_path)
+        self.assertEqual(load_wide_table(self.csv_dir, "file")["a"].tolist(), [2])
+
+    def test_long_table_falls_back_past_stale_formats(self):
+        """古いParquetの長い表は飛ばして新しいCSVを返し、全て古ければNoneを返すことをテストする"""
+        long_parquet = os.path.join(self.csv_dir, "test_smell_long.parquet")
+        long_csv = os.path.join(self.csv_dir, "test_smell_long.csv")
+        for path, mtime in [(long_parquet, 1e9), (self.csv_path, 2e9), (long_csv, 3e9)]:
+            open(path, "w").close()
+            os.utime(path, (mtime, mtime))
+        self.assertEqual(find_long_table(self.csv_dir), long_csv)
+        os.utime(long_csv, (1.5e9, 1.5e9))
+        self.assertIsNone(find_long_table(self.csv_dir))
+        os.utime(long_parquet, (3e9, 3e9))
+        self.assertEqual(find_long_table(self.csv_dir), long_parquet)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
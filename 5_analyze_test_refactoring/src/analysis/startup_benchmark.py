@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 起動時 (import時) に読み込まれてはいけないライブラリ
+HEAVY_MODULES = ["matplotlib", "seaborn", "scipy.stats", "statsmodels", "matplotlib_venn"]
+# RQ1〜RQ3の解析スクリプト (このファイルからの相対パス)
+ENTRY_POINTS = [
+    "rq1/count_general_refactoring.py",
+    "rq1/count_test_refactoring.py",
+    "rq1/analyze_relationship_general_vs_test.py",
+    "rq1/cooccurrence.py",
+    "rq2/analyze_rq2.py",
+    "rq3/0_descriptive_analysis.py",
+    "rq3/1_refactoring_smell_relationship_analysis.py",
+    "rq3/rq3_willcoxon_signed_rank_test.py",
+    "rq3/repo_resampling.py",
+    "rq3/smell_cube.py",
+    "rq3/power_analysis.py",
+    "rq3/sensitivity_sweep.py",
+]
+
+# __main__としてではなくモジュールとして読み込む (main()は実行しない)
+_IMPORT_SCRIPT = """
+import importlib.util, os, sys
+path = sys.argv[1]
+sys.path.insert(0, os.path.dirname(path))
+spec = importlib.util.spec_from_file_location("startup_benchmark_target", path)
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    Parse `python -X importtime` output into {module: (self_us, cumulative_us)}
+    for every module imported by the process.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def heavy_modules(modules):
+    """The HEAVY_MODULES among the imported `modules` (a package is imported with any of its submodules)."""
+    return [heavy for heavy in HEAVY_MODULES if heavy in modules]
+
+
+def profile_startup(script):
+    """Import `script` in a fresh interpreter with -X importtime."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _IMPORT_SCRIPT, os.path.abspath(script)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {script} failed:\n{proc.stderr[-2000:]}")
+    modules = parse_importtime(proc.stderr)
+    return {
+        "import_seconds": sum(self_us for self_us, _ in modules.values()) / 1e6,
+        "modules": len(modules),
+        "heavy_modules": heavy_modules(modules),
+        "slowest": sorted(((name, cumulative / 1e6) for name, (_, cumulative) in modules.items()
+                           if "." not in name), key=lambda item: -item[1])[:5],
+    }
+
+
+def run_startup_benchmarks(scripts=None, repeat=3):
+    """Median import time of each entry point over `repeat` fresh interpreters."""
+    results = {}
+    for script in scripts or ENTRY_POINTS:
+        runs = [profile_startup(os.path.join(HERE, script)) for _ in range(repeat)]
+        seconds = [run["import_seconds"] for run in runs]
+        results[script] = {**runs[-1], "runs": seconds, "median": statistics.median(seconds)}
+    return results
+
+
+def check(results, previous=None, max_seconds=None, tolerance=1.5):
+    """Regressions: heavy modules at startup, over the budget, or `tolerance` times slower than `previous`."""
+    problems = []
+    for script, result in results.items():
+        if result["heavy_modules"]:
+            problems.append(f"{script} imports {', '.join(result['heavy_modules'])} at startup")
+        if max_seconds is not None and result["median"] > max_seconds:
+            problems.append(f"{script} takes {result['median']:.3f}s to import (budget {max_seconds:.3f}s)")
+        before = (previous or {}).get("benchmarks", {}).get(script)
+        if before and result["median"] > before["median"] * tolerance:
+            problems.append(f"{script} import time {before['median']:.3f}s -> {result['median']:.3f}s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the import (startup) time of the RQ1-RQ3 analysis scripts with -X importtime.")
+    parser.add_argument("--scripts", type=str, nargs="+", default=None,
+                        help="Scripts relative to this directory (default: all RQ1-RQ3 entry points).")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh interpreters per script.")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Import time budget per script.")
+    parser.add_argument("--compare", type=str, default=None, help="Previous result JSON to compare against.")
+    parser.add_argument("--tolerance", type=float, default=1.5,
+                        help="Allowed slowdown relative to --compare before failing.")
+    parser.add_argument("--output", type=str, default=None, help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run_startup_benchmarks(args.scripts, args.repeat)
+    previous = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+
+    print(f"{'script':50s} {'previous':>10s} {'import':>10s}  slowest top-level imports")
+    for script, result in results.items():
+        before = (previous or {}).get("benchmarks", {}).get(script)
+        slowest = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in result["slowest"][:3])
+        print(f"{script:50s} {before['median'] if before else float('nan'):10.3f} {result['median']:10.3f}  {slowest}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "benchmarks": results}, f, indent=2)
+
+    problems = check(results, previous, args.max_seconds, args.tolerance)
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from annotation_data import compact_annotations, load_annotations, memory_usage
+
+ANNOTATIONS = [
+    {"commit_id": "c-1", "experiment_id": "e", "experiment_title": "test-refactoring-2", "order_index": 3,
+     "type_name": "Split Test Method", "description": "", "parameter_data": {"before": {}, "after": {}},
+     "snapshot_id": "s-1", "annotator_name": "test-refactoring", "url": "https://github.com/o/r/commit/bbb"},
+    {"commit_id": "c-2", "experiment_id": "e", "experiment_title": "test-refactoring-2", "order_index": 120,
+     "type_name": "Add explanation message", "description": "", "parameter_data": {"before": {}, "after": {}},
+     "snapshot_id": "s-2", "annotator_name": "test-refactoring", "url": "https://github.com/o/r/commit/aaa"},
+    {"commit_id": "c-2", "experiment_id": "e", "experiment_title": "test-refactoring-2", "order_index": 0,
+     "type_name": "Split Test Method", "description": "", "parameter_data": {"before": {}, "after": {}},
+     "snapshot_id": "s-3", "annotator_name": "test-refactoring", "url": "https://github.com/o/r/commit/aaa"},
+]
+
+
+class TestAnnotationData(unittest.TestCase):
+    """annotation_data.pyのユニットテスト"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp_dir.name, "annotation_result.json")
+        with open(self.json_path, "w", encoding="utf-8") as f:
+            json.dump(ANNOTATIONS, f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_compact_dtypes(self):
+        """文字列列がカテゴリ、order_indexが小さい整数になり、parameter_dataが除かれることをテストする"""
+        df = load_annotations(self.json_path)
+        for col in ["type_name", "url", "experiment_title", "annotator_name", "commit_sha"]:
+            self.assertIsInstance(df[col].dtype, pd.CategoricalDtype, col)
+        self.assertEqual(df["order_index"].dtype, "int8")
+        self.assertNotIn("parameter_data", df.columns)
+        self.assertEqual(df["commit_sha"].tolist(), ["bbb", "aaa", "aaa"])
+        self.assertEqual(df.index.tolist(), [0, 1, 2])
+
+    def test_same_values_as_read_json(self):
+        """値と集計結果がpd.read_jsonの表と変わらないことをテストする"""
+        raw = pd.read_json(self.json_path)
+        df = compact_annotations(raw)
+        for col in df.columns.drop("commit_sha"):
+            self.assertEqual(df[col].tolist(), raw[col].tolist(), col)
+        compact_counts = df.groupby(["commit_id", "type_name"], observed=True).size()
+        raw_counts = raw.groupby(["commit_id", "type_name"]).size()
+        self.assertEqual(list(compact_counts.items()), list(raw_counts.items()))
+        self.assertLess(memory_usage(df), memory_usage(raw))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
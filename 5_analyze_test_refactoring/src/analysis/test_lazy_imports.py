@@ -0,0 +1,54 @@
+import os
+import pickle
+import subprocess
+import sys
+import unittest
+
+from lazy_imports import lazy_import
+from startup_benchmark import ENTRY_POINTS, HERE, parse_importtime, heavy_modules, profile_startup
+
+
+class TestLazyImport(unittest.TestCase):
+    """lazy_imports.pyのユニットテスト"""
+
+    def test_imports_on_first_use(self):
+        """最初に属性を使うまでimportしないことをテストする"""
+        code = ("from lazy_imports import lazy_import; import sys\n"
+                "m = lazy_import('colorsys'); f = lazy_import('colorsys', 'rgb_to_hsv')\n"
+                "assert 'colorsys' not in sys.modules and not m.loaded\n"
+                "assert f(1.0, 0.0, 0.0) == (0.0, 1.0, 1.0) and 'colorsys' in sys.modules\n"
+                "assert m.hls_to_rgb is sys.modules['colorsys'].hls_to_rgb and m.loaded\n")
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=HERE)
+
+    def test_pickle_stays_lazy(self):
+        """pickleしても遅延のまま復元され、同じモジュールを指すことをテストする"""
+        json_module = pickle.loads(pickle.dumps(lazy_import("json")))
+        self.assertFalse(json_module.loaded)
+        self.assertEqual(json_module.dumps([1]), "[1]")
+
+    def test_missing_attribute(self):
+        """存在しない属性は使った時点でAttributeErrorになることをテストする"""
+        missing = lazy_import("json", "no_such_function")
+        with self.assertRaises(AttributeError):
+            missing()
+
+
+class TestStartup(unittest.TestCase):
+    """解析スクリプトの起動時に重いライブラリを読み込まないことをテストする"""
+
+    def test_parse_importtime(self):
+        stderr = ("import time: self [us] | cumulative | imported package\n"
+                  "import time:       120 |        120 |   scipy.stats._stats\n"
+                  "import time:       300 |        420 | scipy.stats\n")
+        modules = parse_importtime(stderr)
+        self.assertEqual(modules, {"scipy.stats._stats": (120, 120), "scipy.stats": (300, 420)})
+        self.assertEqual(heavy_modules(modules), ["scipy.stats"])
+
+    def test_entry_points_do_not_import_heavy_modules(self):
+        for script in ENTRY_POINTS:
+            with self.subTest(script=script):
+                self.assertEqual(profile_startup(os.path.join(HERE, script))["heavy_modules"], [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)